@@ -9,3 +9,23 @@ LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+
+# "array" (backup_YYYYMMDD.json, legacy) or "jsonl" (append-only backup_YYYYMMDD.jsonl)
+JSON_LOG_FORMAT = os.getenv('JSON_LOG_FORMAT', 'array')
+
+# SQLite history index written alongside the JSON logs (empty to disable)
+HISTORY_DB_PATH = os.getenv('HISTORY_DB_PATH', os.path.join(LOG_DIR, 'backup_history.db'))
+
+# Asynchronous log writing: a background thread writes queued records in batches.
+# When the queue is full, "block" waits for space and "drop" discards the record.
+LOG_ASYNC = os.getenv('LOG_ASYNC', 'false').lower() == 'true'
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_OVERFLOW_POLICY = os.getenv('LOG_OVERFLOW_POLICY', 'block')
+
+# Rotation: text and JSONL logs roll over daily and when they exceed LOG_MAX_BYTES_MB.
+# Closed files are gzipped in the background; files older than LOG_RETENTION_DAYS or
+# beyond LOG_MAX_TOTAL_MB (oldest first) are deleted. 0 disables each limit.
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES_MB', '0')) * 1024 * 1024
+LOG_COMPRESS = os.getenv('LOG_COMPRESS', 'false').lower() == 'true'
+LOG_RETENTION_DAYS = int(os.getenv('LOG_RETENTION_DAYS', '0'))
+LOG_MAX_TOTAL_BYTES = int(os.getenv('LOG_MAX_TOTAL_MB', '0')) * 1024 * 1024
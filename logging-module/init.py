@@ -1,4 +1,5 @@
-from .backup_logger import BackupLogger, get_logger
+from .backup_logger import BackupLogger, StatsAggregator, get_logger, load_json_log
+from .history_index import HistoryIndex
 
 __version__ = "1.0.0"
-__all__ = ["BackupLogger", "get_logger"]
+__all__ = ["BackupLogger", "HistoryIndex", "StatsAggregator", "get_logger", "load_json_log"]
@@ -0,0 +1,234 @@
+import gzip
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+LOG_FILE_PATTERN = re.compile(
+    r"^backup_(?P<day>\d{8})(?:\.(?P<segment>\d+))?\.(?P<kind>log|jsonl|json)(?P<gz>\.gz)?$"
+)
+
+
+def today() -> str:
+    return datetime.now().strftime('%Y%m%d')
+
+
+def parse_log_name(name: str) -> Optional[Tuple[str, int, str, bool]]:
+    match = LOG_FILE_PATTERN.match(name)
+    if not match:
+        return None
+    return (
+        match.group('day'),
+        int(match.group('segment') or 0),
+        match.group('kind'),
+        bool(match.group('gz'))
+    )
+
+
+def day_segments(log_dir, day: str, kind: str) -> List[Path]:
+    # Oldest first: numbered (rotated) segments, then the active unnumbered file.
+    # A file and its .gz may briefly coexist while being compressed: keep the plain one
+    found = {}
+    for path in Path(log_dir).glob(f"backup_{day}*.{kind}*"):
+        parsed = parse_log_name(path.name)
+        if parsed is None or parsed[2] != kind:
+            continue
+        segment = parsed[1]
+        if segment not in found or not parsed[3]:
+            found[segment] = path
+    numbered = sorted(segment for segment in found if segment)
+    ordered = [found[segment] for segment in numbered]
+    if 0 in found:
+        ordered.append(found[0])
+    return ordered
+
+
+def next_segment_path(path: Path) -> Path:
+    day, _, kind, _ = parse_log_name(path.name)
+    segments = [parse_log_name(p.name)[1] for p in day_segments(path.parent, day, kind)]
+    return path.parent / f"backup_{day}.{max(segments + [0]) + 1}.{kind}"
+
+
+class DailyRotatingFileHandler(logging.FileHandler):
+    def __init__(
+        self,
+        log_dir,
+        max_bytes: int = 0,
+        on_rotate: Optional[Callable[[Path], None]] = None,
+        encoding: str = 'utf-8'
+    ):
+        self.log_dir = Path(log_dir)
+        self.max_bytes = max_bytes
+        self.on_rotate = on_rotate
+        self._day = today()
+        super().__init__(self._path_for(self._day), encoding=encoding)
+
+    def _path_for(self, day: str) -> Path:
+        return self.log_dir / f"backup_{day}.log"
+
+    def emit(self, record: logging.LogRecord):
+        day = today()
+        if day != self._day or (
+                self.max_bytes and self.stream is not None and
+                self.stream.tell() >= self.max_bytes):
+            try:
+                self._rollover(day)
+            except Exception:
+                self.handleError(record)
+        super().emit(record)
+
+    def _rollover(self, day: str):
+        current = Path(self.baseFilename)
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+        closed = current
+        if day == self._day and current.exists():
+            closed = next_segment_path(current)
+            os.replace(current, closed)
+
+        self._day = day
+        self.baseFilename = os.path.abspath(self._path_for(day))
+        self.stream = self._open()
+        if self.on_rotate is not None and closed.exists():
+            self.on_rotate(closed)
+
+
+class LogMaintainer:
+    def __init__(
+        self,
+        log_dir,
+        compress: bool = True,
+        retention_days: int = 0,
+        max_total_bytes: int = 0,
+        interval: float = 3600.0,
+        is_active: Optional[Callable[[Path], bool]] = None,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.log_dir = Path(os.path.abspath(log_dir))
+        self.compress = compress
+        self.retention_days = retention_days
+        self.max_total_bytes = max_total_bytes
+        self.interval = interval
+        self.is_active = is_active or (lambda path: False)
+        self.logger = logger
+
+        self._queue: "queue.Queue[Optional[Path]]" = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-maintainer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: Path):
+        self._queue.put(Path(path))
+
+    def stop(self, wait: bool = True):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        self._safe_sweep()
+        while not self._stop.is_set():
+            try:
+                path = self._queue.get(timeout=self.interval)
+            except queue.Empty:
+                self._safe_sweep()
+                continue
+            if path is None:
+                break
+            if self.compress:
+                self._safe_compress(path)
+            self._safe_enforce_limits()
+
+    def _warn(self, message: str):
+        if self.logger is not None:
+            self.logger.warning(message)
+
+    def _safe_sweep(self):
+        try:
+            self.sweep()
+        except Exception as e:
+            self._warn(f"Log maintenance failed: {e}")
+
+    def _safe_compress(self, path: Path):
+        try:
+            self.compress_file(path)
+        except Exception as e:
+            self._warn(f"Failed to compress {path}: {e}")
+
+    def _safe_enforce_limits(self):
+        try:
+            self.enforce_limits()
+        except Exception as e:
+            self._warn(f"Log retention failed: {e}")
+
+    def _log_files(self) -> List[Tuple[Path, Tuple[str, int, str, bool]]]:
+        files = []
+        for path in self.log_dir.iterdir():
+            parsed = parse_log_name(path.name)
+            if parsed is not None and path.is_file():
+                files.append((path, parsed))
+        return files
+
+    def _is_closed(self, path: Path, parsed: Tuple[str, int, str, bool]) -> bool:
+        day, segment, _, _ = parsed
+        return bool(segment or day < today()) and not self.is_active(path)
+
+    def compress_file(self, path: Path) -> Optional[Path]:
+        if path.suffix == '.gz' or not path.exists():
+            return None
+        target = path.with_name(path.name + '.gz')
+        temp = path.with_name(path.name + '.gz.tmp')
+        with open(path, 'rb') as src, gzip.open(temp, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(temp, target)
+        path.unlink()
+        return target
+
+    def sweep(self):
+        for temp in self.log_dir.glob("backup_*.gz.tmp"):
+            temp.unlink(missing_ok=True)
+        if self.compress:
+            for path, parsed in self._log_files():
+                if not parsed[3] and self._is_closed(path, parsed):
+                    self._safe_compress(path)
+        self.enforce_limits()
+
+    def enforce_limits(self):
+        files = [
+            (path, parsed) for path, parsed in self._log_files()
+            if self._is_closed(path, parsed)
+        ]
+        files.sort(key=lambda item: (item[1][0], item[1][1]))
+
+        if self.retention_days:
+            cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime('%Y%m%d')
+            for path, parsed in list(files):
+                if parsed[0] < cutoff:
+                    path.unlink(missing_ok=True)
+                    files.remove((path, parsed))
+
+        if self.max_total_bytes:
+            total = sum(
+                path.stat().st_size for path in self.log_dir.iterdir()
+                if parse_log_name(path.name) is not None and path.is_file()
+            )
+            for path, _ in files:
+                if total <= self.max_total_bytes:
+                    break
+                size = path.stat().st_size
+                path.unlink(missing_ok=True)
+                total -= size
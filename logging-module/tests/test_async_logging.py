@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backup_logger import get_logger
+
+
+def test_async_writes_are_flushed(tmp_path):
+    """Queued records reach the text log, JSON journal and history after flush()."""
+    
+    logger = get_logger(
+        name="test_async_flush",
+        log_dir=str(tmp_path),
+        console_output=False,
+        json_format="jsonl",
+        history_db=str(tmp_path / "history.db"),
+        async_writes=True
+    )
+    
+    for i in range(200):
+        logger.log_backup_success(f"/source/file_{i}.txt", f"s3://bucket/file_{i}.txt", i, 0.01)
+    logger.print_stats()
+    
+    assert len(logger.read_json_log()) == 200
+    assert logger.query_history(page_size=1)['total'] == 200
+    text_log = next(tmp_path.glob("backup_*.log")).read_text(encoding='utf-8')
+    assert text_log.count("Backup SUCCESS") == 200
+    assert "BACKUP STATISTICS" in text_log
+    
+    logger.close()
+    logger.log_system_event("after close")
+    assert "after close" in next(tmp_path.glob("backup_*.log")).read_text(encoding='utf-8')
+
+
+def test_drop_policy_never_blocks_callers(tmp_path):
+    """With overflow_policy='drop', a stalled writer drops records instead of blocking."""
+    
+    logger = get_logger(
+        name="test_async_drop",
+        log_dir=str(tmp_path),
+        console_output=False,
+        json_format="jsonl",
+        async_writes=True,
+        queue_size=1,
+        overflow_policy="drop"
+    )
+    
+    with logger._json_lock:
+        for i in range(20):
+            logger.log_backup_success(f"/source/file_{i}.txt", f"s3://bucket/file_{i}.txt", i, 0.01)
+    
+    logger.flush()
+    assert logger.dropped_records > 0
+    assert 1 <= len(logger.read_json_log()) < 20
+    assert logger.get_stats()['successful_backups'] == 20
+    logger.close()
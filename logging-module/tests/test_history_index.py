@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backup_logger import get_logger
+from history_index import HistoryIndex
+
+
+def test_logger_writes_history_and_filters(tmp_path):
+    """Every JSON log record is indexed and can be filtered and paginated."""
+    
+    logger = get_logger(
+        name="test_history",
+        log_dir=str(tmp_path),
+        console_output=False,
+        json_format="jsonl",
+        history_db=str(tmp_path / "history.db")
+    )
+    
+    for i in range(5):
+        logger.log_backup_success(f"/source/report_{i}.txt", f"s3://bucket/report_{i}_v.txt", 100 * i, 0.1)
+    logger.log_backup_failure("/source/report_1.txt", "S3 Client Error: SlowDown", 100, error_code="SlowDown")
+    logger.log_backup_deduplicated("/source/notes.txt", "s3://bucket/notes_v.txt", 7)
+    
+    assert logger.query_history()['total'] == 7
+    
+    page = logger.query_history(q="report", status="success", page=2, page_size=2)
+    assert page['total'] == 5
+    assert page['total_pages'] == 3
+    assert len(page['records']) == 2
+    
+    failed = logger.query_history(source="/source/report_1.txt", status="FAILED")['records']
+    assert failed[0]['error_code'] == "SlowDown"
+    logger.close()
+    
+    reader = HistoryIndex(tmp_path / "history.db", readonly=True)
+    latest = reader.last_backup("/source/report_3.txt")
+    assert latest['size_bytes'] == 300
+    assert latest['destination'] == "s3://bucket/report_3_v.txt"
+    reader.close()
+
+
+def test_existing_json_logs_are_imported_once(tmp_path):
+    """Legacy array logs are backfilled on startup without duplicating records."""
+    
+    legacy = [
+        {'timestamp': '2025-01-01T10:00:00', 'status': 'SUCCESS', 'source': '/source/a.txt',
+         'destination': 's3://bucket/a_1.txt', 'size_bytes': 10, 'duration_seconds': 0.1},
+        {'timestamp': '2025-01-02T10:00:00', 'status': 'FAILED', 'source': '/source/a.txt',
+         'size_bytes': 10, 'error': 'timeout'}
+    ]
+    (tmp_path / "backup_20250101.json").write_text(json.dumps(legacy), encoding='utf-8')
+    
+    history = HistoryIndex(tmp_path / "history.db")
+    assert history.import_json_logs(tmp_path) == 2
+    assert history.import_json_logs(tmp_path) == 0
+    
+    result = history.query(source="/source/a.txt", since="2025-01-02")
+    assert [r['status'] for r in result['records']] == ['FAILED']
+    history.close()
+
+
+def test_records_after_tails_new_records(tmp_path):
+    """A reader can follow records appended by the writer using the last seen id."""
+    
+    writer = HistoryIndex(tmp_path / "history.db")
+    reader = HistoryIndex(tmp_path / "history.db", readonly=True)
+    assert reader.latest_id() == 0
+    
+    writer.record({'timestamp': '2025-01-01T10:00:00', 'status': 'SUCCESS', 'source': '/source/a.txt',
+                   'destination': 's3://bucket/a_1.txt', 'size_bytes': 10})
+    cursor = reader.latest_id()
+    writer.record_many([
+        {'timestamp': f'2025-01-01T10:00:0{i}', 'status': 'SUCCESS', 'source': f'/source/b{i}.txt'}
+        for i in range(1, 4)
+    ])
+    
+    records = reader.records_after(cursor, limit=2)
+    assert [r['source'] for r in records] == ['/source/b1.txt', '/source/b2.txt']
+    assert [r['source'] for r in reader.records_after(records[-1]['id'])] == ['/source/b3.txt']
+    assert reader.records_after(reader.latest_id()) == []
+    reader.close()
+    writer.close()
+
+
+def test_stored_size_is_indexed_and_old_databases_are_migrated(tmp_path):
+    """stored_size from log_backup_success reaches the index; older DBs gain the column."""
+    
+    import sqlite3
+    old = sqlite3.connect(str(tmp_path / "history.db"))
+    old.execute(
+        "CREATE TABLE backups (id INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, status TEXT NOT NULL, "
+        "source TEXT NOT NULL, destination TEXT, size_bytes INTEGER, duration_seconds REAL, "
+        "error TEXT, error_code TEXT, UNIQUE (source, timestamp, status))"
+    )
+    old.execute("INSERT INTO backups (timestamp, status, source, size_bytes) VALUES ('2025-01-01', 'SUCCESS', '/source/old.txt', 5)")
+    old.commit()
+    old.close()
+    
+    logger = get_logger(
+        name="test_history_stored_size",
+        log_dir=str(tmp_path),
+        console_output=False,
+        history_db=str(tmp_path / "history.db")
+    )
+    logger.log_backup_success("/source/big.log", "s3://bucket/big_v.log", 1000, 0.1, stored_size=120)
+    logger.close()
+    
+    reader = HistoryIndex(tmp_path / "history.db", readonly=True)
+    assert [r['stored_size_bytes'] for r in reader.records_after(0)] == [None, 120]
+    reader.close()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backup_logger import get_logger, load_json_log
+
+
+def test_jsonl_journal_appends_and_exports(tmp_path):
+    """JSONL mode appends one line per record and exports the legacy array."""
+    
+    logger = get_logger(
+        name="test_journal",
+        log_dir=str(tmp_path),
+        console_output=False,
+        json_format="jsonl",
+        fsync_batch_size=2
+    )
+    
+    for i in range(5):
+        logger.log_backup_success(
+            file_path=f"/source/file_{i}.txt",
+            destination=f"s3://bucket/file_{i}.txt",
+            file_size=100 * i,
+            duration=0.1
+        )
+    logger.log_backup_failure("/source/broken.txt", "Connection timeout")
+    
+    journals = list(tmp_path.glob("backup_*.jsonl"))
+    assert len(journals) == 1
+    assert not list(tmp_path.glob("backup_????????.json"))
+    
+    lines = journals[0].read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 6
+    assert json.loads(lines[-1])['status'] == 'FAILED'
+    
+    records = logger.read_json_log()
+    assert [r['source'] for r in records[:2]] == ["/source/file_0.txt", "/source/file_1.txt"]
+    
+    exported = logger.export_json_log()
+    with open(exported, encoding='utf-8') as f:
+        assert json.load(f) == records
+    
+    logger.close()
+
+
+def test_load_json_log_skips_torn_line(tmp_path):
+    journal = tmp_path / "backup_20250101.jsonl"
+    journal.write_text(
+        '{"status": "SUCCESS", "source": "/a"}\n{"status": "SUCC',
+        encoding='utf-8'
+    )
+    
+    assert load_json_log(journal) == [{"status": "SUCCESS", "source": "/a"}]
+
+
+def test_array_format_is_default(tmp_path):
+    logger = get_logger(name="test_array", log_dir=str(tmp_path), console_output=False)
+    logger.log_backup_success("/source/a.txt", "/backup/a.txt", 10, 0.1)
+    logger.log_backup_success("/source/b.txt", "/backup/b.txt", 20, 0.1)
+    
+    arrays = list(tmp_path.glob("backup_*.json"))
+    assert len(arrays) == 1
+    with open(arrays[0], encoding='utf-8') as f:
+        assert len(json.load(f)) == 2
+
+
+def test_journal_tail_is_fsynced_without_further_writes(tmp_path, monkeypatch):
+    """A record below the batch size is fsynced by the interval timer, and flush() syncs too."""
+    
+    import time
+    import backup_logger
+    
+    synced = []
+    real_fsync = backup_logger.os.fsync
+    monkeypatch.setattr(backup_logger.os, "fsync", lambda fd: (synced.append(fd), real_fsync(fd)))
+    
+    logger = get_logger(
+        name="test_journal_timer",
+        log_dir=str(tmp_path),
+        console_output=False,
+        json_format="jsonl",
+        fsync_batch_size=100,
+        fsync_interval=0.5
+    )
+    
+    logger.log_backup_success("/source/b.txt", "/backup/b.txt", 10, 0.1)
+    assert synced == []
+    deadline = time.monotonic() + 5
+    while not synced and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert len(synced) == 1
+    
+    logger.log_backup_success("/source/c.txt", "/backup/c.txt", 10, 0.1)
+    logger.flush()
+    assert len(synced) == 2
+    
+    time.sleep(0.6)  # the cancelled timer does not sync again
+    assert len(synced) == 2
+    logger.close()
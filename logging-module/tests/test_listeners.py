@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backup_logger import get_logger
+
+
+def test_listeners_receive_backup_events(tmp_path):
+    """Listeners see every backup event; a failing listener doesn't break logging."""
+    
+    logger = get_logger(
+        name="test_listeners",
+        log_dir=str(tmp_path),
+        console_output=False,
+        json_format="jsonl"
+    )
+    
+    events = []
+    
+    def broken_listener(event, data):
+        raise RuntimeError("metrics backend down")
+    
+    logger.add_listener(broken_listener)
+    logger.add_listener(lambda event, data: events.append((event, data)))
+    
+    logger.log_file_detected("/source/a.txt", "created")
+    logger.log_backup_start("/source/a.txt", 1000)
+    logger.log_backup_success("/source/a.txt", "s3://bucket/a_1.txt", 1000, 0.5)
+    logger.log_backup_failure("/source/b.txt", "S3 Client Error: SlowDown", 10, error_code="SlowDown")
+    
+    assert [event for event, _ in events] == [
+        'file_detected', 'backup_start', 'backup_success', 'backup_failure'
+    ]
+    assert events[2][1]['duration'] == 0.5
+    assert events[3][1]['error_code'] == "SlowDown"
+    
+    failed = logger.read_json_log()[-1]
+    assert failed['status'] == 'FAILED'
+    assert failed['error_code'] == "SlowDown"
+    logger.close()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import log_rotation
+from backup_logger import get_logger
+from log_rotation import LogMaintainer
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_size_rotation_compresses_segments_and_keeps_reads_complete(tmp_path):
+    """Full text and JSONL files roll to numbered segments that are gzipped in the background."""
+    
+    logger = get_logger(
+        name="test_rotation_size",
+        log_dir=str(tmp_path),
+        console_output=False,
+        json_format="jsonl",
+        max_bytes=2048,
+        compress_rotated=True
+    )
+    
+    for i in range(100):
+        logger.log_backup_success(f"/source/file_{i}.txt", f"s3://bucket/file_{i}.txt", i, 0.01)
+    
+    assert wait_for(lambda: list(tmp_path.glob("backup_*.1.jsonl.gz")))
+    assert wait_for(lambda: list(tmp_path.glob("backup_*.1.log.gz")))
+    assert not list(tmp_path.glob("backup_*.1.jsonl"))
+    
+    records = logger.read_json_log()
+    assert [r['source'] for r in records] == [f"/source/file_{i}.txt" for i in range(100)]
+    logger.close()
+
+
+def test_text_log_switches_file_at_midnight(tmp_path, monkeypatch):
+    """A long-running logger writes each day's text records into that day's file."""
+    
+    monkeypatch.setattr(log_rotation, "today", lambda: "20250101")
+    logger = get_logger(name="test_rotation_day", log_dir=str(tmp_path), console_output=False)
+    logger.log_system_event("first day")
+    
+    monkeypatch.setattr(log_rotation, "today", lambda: "20250102")
+    logger.log_system_event("second day")
+    logger.close()
+    
+    assert "first day" in (tmp_path / "backup_20250101.log").read_text(encoding='utf-8')
+    second = (tmp_path / "backup_20250102.log").read_text(encoding='utf-8')
+    assert "second day" in second and "first day" not in second
+
+
+def test_retention_removes_old_and_oversized_logs(tmp_path):
+    """Closed logs older than the retention window, then the oldest ones over the size cap, are deleted."""
+    
+    for name in ("backup_20200101.log", "backup_20200101.jsonl", "backup_20990101.1.log.gz"):
+        (tmp_path / name).write_bytes(b"x" * 1000)
+    (tmp_path / "backup_20990101.log").write_bytes(b"x" * 1000)
+    (tmp_path / "backup_history.db").write_bytes(b"x" * 5000)
+    
+    LogMaintainer(tmp_path, compress=False, retention_days=30).enforce_limits()
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "backup_20990101.1.log.gz", "backup_20990101.log", "backup_history.db"
+    ]
+    
+    LogMaintainer(tmp_path, compress=False, max_total_bytes=1500).enforce_limits()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["backup_20990101.log", "backup_history.db"]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backup_logger import StatsAggregator, get_logger
+
+
+def test_deduplicated_backups_are_tracked_separately(tmp_path):
+    """Skipped (unchanged) uploads are counted but don't affect the success rate."""
+    
+    logger = get_logger(
+        name="test_stats_dedup",
+        log_dir=str(tmp_path),
+        console_output=False,
+        json_format="jsonl"
+    )
+    
+    logger.log_backup_success("/source/a.txt", "s3://bucket/a_1.txt", 1000, 0.2)
+    logger.log_backup_deduplicated("/source/a.txt", "s3://bucket/a_1.txt", 1000)
+    logger.log_backup_deduplicated("/source/a.txt", "s3://bucket/a_1.txt", 1000)
+    
+    stats = logger.get_stats()
+    assert stats['total_backups'] == 1
+    assert stats['success_rate'] == 100.0
+    assert stats['deduplicated_backups'] == 2
+    assert stats['deduplicated_size'] == 2000
+    
+    statuses = [r['status'] for r in logger.read_json_log()]
+    assert statuses == ['SUCCESS', 'DEDUPLICATED', 'DEDUPLICATED']
+    logger.close()
+
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    """Per-thread shards keep exact totals when many threads log at once."""
+    
+    logger = get_logger(
+        name="test_stats_concurrent",
+        log_dir=str(tmp_path),
+        console_output=False,
+        json_format="jsonl"
+    )
+    
+    def worker():
+        for _ in range(500):
+            logger._stats.record_success(10)
+            logger._stats.record_failure()
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    stats = logger.get_stats()
+    assert stats['successful_backups'] == 4000
+    assert stats['failed_backups'] == 4000
+    assert stats['total_backups'] == 8000
+    assert stats['total_size'] == 40000
+    logger.close()
+
+
+def test_rolling_windows_expire_old_slots():
+    """Rolling rates only include backups inside each window."""
+    
+    now = [1000.0]
+    stats = StatsAggregator(slot_seconds=5, clock=lambda: now[0])
+    
+    stats.record_success(600)
+    stats.record_failure()
+    now[0] += 120
+    stats.record_success(60)
+    
+    rates = stats.rates()
+    assert rates['1m']['successful_backups'] == 1
+    assert rates['1m']['failed_backups'] == 0
+    assert rates['1m']['throughput_bytes_per_sec'] == 1.0
+    assert rates['5m']['successful_backups'] == 2
+    assert rates['5m']['success_rate'] == 66.67
+    
+    now[0] += 3600
+    assert stats.rates()['1h']['successful_backups'] == 0
+    assert stats.totals()['total_backups'] == 3
+
+
+def test_exited_threads_are_folded_into_retired_shard():
+    """Shards of finished threads are merged on snapshot without losing counts or rates."""
+    
+    now = [1000.0]
+    stats = StatsAggregator(slot_seconds=5, clock=lambda: now[0])
+    stats.record_success(10)
+    
+    def worker():
+        stats.record_success(10)
+        stats.record_failure()
+    
+    for _ in range(3):
+        threads = [threading.Thread(target=worker) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        totals = stats.totals()
+    
+    assert len(stats._shards) == 1  # only the main thread's shard is still live
+    assert totals['successful_backups'] == 61
+    assert totals['failed_backups'] == 60
+    assert totals['total_size'] == 610
+    
+    rates = stats.rates()['1m']
+    assert (rates['successful_backups'], rates['failed_backups']) == (61, 60)
+    
+    now[0] += 120
+    stats.record_success(10)
+    assert stats.rates()['1m']['successful_backups'] == 1
+    assert stats.totals()['total_backups'] == 122
@@ -0,0 +1,273 @@
+# async_runtime.py
+import asyncio
+import os
+import threading
+from contextlib import AsyncExitStack
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+except ImportError:  # aiobotocore là tùy chọn; không có thì upload chạy trên thread pool giới hạn
+    get_session = None
+
+from s3_connection import s3_config_kwargs
+
+MB = 1024 * 1024
+
+
+class ByteBudget:
+    """Semaphore có trọng số cho asyncio: giới hạn tổng số byte được giữ trong bộ nhớ cùng lúc."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._used = 0
+        self._condition = None  # tạo trong event loop ở lần acquire đầu tiên
+
+    async def acquire(self, nbytes):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            # Một body lớn hơn cả ngân sách vẫn được gửi khi không còn body nào khác đang giữ
+            await self._condition.wait_for(lambda: self._used == 0 or self._used + nbytes <= self.limit)
+            self._used += nbytes
+
+    async def release(self, nbytes):
+        async with self._condition:
+            self._used -= nbytes
+            self._condition.notify_all()
+
+
+class AsyncStorageClient:
+    """Upload không chặn event loop.
+
+    - File nhỏ đi theo nhánh put_object đơn giản: gửi bằng client aiobotocore (nếu có),
+      nhiều upload cùng chờ mạng trên một luồng duy nhất. Nội dung các file này nằm trong
+      bộ nhớ khi gửi, nên tổng kích thước bị giới hạn bởi `inline_budget` byte.
+    - File lớn / chunk / nén dùng lại StorageClient.upload trên thread pool (số luồng cố định).
+    """
+
+    def __init__(self, storage_client, executor, max_connections=100, inline_put_max=8 * MB,
+                 inline_budget=128 * MB):
+        self.storage_client = storage_client
+        self.executor = executor
+        self.max_connections = max_connections
+        self.inline_put_max = inline_put_max
+        self.inline_budget = ByteBudget(inline_budget)
+
+        self._stack = None
+        self._client = None
+
+    @property
+    def is_native(self):
+        return self._client is not None
+
+    async def start(self):
+        if get_session is None:
+            return
+        self._stack = AsyncExitStack()
+        self._client = await self._stack.enter_async_context(
+            get_session().create_client(
+                's3',
+                endpoint_url=self.storage_client.endpoint,
+                aws_access_key_id=self.storage_client.access_key,
+                aws_secret_access_key=self.storage_client.secret_key,
+                config=AioConfig(**s3_config_kwargs(self.max_connections))
+            )
+        )
+
+    async def close(self):
+        if self._stack is not None:
+            await self._stack.aclose()
+            self._stack = None
+            self._client = None
+
+    def _plan(self, file_path):
+        file_size = os.path.getsize(file_path)
+        mode = self.storage_client.upload_mode(file_path, file_size)
+        inline = self._client is not None and mode == "put" and file_size <= self.inline_put_max
+        return mode, file_size, inline
+
+    def _read_inline(self, file_path):
+        with open(file_path, "rb") as f:
+            data = f.read()
+        # Chờ rate limiter ngay trên executor để không chặn event loop
+        self.storage_client.throttle(len(data))
+        return data
+
+    async def upload(self, file_path, object_name=None):
+        """Giống StorageClient.upload, trả về cùng định dạng kết quả."""
+        loop = asyncio.get_running_loop()
+        # Đọc mẫu nén / nội dung file nhỏ trên executor: đọc đĩa là thao tác chặn
+        mode, file_size, inline = await loop.run_in_executor(self.executor, self._plan, file_path)
+        if not inline:
+            return await loop.run_in_executor(
+                self.executor, self.storage_client.upload, file_path, object_name, mode
+            )
+
+        # Chỉ đọc file vào bộ nhớ khi còn ngân sách byte cho body đang gửi
+        await self.inline_budget.acquire(file_size)
+        try:
+            data = await loop.run_in_executor(self.executor, self._read_inline, file_path)
+            file_name = object_name or os.path.basename(file_path)
+            versioned_key = self.storage_client.versioned_key_for(file_name)
+            await self._client.put_object(
+                Bucket=self.storage_client.bucket_name,
+                Key=versioned_key,
+                Body=data
+            )
+            return self.storage_client.upload_result(file_name, versioned_key, len(data))
+        finally:
+            await self.inline_budget.release(file_size)
+
+
+class AsyncUploadRuntime:
+    """Runtime asyncio thay cho UploadQueue: cùng giao diện start/submit/qsize/shutdown.
+
+    Event loop chạy trên một luồng riêng. Sự kiện file (từ observer, scheduler, reconciler)
+    được đưa vào asyncio.Queue có giới hạn; mỗi file là một coroutine, số upload đang chạy
+    được giới hạn bởi asyncio.Semaphore(max_in_flight). Các job của cùng một đường dẫn
+    chạy tuần tự; sự kiện đến trong lúc file đang upload được gộp thành một lần backup sau đó.
+    """
+
+    _STOP = object()
+
+    def __init__(self, storage_client, max_in_flight=256, max_size=1000, io_workers=8,
+                 inline_put_max=8 * MB, inline_budget=128 * MB, logger=None):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_size = max_size
+        self.logger = logger
+
+        # Hash, dedup, đọc file và upload file lớn chạy trên pool này
+        self._executor = ThreadPoolExecutor(max_workers=max(1, io_workers), thread_name_prefix="async-io")
+        self.storage = AsyncStorageClient(
+            storage_client,
+            self._executor,
+            max_connections=self.max_in_flight,
+            inline_put_max=inline_put_max,
+            inline_budget=inline_budget
+        )
+
+        self._loop = None
+        self._queue = None
+        self._thread = None
+        self._handler = None
+        self._ready = threading.Event()
+        self._accepting = False
+        self._active_paths = set()   # Đường dẫn đang có coroutine upload
+        self._rerun_paths = set()    # Đường dẫn có sự kiện mới trong lúc đang upload
+        self._tasks = set()
+
+    def start(self, handler):
+        """Khởi động event loop; handler là BackupEventHandler (prepare/complete/fail_backup)."""
+        self._handler = handler
+        self._thread = threading.Thread(target=self._run_loop, name="asyncio-uploader", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        self._accepting = True
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+            self._executor.shutdown(wait=True)
+
+    async def _main(self):
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        try:
+            await self.storage.start()
+        except Exception as e:
+            if self.logger:
+                self.logger.log_system_event(f"Could not create aiobotocore client: {e}", "WARNING")
+        if self.logger:
+            backend = "aiobotocore" if self.storage.is_native else "thread pool (aiobotocore not available)"
+            self.logger.log_system_event(
+                f"Asyncio upload runtime started: max {self.max_in_flight} in flight, small files via {backend}.",
+                "INFO"
+            )
+        self._ready.set()
+
+        try:
+            while True:
+                file_path = await self._queue.get()
+                if file_path is self._STOP:
+                    break
+                if file_path in self._active_paths:
+                    # Đang upload: backup lại một lần sau khi xong để lấy nội dung mới nhất
+                    self._rerun_paths.add(file_path)
+                    continue
+
+                await semaphore.acquire()
+                self._active_paths.add(file_path)
+                task = asyncio.create_task(self._process(file_path, semaphore))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            await self.storage.close()
+
+    async def _process(self, file_path, semaphore):
+        try:
+            while True:
+                await self._backup(file_path)
+                if file_path not in self._rerun_paths:
+                    break
+                self._rerun_paths.discard(file_path)
+        finally:
+            self._active_paths.discard(file_path)
+            semaphore.release()
+
+    async def _backup(self, file_path):
+        loop = asyncio.get_running_loop()
+        job = None
+        try:
+            job = await loop.run_in_executor(self._executor, self._handler.prepare_backup, file_path)
+            if job is None:
+                return
+            response = await self.storage.upload(file_path, job['object_name'])
+            await loop.run_in_executor(self._executor, self._handler.complete_backup, job, response)
+        except Exception as e:
+            # Ghi log / retry queue (SQLite) là I/O chặn: chạy trên thread pool như các bước khác
+            await loop.run_in_executor(
+                self._executor, self._handler.fail_backup, file_path, e, job['file_size'] if job else None
+            )
+
+    def submit(self, file_path, timeout=None):
+        """Đưa file vào event loop (gọi từ luồng khác). Chặn khi hàng đợi đầy.
+
+        Trả về False nếu runtime đã dừng hoặc hết thời gian chờ.
+        """
+        if not self._accepting:
+            return False
+        future = asyncio.run_coroutine_threadsafe(self._queue.put(file_path), self._loop)
+        try:
+            future.result(timeout)
+            return True
+        except FutureTimeoutError:
+            future.cancel()
+            if self.logger:
+                self.logger.log_system_event(
+                    f"Upload queue full ({self.max_size}), dropping job for {file_path}",
+                    "WARNING"
+                )
+            return False
+
+    def qsize(self):
+        """Số file đang chờ + đang upload."""
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return queued + len(self._active_paths)
+
+    def shutdown(self, wait=True):
+        """Ngừng nhận job mới; upload nốt các job đã nhận rồi dừng event loop."""
+        if not self._accepting:
+            return
+        self._accepting = False
+        asyncio.run_coroutine_threadsafe(self._queue.put(self._STOP), self._loop)
+        if wait:
+            self._thread.join()
@@ -1,9 +1,213 @@
+import gzip
 import logging
+import logging.handlers
 import os
 import json
+import queue
+import threading
+import time
+import weakref
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Callable, Tuple
+
+from history_index import HistoryIndex
+from log_rotation import DailyRotatingFileHandler, LogMaintainer, day_segments, next_segment_path
+
+JSON_LOG_FORMATS = ("array", "jsonl")
+
+STAT_FIELDS = (
+    'total_backups',
+    'successful_backups',
+    'failed_backups',
+    'deduplicated_backups',
+    'total_size',
+    'deduplicated_size'
+)
+
+ROLLING_WINDOWS = {'1m': 60, '5m': 300, '1h': 3600}
+
+OVERFLOW_POLICIES = ("block", "drop")
+
+JSON_WRITE_BATCH_SIZE = 500
+
+
+def load_json_log(file_path) -> List[Dict[str, Any]]:
+    file_path = Path(file_path)
+    if not file_path.exists():
+        return []
+    
+    compressed = file_path.suffix == '.gz'
+    kind = Path(file_path.stem).suffix if compressed else file_path.suffix
+    opener = gzip.open if compressed else open
+    with opener(file_path, 'rt', encoding='utf-8') as f:
+        if kind != '.jsonl':
+            return json.load(f)
+        
+        records = []
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn last line from a crash mid-write is skipped, not fatal
+                continue
+        return records
+
+
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue, block: bool, on_drop: Callable[[], None]):
+        super().__init__(log_queue)
+        self.block = block
+        self.on_drop = on_drop
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put(record, block=self.block)
+        except queue.Full:
+            self.on_drop()
+
+
+class _StatsShard:
+    __slots__ = ('counters', 'slots', 'owner')
+    
+    def __init__(self, slot_count: int, owner: Optional[threading.Thread] = None):
+        self.counters = dict.fromkeys(STAT_FIELDS, 0)
+        self.slots = [(-1, 0, 0, 0)] * slot_count
+        self.owner = weakref.ref(owner) if owner is not None else None
+    
+    def is_retired(self) -> bool:
+        owner = self.owner() if self.owner is not None else None
+        return owner is None or not owner.is_alive()
+    
+    def merge(self, other: '_StatsShard'):
+        for field, value in other.counters.items():
+            self.counters[field] += value
+        for index, (slot_id, successful, failed, size) in enumerate(other.slots):
+            current_id, current_ok, current_failed, current_size = self.slots[index]
+            if slot_id == current_id:
+                self.slots[index] = (
+                    slot_id,
+                    current_ok + successful,
+                    current_failed + failed,
+                    current_size + size
+                )
+            elif slot_id > current_id:
+                self.slots[index] = (slot_id, successful, failed, size)
+
+
+class StatsAggregator:
+    def __init__(
+        self,
+        slot_seconds: int = 5,
+        horizon_seconds: int = 3600,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.slot_seconds = slot_seconds
+        self.slot_count = horizon_seconds // slot_seconds + 1
+        self.clock = clock
+        self._local = threading.local()
+        self._shards: List[_StatsShard] = []
+        # Shards of threads that have exited are folded in here so worker churn
+        # doesn't grow the shard list (and every snapshot) without bound
+        self._retired = _StatsShard(self.slot_count)
+        self._shards_lock = threading.Lock()
+    
+    def _shard(self) -> _StatsShard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = _StatsShard(self.slot_count, threading.current_thread())
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+    
+    def _record_window(self, shard: _StatsShard, successful: int, failed: int, size: int):
+        slot_id = int(self.clock() // self.slot_seconds)
+        index = slot_id % self.slot_count
+        current_id, current_ok, current_failed, current_size = shard.slots[index]
+        if current_id != slot_id:
+            current_ok = current_failed = current_size = 0
+        shard.slots[index] = (
+            slot_id,
+            current_ok + successful,
+            current_failed + failed,
+            current_size + size
+        )
+    
+    def record_success(self, size: int):
+        shard = self._shard()
+        counters = shard.counters
+        counters['total_backups'] += 1
+        counters['successful_backups'] += 1
+        counters['total_size'] += size
+        self._record_window(shard, 1, 0, size)
+    
+    def record_failure(self):
+        shard = self._shard()
+        counters = shard.counters
+        counters['total_backups'] += 1
+        counters['failed_backups'] += 1
+        self._record_window(shard, 0, 1, 0)
+    
+    def record_deduplicated(self, size: int):
+        counters = self._shard().counters
+        counters['deduplicated_backups'] += 1
+        counters['deduplicated_size'] += size
+    
+    def _snapshot_shards(self) -> List[Tuple[Dict[str, int], List[tuple]]]:
+        # Folding and copying happen under the lock so a concurrent snapshot can't
+        # count a retired shard both on its own and inside the retired totals
+        with self._shards_lock:
+            live = []
+            for shard in self._shards:
+                if shard.is_retired():
+                    self._retired.merge(shard)
+                else:
+                    live.append(shard)
+            self._shards = live
+            return [
+                (dict(shard.counters), list(shard.slots))
+                for shard in [self._retired] + live
+            ]
+    
+    def totals(self) -> Dict[str, int]:
+        totals = dict.fromkeys(STAT_FIELDS, 0)
+        for counters, _ in self._snapshot_shards():
+            for field, value in counters.items():
+                totals[field] += value
+        return totals
+    
+    def rates(self) -> Dict[str, Dict[str, Any]]:
+        current_id = int(self.clock() // self.slot_seconds)
+        sums = {name: [0, 0, 0] for name in ROLLING_WINDOWS}
+        
+        for _, slots in self._snapshot_shards():
+            for slot_id, successful, failed, size in slots:
+                age = current_id - slot_id
+                if slot_id < 0 or age < 0:
+                    continue
+                for name, seconds in ROLLING_WINDOWS.items():
+                    if age * self.slot_seconds < seconds:
+                        window = sums[name]
+                        window[0] += successful
+                        window[1] += failed
+                        window[2] += size
+        
+        rates = {}
+        for name, (successful, failed, size) in sums.items():
+            attempts = successful + failed
+            rates[name] = {
+                'successful_backups': successful,
+                'failed_backups': failed,
+                'total_size': size,
+                'success_rate': round(successful / attempts * 100, 2) if attempts else 0,
+                'throughput_bytes_per_sec': round(size / ROLLING_WINDOWS[name], 2)
+            }
+        return rates
+
 
 class BackupLogger:
     def __init__(
@@ -11,8 +215,30 @@ class BackupLogger:
         name: str = "backup_system",
         log_dir: str = "./logs",
         log_level: str = "INFO",
-        console_output: bool = True
+        console_output: bool = True,
+        json_format: str = "array",
+        fsync_batch_size: int = 50,
+        fsync_interval: float = 1.0,
+        history_db: Optional[str] = None,
+        async_writes: bool = False,
+        queue_size: int = 10000,
+        overflow_policy: str = "block",
+        max_bytes: int = 0,
+        compress_rotated: bool = False,
+        retention_days: int = 0,
+        max_total_bytes: int = 0
     ):
+        if json_format not in JSON_LOG_FORMATS:
+            raise ValueError(
+                f"Unknown json_format '{json_format}', "
+                f"expected one of {JSON_LOG_FORMATS}"
+            )
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow_policy '{overflow_policy}', "
+                f"expected one of {OVERFLOW_POLICIES}"
+            )
+        
         self.name = name
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(parents=True, exist_ok=True)
@@ -23,9 +249,24 @@ class BackupLogger:
         if self.logger.handlers:
             self.logger.handlers.clear()
         
-        log_file = self.log_dir / f"backup_{datetime.now().strftime('%Y%m%d')}.log"
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        self.max_bytes = max_bytes
+        self._maintainer = None
+        if compress_rotated or retention_days or max_total_bytes:
+            self._maintainer = LogMaintainer(
+                self.log_dir,
+                compress=compress_rotated,
+                retention_days=retention_days,
+                max_total_bytes=max_total_bytes,
+                is_active=self._is_active_log,
+                logger=self.logger
+            )
+        
+        handlers: List[logging.Handler] = []
+        file_handler = DailyRotatingFileHandler(
+            self.log_dir, max_bytes=max_bytes, on_rotate=self._on_rotate
+        )
         file_handler.setLevel(logging.DEBUG)
+        self._file_handler = file_handler
         
         if console_output:
             console_handler = logging.StreamHandler()
@@ -36,38 +277,108 @@ class BackupLogger:
                 datefmt='%H:%M:%S'
             )
             console_handler.setFormatter(console_formatter)
-            self.logger.addHandler(console_handler)
+            handlers.append(console_handler)
         
         file_formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         file_handler.setFormatter(file_formatter)
-        self.logger.addHandler(file_handler)
+        handlers.append(file_handler)
         
-        self.stats = {
-            'total_backups': 0,
-            'successful_backups': 0,
-            'failed_backups': 0,
-            'total_size': 0
-        }
+        self.async_writes = async_writes
+        self.overflow_policy = overflow_policy
+        self.dropped_records = 0
+        self._drop_lock = threading.Lock()
+        self._handlers = handlers
+        self._text_queue = None
+        self._text_listener = None
+        self._json_queue = None
+        self._json_writer = None
+        
+        if async_writes:
+            self._text_queue = queue.Queue(maxsize=queue_size)
+            self.logger.addHandler(_BoundedQueueHandler(
+                self._text_queue, overflow_policy == "block", self._count_drop
+            ))
+            self._text_listener = logging.handlers.QueueListener(
+                self._text_queue, *handlers, respect_handler_level=True
+            )
+            self._text_listener.start()
+        else:
+            for handler in handlers:
+                self.logger.addHandler(handler)
+        
+        self._stats = StatsAggregator()
+        
+        self.json_format = json_format
+        self.fsync_batch_size = max(1, fsync_batch_size)
+        self.fsync_interval = fsync_interval
+        self._json_lock = threading.Lock()
+        self._journal = None
+        self._journal_day = None
+        self._journal_path = None
+        self._unsynced_records = 0
+        self._last_fsync = time.monotonic()
+        self._fsync_timer = None
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        
+        self._history = None
+        if history_db:
+            self._history = HistoryIndex(history_db)
+            try:
+                imported = self._history.import_json_logs(self.log_dir)
+                if imported:
+                    self.logger.info(f"History index: imported {imported} records from JSON logs")
+            except Exception as e:
+                self.logger.warning(f"Failed to import JSON logs into history index: {e}")
+        
+        if self._maintainer is not None:
+            self._maintainer.start()
+        
+        if async_writes:
+            self._json_queue = queue.Queue(maxsize=queue_size)
+            self._json_writer = threading.Thread(
+                target=self._json_writer_loop,
+                name=f"{name}-json-writer",
+                daemon=True
+            )
+            self._json_writer.start()
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self._stats.totals()
+    
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _notify(self, event: str, **data):
+        for listener in self._listeners:
+            try:
+                listener(event, data)
+            except Exception as e:
+                self.logger.debug(f"Log listener failed on {event}: {e}")
     
     def log_backup_start(self, file_path: str, file_size: int):
         self.logger.info(
             f"Starting backup: {file_path} "
             f"(Size: {self._format_size(file_size)})"
         )
+        self._notify('backup_start', file_path=file_path, file_size=file_size)
     
     def log_backup_success(
         self,
         file_path: str,
         destination: str,
         file_size: int,
-        duration: float
+        duration: float,
+        stored_size: Optional[int] = None
     ):
-        self.stats['total_backups'] += 1
-        self.stats['successful_backups'] += 1
-        self.stats['total_size'] += file_size
+        self._stats.record_success(file_size)
         
         self.logger.info(
             f"✓ Backup SUCCESS: {file_path} -> {destination} | "
@@ -75,7 +386,7 @@ class BackupLogger:
             f"Duration: {duration:.2f}s"
         )
         
-        self._write_json_log({
+        log_data = {
             'timestamp': datetime.now().isoformat(),
             'status': 'SUCCESS',
             'source': file_path,
@@ -83,16 +394,28 @@ class BackupLogger:
             'size_bytes': file_size,
             'size_formatted': self._format_size(file_size),
             'duration_seconds': round(duration, 2)
-        })
+        }
+        if stored_size is not None:
+            # Size of the object written at destination (compressed / manifest)
+            log_data['stored_size_bytes'] = stored_size
+        self._write_json_log(log_data)
+        self._notify(
+            'backup_success',
+            file_path=file_path,
+            destination=destination,
+            file_size=file_size,
+            duration=duration,
+            stored_size=stored_size
+        )
     
     def log_backup_failure(
         self,
         file_path: str,
         error: str,
-        file_size: Optional[int] = None
+        file_size: Optional[int] = None,
+        error_code: Optional[str] = None
     ):
-        self.stats['total_backups'] += 1
-        self.stats['failed_backups'] += 1
+        self._stats.record_failure()
         
         size_info = f"Size: {self._format_size(file_size)} | " if file_size else ""
         
@@ -102,37 +425,87 @@ class BackupLogger:
             f"Error: {error}"
         )
         
-        self._write_json_log({
+        log_data = {
             'timestamp': datetime.now().isoformat(),
             'status': 'FAILED',
             'source': file_path,
             'size_bytes': file_size,
             'size_formatted': self._format_size(file_size) if file_size else None,
             'error': error
+        }
+        if error_code:
+            log_data['error_code'] = error_code
+        self._write_json_log(log_data)
+        self._notify(
+            'backup_failure',
+            file_path=file_path,
+            error=error,
+            file_size=file_size,
+            error_code=error_code
+        )
+    
+    def log_backup_deduplicated(
+        self,
+        file_path: str,
+        destination: Optional[str],
+        file_size: int
+    ):
+        self._stats.record_deduplicated(file_size)
+        
+        self.logger.info(
+            f"= Backup DEDUPLICATED: {file_path} unchanged since {destination} | "
+            f"Size: {self._format_size(file_size)}"
+        )
+        
+        self._write_json_log({
+            'timestamp': datetime.now().isoformat(),
+            'status': 'DEDUPLICATED',
+            'source': file_path,
+            'destination': destination,
+            'size_bytes': file_size,
+            'size_formatted': self._format_size(file_size)
         })
+        self._notify(
+            'backup_deduplicated',
+            file_path=file_path,
+            destination=destination,
+            file_size=file_size
+        )
     
     def log_file_detected(self, file_path: str, event_type: str):
         self.logger.info(f"File {event_type}: {file_path}")
+        self._notify('file_detected', file_path=file_path, event_type=event_type)
     
     def log_system_event(self, message: str, level: str = "INFO"):
         log_func = getattr(self.logger, level.lower())
         log_func(message)
     
     def get_stats(self) -> Dict[str, Any]:
-        if self.stats['total_backups'] > 0:
+        totals = self._stats.totals()
+        if totals['total_backups'] > 0:
             success_rate = (
-                self.stats['successful_backups'] / 
-                self.stats['total_backups'] * 100
+                totals['successful_backups'] / 
+                totals['total_backups'] * 100
             )
         else:
             success_rate = 0
         
         return {
-            **self.stats,
+            **totals,
             'success_rate': round(success_rate, 2),
-            'total_size_formatted': self._format_size(self.stats['total_size'])
+            'total_size_formatted': self._format_size(totals['total_size']),
+            'deduplicated_size_formatted': self._format_size(totals['deduplicated_size']),
+            'rolling': self.get_rolling_stats()
         }
     
+    def get_rolling_stats(self) -> Dict[str, Dict[str, Any]]:
+        rates = self._stats.rates()
+        for window in rates.values():
+            window['throughput_formatted'] = (
+                f"{self._format_size(window['throughput_bytes_per_sec'])}/s"
+            )
+        return rates
+    
     def print_stats(self):
         stats = self.get_stats()
         self.logger.info("=" * 50)
@@ -143,7 +516,20 @@ class BackupLogger:
         self.logger.info(f"Failed: {stats['failed_backups']}")
         self.logger.info(f"Success rate: {stats['success_rate']}%")
         self.logger.info(f"Total size backed up: {stats['total_size_formatted']}")
+        self.logger.info(
+            f"Deduplicated (skipped): {stats['deduplicated_backups']} "
+            f"({stats['deduplicated_size_formatted']} saved)"
+        )
+        for name, window in stats['rolling'].items():
+            self.logger.info(
+                f"Last {name}: {window['successful_backups']} ok / "
+                f"{window['failed_backups']} failed, "
+                f"{window['throughput_formatted']}"
+            )
+        if self.dropped_records:
+            self.logger.info(f"Dropped log records (queue full): {self.dropped_records}")
         self.logger.info("=" * 50)
+        self.flush()
     
     def _format_size(self, size_bytes: int) -> str:
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
@@ -152,35 +538,268 @@ class BackupLogger:
             size_bytes /= 1024.0
         return f"{size_bytes:.2f} PB"
     
+    def read_json_log(self, date_str: Optional[str] = None) -> List[Dict[str, Any]]:
+        day = date_str or datetime.now().strftime('%Y%m%d')
+        
+        if self._json_queue is not None:
+            self._json_queue.join()
+        with self._json_lock:
+            if self._journal is not None:
+                self._journal.flush()
+        
+        records = []
+        for kind in ('json', 'jsonl'):
+            for path in day_segments(self.log_dir, day, kind):
+                # The maintainer may have finished gzipping this segment since it was listed;
+                # the .gz is complete before the plain file is removed
+                if not path.exists() and path.suffix != '.gz':
+                    path = path.with_name(path.name + '.gz')
+                records.extend(load_json_log(path))
+        return records
+    
+    def export_json_log(
+        self,
+        date_str: Optional[str] = None,
+        output_path: Optional[str] = None
+    ) -> Path:
+        day = date_str or datetime.now().strftime('%Y%m%d')
+        output = Path(output_path) if output_path else self.log_dir / f"backup_{day}.export.json"
+        
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(self.read_json_log(day), f, indent=2, ensure_ascii=False)
+        return output
+    
+    def query_history(self, **filters) -> Dict[str, Any]:
+        if self._history is None:
+            raise RuntimeError("History index is not enabled (history_db is not set)")
+        if self._json_queue is not None:
+            self._json_queue.join()
+        return self._history.query(**filters)
+    
+    def flush(self):
+        if self._json_queue is not None:
+            self._json_queue.join()
+        if self._text_queue is not None:
+            self._text_queue.join()
+        for handler in self._handlers:
+            handler.flush()
+        with self._json_lock:
+            if self._journal is not None and self._unsynced_records:
+                self._fsync_journal()
+    
+    def close(self):
+        if self._json_writer is not None:
+            self._json_queue.put(None)
+            self._json_writer.join()
+            self._json_writer = None
+            self._json_queue = None
+        if self._text_listener is not None:
+            self._text_listener.stop()
+            self._text_listener = None
+            self._text_queue = None
+            self.logger.handlers.clear()
+            for handler in self._handlers:
+                self.logger.addHandler(handler)
+        with self._json_lock:
+            self._close_journal()
+        if self._history is not None:
+            self._history.close()
+            self._history = None
+        for handler in self._handlers:
+            handler.flush()
+        if self._maintainer is not None:
+            self._maintainer.stop()
+            self._maintainer = None
+    
+    def _is_active_log(self, path: Path) -> bool:
+        path = os.path.abspath(path)
+        return (
+            path == self._file_handler.baseFilename or
+            (self._journal_path is not None and path == str(self._journal_path))
+        )
+    
+    def _on_rotate(self, path: Path):
+        if self._maintainer is not None:
+            self._maintainer.submit(path)
+    
+    def _count_drop(self):
+        with self._drop_lock:
+            self.dropped_records += 1
+    
     def _write_json_log(self, log_data: Dict[str, Any]):
-        json_log_file = self.log_dir / f"backup_{datetime.now().strftime('%Y%m%d')}.json"
+        if self._json_queue is None:
+            self._write_json_records([log_data])
+            return
         
         try:
-            if json_log_file.exists():
-                with open(json_log_file, 'r', encoding='utf-8') as f:
-                    logs = json.load(f)
-            else:
-                logs = []
-            
-            logs.append(log_data)
+            self._json_queue.put(log_data, block=self.overflow_policy == "block")
+        except queue.Full:
+            self._count_drop()
+    
+    def _json_writer_loop(self):
+        while True:
+            batch = [self._json_queue.get()]
+            while len(batch) < JSON_WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._json_queue.get_nowait())
+                except queue.Empty:
+                    break
             
-            with open(json_log_file, 'w', encoding='utf-8') as f:
-                json.dump(logs, f, indent=2, ensure_ascii=False)
+            records = [record for record in batch if record is not None]
+            if records:
+                self._write_json_records(records)
+            for _ in batch:
+                self._json_queue.task_done()
+            if len(records) < len(batch):
+                return
+    
+    def _write_json_records(self, records: List[Dict[str, Any]]):
+        if self._history is not None:
+            try:
+                self._history.record_many(records)
+            except Exception as e:
+                self.logger.warning(f"Failed to write history index: {e}")
+        
+        if self.json_format == "jsonl":
+            self._append_json_lines(records)
+            return
+        
+        json_log_file = self.log_dir / f"backup_{datetime.now().strftime('%Y%m%d')}.json"
+        
+        try:
+            with self._json_lock:
+                if json_log_file.exists():
+                    with open(json_log_file, 'r', encoding='utf-8') as f:
+                        logs = json.load(f)
+                else:
+                    logs = []
+                
+                logs.extend(records)
+                
+                with open(json_log_file, 'w', encoding='utf-8') as f:
+                    json.dump(logs, f, indent=2, ensure_ascii=False)
+        
+        except Exception as e:
+            self.logger.warning(f"Failed to write JSON log: {e}")
+    
+    def _append_json_lines(self, records: List[Dict[str, Any]]):
+        day = datetime.now().strftime('%Y%m%d')
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        
+        try:
+            with self._json_lock:
+                if self._journal is None or self._journal_day != day:
+                    self._rotate_journal(rename=False)
+                    self._journal_path = Path(os.path.abspath(self.log_dir / f"backup_{day}.jsonl"))
+                    self._journal = open(self._journal_path, 'a', encoding='utf-8')
+                    self._journal_day = day
+                
+                self._journal.write(lines)
+                self._journal.flush()
+                self._unsynced_records += len(records)
+                
+                elapsed = time.monotonic() - self._last_fsync
+                if (self._unsynced_records >= self.fsync_batch_size or
+                        elapsed >= self.fsync_interval):
+                    self._fsync_journal()
+                elif self._fsync_timer is None:
+                    # No further write may come to trigger the interval check, so a timer
+                    # syncs the tail of a burst once fsync_interval has passed
+                    self._fsync_timer = threading.Timer(
+                        self.fsync_interval - elapsed, self._on_fsync_timer
+                    )
+                    self._fsync_timer.daemon = True
+                    self._fsync_timer.start()
+                
+                if self.max_bytes and self._journal.tell() >= self.max_bytes:
+                    self._rotate_journal(rename=True)
         
         except Exception as e:
             self.logger.warning(f"Failed to write JSON log: {e}")
+    
+    def _fsync_journal(self):
+        os.fsync(self._journal.fileno())
+        self._unsynced_records = 0
+        self._last_fsync = time.monotonic()
+        self._cancel_fsync_timer()
+    
+    def _cancel_fsync_timer(self):
+        if self._fsync_timer is not None:
+            self._fsync_timer.cancel()
+            self._fsync_timer = None
+    
+    def _on_fsync_timer(self):
+        with self._json_lock:
+            # A timer cancelled while waiting for the lock must not clear its replacement
+            if self._fsync_timer is not threading.current_thread():
+                return
+            self._fsync_timer = None
+            if self._journal is None or not self._unsynced_records:
+                return
+            try:
+                self._fsync_journal()
+            except OSError as e:
+                self.logger.warning(f"Failed to fsync JSON log: {e}")
+    
+    def _rotate_journal(self, rename: bool):
+        path = self._journal_path
+        if self._journal is None or path is None:
+            return
+        self._close_journal()
+        if rename:
+            closed = next_segment_path(path)
+            os.replace(path, closed)
+            path = closed
+        self._on_rotate(path)
+    
+    def _close_journal(self):
+        self._cancel_fsync_timer()
+        if self._journal is None:
+            return
+        try:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        finally:
+            self._journal.close()
+            self._journal = None
+            self._journal_day = None
+            self._journal_path = None
+            self._unsynced_records = 0
+            self._last_fsync = time.monotonic()
 
 
 def get_logger(
     name: str = "backup_system",
     log_dir: str = "./logs",
     log_level: str = "INFO",
-    console_output: bool = True
+    console_output: bool = True,
+    json_format: str = "array",
+    fsync_batch_size: int = 50,
+    fsync_interval: float = 1.0,
+    history_db: Optional[str] = None,
+    async_writes: bool = False,
+    queue_size: int = 10000,
+    overflow_policy: str = "block",
+    max_bytes: int = 0,
+    compress_rotated: bool = False,
+    retention_days: int = 0,
+    max_total_bytes: int = 0
 ) -> BackupLogger:
     
     return BackupLogger(
         name=name,
         log_dir=log_dir,
         log_level=log_level,
-        console_output=console_output
+        console_output=console_output,
+        json_format=json_format,
+        fsync_batch_size=fsync_batch_size,
+        fsync_interval=fsync_interval,
+        history_db=history_db,
+        async_writes=async_writes,
+        queue_size=queue_size,
+        overflow_policy=overflow_policy,
+        max_bytes=max_bytes,
+        compress_rotated=compress_rotated,
+        retention_days=retention_days,
+        max_total_bytes=max_total_bytes
     )
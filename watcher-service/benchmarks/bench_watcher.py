@@ -0,0 +1,334 @@
+# bench_watcher.py
+"""Benchmark luồng backup của Watcher với S3 giả lập trong tiến trình.
+
+Mỗi workload dựng một pipeline mới (CoalescingScheduler -> hàng đợi upload ->
+BackupEventHandler -> StorageClient với FakeS3Client), bắn sự kiện watchdog giả lập
+và đo tới khi hàng đợi đã upload xong:
+
+    python benchmarks/bench_watcher.py
+    python benchmarks/bench_watcher.py --workloads small --small-count 10000 --runtime asyncio
+    python benchmarks/bench_watcher.py --latency-ms 20 --json results.json
+
+Kết quả: sự kiện/giây, MB/giây, p50/p99 độ trễ từ sự kiện đầu tiên tới khi backup xong,
+và chi phí mỗi lần gọi BackupLogger._write_json_log (đồng bộ và bất đồng bộ).
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "logging-module"))
+from watchdog.events import FileCreatedEvent, FileModifiedEvent
+
+import async_runtime
+from async_runtime import AsyncUploadRuntime, MB
+from backup_logger import get_logger
+from event_scheduler import CoalescingScheduler
+from file_index import FileIndex
+from storage_client import StorageClient
+from upload_queue import UploadQueue
+from watcher_service import BackupEventHandler
+from fake_s3 import FakeS3Client
+
+BENCH_BUCKET = "benchmark-bucket"
+WORKLOADS = ("small", "large", "rewrites")
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def write_file(path, size, seed):
+    """Ghi file `size` byte; nội dung khác nhau theo seed để dedup không bỏ qua."""
+    block = (f"{seed:016d}".encode() * (MB // 16 + 1))[:MB]
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:min(remaining, MB)])
+            remaining -= MB
+
+
+class LatencyRecorder:
+    """Listener của BackupLogger: thời gian từ file_detected đầu tiên tới khi backup xong."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._detected = {}
+        self.latencies = []
+        self.completed = 0
+        self.failed = 0
+
+    def __call__(self, event, data):
+        now = time.perf_counter()
+        with self._lock:
+            if event == 'file_detected':
+                self._detected.setdefault(data['file_path'], now)
+            elif event in ('backup_success', 'backup_deduplicated', 'backup_failure'):
+                started = self._detected.pop(data['file_path'], None)
+                if event == 'backup_failure':
+                    self.failed += 1
+                    return
+                self.completed += 1
+                if started is not None:
+                    self.latencies.append(now - started)
+
+
+class Pipeline:
+    """Các thành phần của WatcherOrchestrator, nhưng nói chuyện với FakeS3Client."""
+
+    def __init__(self, args, root, name):
+        self.watch_dir = os.path.join(root, "source", name)
+        os.makedirs(self.watch_dir)
+        self.fake_s3 = FakeS3Client(latency=args.latency_ms / 1000.0, bandwidth=args.bandwidth_mbps * MB)
+
+        self.logger = get_logger(
+            name=f"bench_{name}",
+            log_dir=os.path.join(root, "logs", name),
+            log_level="WARNING",
+            console_output=False,
+            json_format="jsonl",
+            history_db=os.path.join(root, "logs", name, "backup_history.db"),
+            async_writes=args.async_logging
+        )
+        self.recorder = LatencyRecorder()
+        self.logger.add_listener(self.recorder)
+
+        self.storage_client = StorageClient(
+            "http://benchmark.invalid", "bench", "bench", BENCH_BUCKET,
+            multipart_threshold=args.multipart_threshold_mb * MB
+        )
+        self.storage_client.s3_client = self.fake_s3
+
+        if args.runtime == "asyncio":
+            self.upload_queue = AsyncUploadRuntime(self.storage_client, logger=self.logger)
+        else:
+            self.upload_queue = UploadQueue(workers=args.workers, logger=self.logger)
+        self.file_index = FileIndex(os.path.join(root, "logs", name, "file_index.db")) if args.dedup else None
+        self.scheduler = CoalescingScheduler(quiet_period=args.quiet_period, max_delay=None, logger=self.logger)
+
+        self.handler = BackupEventHandler(
+            self.storage_client, self.logger, self.upload_queue, self.file_index, self.scheduler,
+            watch_dir=self.watch_dir
+        )
+        if isinstance(self.upload_queue, AsyncUploadRuntime):
+            self.upload_queue.start(self.handler)
+        else:
+            self.upload_queue.start(self.handler.backup_file)
+        self.scheduler.start(self.handler.dispatch_backup)
+        self.events = 0
+
+    def fire(self, path, created=False):
+        """Giống watchdog trên Linux: created + modified khi tạo file, modified khi ghi tiếp."""
+        if created:
+            self.handler.on_created(FileCreatedEvent(path))
+            self.events += 1
+        self.handler.on_modified(FileModifiedEvent(path))
+        self.events += 1
+
+    def drain(self):
+        """Chờ scheduler đẩy hết sự kiện và hàng đợi upload xong mọi job."""
+        self.scheduler.stop(flush=True)
+        self.upload_queue.shutdown(wait=True)
+        self.logger.flush()
+
+    def close(self):
+        if self.file_index is not None:
+            self.file_index.close()
+        self.logger.close()
+
+
+def report(name, pipeline, elapsed, uploaded_bytes):
+    latencies = pipeline.recorder.latencies
+    return {
+        'workload': name,
+        'events': pipeline.events,
+        'backups': pipeline.recorder.completed,
+        'failures': pipeline.recorder.failed,
+        's3_requests': pipeline.fake_s3.request_count,
+        'seconds': round(elapsed, 3),
+        'events_per_second': round(pipeline.events / elapsed, 1) if elapsed else 0.0,
+        'mb_per_second': round(uploaded_bytes / MB / elapsed, 2) if elapsed else 0.0,
+        'latency_p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'latency_p99_ms': round(percentile(latencies, 0.99) * 1000, 1)
+    }
+
+
+def run_small(args, root):
+    """Nhiều file nhỏ (bulk copy): đo chi phí cố định mỗi file."""
+    pipeline = Pipeline(args, root, "small")
+    paths = []
+    for i in range(args.small_count):
+        path = os.path.join(pipeline.watch_dir, f"small_{i:06d}.dat")
+        write_file(path, args.small_size_kb * 1024, i)
+        paths.append(path)
+
+    started = time.perf_counter()
+    for path in paths:
+        pipeline.fire(path, created=True)
+    pipeline.drain()
+    elapsed = time.perf_counter() - started
+
+    result = report("small", pipeline, elapsed, pipeline.fake_s3.bytes_received)
+    pipeline.close()
+    return result
+
+
+def run_large(args, root):
+    """Ít file rất lớn: đo multipart, hash dedup và đọc đĩa."""
+    pipeline = Pipeline(args, root, "large")
+    paths = []
+    for i in range(args.large_count):
+        path = os.path.join(pipeline.watch_dir, f"large_{i:03d}.bin")
+        write_file(path, args.large_size_mb * MB, i)
+        paths.append(path)
+
+    started = time.perf_counter()
+    for path in paths:
+        pipeline.fire(path, created=True)
+    pipeline.drain()
+    elapsed = time.perf_counter() - started
+
+    result = report("large", pipeline, elapsed, pipeline.fake_s3.bytes_received)
+    pipeline.close()
+    return result
+
+
+def run_rewrites(args, root):
+    """Ghi lại liên tục cùng một nhóm file: đo debounce gom sự kiện."""
+    pipeline = Pipeline(args, root, "rewrites")
+    paths = [os.path.join(pipeline.watch_dir, f"rewrite_{i:04d}.txt") for i in range(args.rewrite_files)]
+
+    started = time.perf_counter()
+    for round_number in range(args.rewrites):
+        for i, path in enumerate(paths):
+            created = not os.path.exists(path)
+            write_file(path, args.small_size_kb * 1024, round_number * len(paths) + i)
+            pipeline.fire(path, created=created)
+        if args.rewrite_interval_ms:
+            time.sleep(args.rewrite_interval_ms / 1000.0)
+    pipeline.drain()
+    elapsed = time.perf_counter() - started
+
+    result = report("rewrites", pipeline, elapsed, pipeline.fake_s3.bytes_received)
+    pipeline.close()
+    return result
+
+
+def bench_json_log(args, root):
+    """Chi phí một lần _write_json_log trên luồng gọi (đồng bộ và bất đồng bộ)."""
+    results = {}
+    for mode in ("sync", "async"):
+        log_dir = os.path.join(root, "logs", f"json_{mode}")
+        logger = get_logger(
+            name=f"bench_json_{mode}",
+            log_dir=log_dir,
+            log_level="WARNING",
+            console_output=False,
+            json_format="jsonl",
+            history_db=os.path.join(log_dir, "backup_history.db"),
+            async_writes=mode == "async"
+        )
+        record = {
+            'status': 'SUCCESS',
+            'destination': f"s3://{BENCH_BUCKET}/bench_20250101_000000.dat",
+            'size_bytes': 4096,
+            'size_formatted': "4.00 KB",
+            'duration_seconds': 0.01
+        }
+        started = time.perf_counter()
+        for i in range(args.json_records):
+            logger._write_json_log(dict(record, timestamp=f"2025-01-01T00:00:{i:09d}", source=f"/bench/{i}"))
+        call_elapsed = time.perf_counter() - started
+        logger.flush()
+        total_elapsed = time.perf_counter() - started
+        logger.close()
+        results[mode] = {
+            'records': args.json_records,
+            'us_per_call': round(call_elapsed / args.json_records * 1e6, 2),
+            'records_per_second_including_flush': round(args.json_records / total_elapsed, 1)
+        }
+    return results
+
+
+RUNNERS = {
+    "small": run_small,
+    "large": run_large,
+    "rewrites": run_rewrites
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark luồng backup của Watcher với S3 giả lập")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS),
+                        help=f"danh sách workload, cách nhau bởi dấu phẩy ({', '.join(WORKLOADS)})")
+    parser.add_argument("--runtime", choices=("threads", "asyncio"), default="threads")
+    parser.add_argument("--workers", type=int, default=4, help="số worker upload (runtime threads)")
+    parser.add_argument("--dedup", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--async-logging", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--quiet-period", type=float, default=0.05, help="debounce (giây)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="độ trễ giả lập mỗi request S3")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0, help="băng thông giả lập, MB/giây (0: vô hạn)")
+    parser.add_argument("--multipart-threshold-mb", type=int, default=64)
+    parser.add_argument("--small-count", type=int, default=2000)
+    parser.add_argument("--small-size-kb", type=int, default=4)
+    parser.add_argument("--large-count", type=int, default=4)
+    parser.add_argument("--large-size-mb", type=int, default=128)
+    parser.add_argument("--rewrite-files", type=int, default=50)
+    parser.add_argument("--rewrites", type=int, default=20)
+    parser.add_argument("--rewrite-interval-ms", type=float, default=5.0)
+    parser.add_argument("--json-records", type=int, default=20000)
+    parser.add_argument("--workdir", default=None, help="thư mục tạm (mặc định: tempfile)")
+    parser.add_argument("--json", dest="json_output", default=None, help="ghi kết quả ra file JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workloads = [name.strip() for name in args.workloads.split(",") if name.strip()]
+    unknown = [name for name in workloads if name not in RUNNERS]
+    if unknown:
+        raise SystemExit(f"Unknown workload(s): {', '.join(unknown)}")
+
+    # Chỉ boto3 được thay bằng FakeS3Client; tắt nhánh aiobotocore để mọi upload đi qua StorageClient
+    async_runtime.get_session = None
+
+    root = tempfile.mkdtemp(prefix="watcher-bench-", dir=args.workdir)
+    try:
+        results = {'workloads': [], 'json_log': None}
+        for name in workloads:
+            result = RUNNERS[name](args, root)
+            results['workloads'].append(result)
+            print(
+                f"{name:<9} {result['events']:>7} events  {result['backups']:>6} backups  "
+                f"{result['events_per_second']:>10.1f} events/s  {result['mb_per_second']:>8.2f} MB/s  "
+                f"p50 {result['latency_p50_ms']:>8.1f} ms  p99 {result['latency_p99_ms']:>8.1f} ms"
+            )
+
+        if args.json_records:
+            results['json_log'] = bench_json_log(args, root)
+            for mode, stats in results['json_log'].items():
+                print(
+                    f"_write_json_log ({mode}): {stats['us_per_call']:.2f} us/call, "
+                    f"{stats['records_per_second_including_flush']:.0f} records/s including flush"
+                )
+
+        if args.json_output:
+            with open(args.json_output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+        return results
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# fake_s3.py
+import io
+import threading
+import time
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+class FakeS3Client:
+    """S3 client giả lập trong tiến trình cho benchmark (không cần MinIO / moto).
+
+    Chỉ hỗ trợ các thao tác Watcher dùng khi upload. Body luôn được đọc hết (giống
+    botocore gửi dữ liệu đi), nhưng mặc định chỉ lưu kích thước để benchmark file lớn
+    không tốn RAM. `latency` (giây / request) và `bandwidth` (byte / giây, 0: vô hạn)
+    mô phỏng mạng tới MinIO.
+    """
+
+    def __init__(self, latency=0.0, bandwidth=0, keep_data=False):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.keep_data = keep_data
+
+        self._lock = threading.Lock()
+        self.objects = {}     # key -> {'size', 'metadata', 'data', 'last_modified'}
+        self._uploads = {}    # upload_id -> (key, metadata, {part_number: (size, data)})
+        self._next_upload_id = 0
+        self.request_count = 0
+        self.bytes_received = 0
+
+    def _read_body(self, body):
+        if isinstance(body, (bytes, bytearray)):
+            return bytes(body) if self.keep_data else None, len(body)
+        data = io.BytesIO() if self.keep_data else None
+        size = 0
+        while True:
+            block = body.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            size += len(block)
+            if data is not None:
+                data.write(block)
+        return (data.getvalue() if data is not None else None), size
+
+    def _transfer(self, size):
+        with self._lock:
+            self.request_count += 1
+            self.bytes_received += size
+        delay = self.latency + (size / self.bandwidth if self.bandwidth else 0)
+        if delay:
+            time.sleep(delay)
+
+    def _store(self, key, size, metadata, data):
+        with self._lock:
+            self.objects[key] = {
+                'size': size,
+                'metadata': metadata or {},
+                'data': data,
+                'last_modified': datetime.now(timezone.utc)
+            }
+
+    # ---- Bucket / object ----
+
+    def head_bucket(self, Bucket):
+        self._transfer(0)
+        return {}
+
+    def create_bucket(self, Bucket):
+        self._transfer(0)
+        return {}
+
+    def put_object(self, Bucket, Key, Body, Metadata=None, **kwargs):
+        data, size = self._read_body(Body)
+        self._transfer(size)
+        self._store(Key, size, Metadata, data)
+        return {'ETag': '"fake"'}
+
+    def head_object(self, Bucket, Key):
+        self._transfer(0)
+        with self._lock:
+            obj = self.objects.get(Key)
+        if obj is None:
+            raise ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, 'HeadObject')
+        return {'ContentLength': obj['size'], 'Metadata': obj['metadata'], 'LastModified': obj['last_modified']}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self._transfer(0)
+        with self._lock:
+            obj = self.objects.get(Key)
+        if obj is None:
+            raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': 'Not Found'}}, 'GetObject')
+        return {'Body': io.BytesIO(obj['data'] or b''), 'ContentLength': obj['size'], 'Metadata': obj['metadata']}
+
+    def delete_objects(self, Bucket, Delete):
+        self._transfer(0)
+        with self._lock:
+            for item in Delete['Objects']:
+                self.objects.pop(item['Key'], None)
+        return {} if Delete.get('Quiet') else {'Deleted': [{'Key': item['Key']} for item in Delete['Objects']]}
+
+    # ---- Multipart ----
+
+    def create_multipart_upload(self, Bucket, Key, Metadata=None, **kwargs):
+        self._transfer(0)
+        with self._lock:
+            self._next_upload_id += 1
+            upload_id = str(self._next_upload_id)
+            self._uploads[upload_id] = (Key, Metadata, {})
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        data, size = self._read_body(Body)
+        self._transfer(size)
+        with self._lock:
+            self._uploads[UploadId][2][PartNumber] = (size, data)
+        return {'ETag': f'"part-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self._transfer(0)
+        with self._lock:
+            key, metadata, parts = self._uploads.pop(UploadId)
+        ordered = [parts[part['PartNumber']] for part in MultipartUpload['Parts']]
+        data = b"".join(part[1] for part in ordered) if self.keep_data else None
+        self._store(key, sum(part[0] for part in ordered), metadata, data)
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._transfer(0)
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+        return {}
+
+    # ---- Listing ----
+
+    def list_objects_v2(self, Bucket, Prefix='', ContinuationToken=None, MaxKeys=1000, **kwargs):
+        self._transfer(0)
+        with self._lock:
+            keys = sorted(key for key in self.objects if key.startswith(Prefix))
+            start = int(ContinuationToken or 0)
+            page = keys[start:start + MaxKeys]
+            contents = [
+                {'Key': key, 'Size': self.objects[key]['size'], 'LastModified': self.objects[key]['last_modified']}
+                for key in page
+            ]
+        response = {'KeyCount': len(page), 'IsTruncated': start + MaxKeys < len(keys)}
+        if contents:
+            response['Contents'] = contents
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = str(start + MaxKeys)
+        return response
+
+    def list_multipart_uploads(self, Bucket, **kwargs):
+        self._transfer(0)
+        return {'Uploads': [], 'IsTruncated': False}
+
+    def get_paginator(self, operation):
+        return _FakePaginator(self, operation)
+
+
+class _FakePaginator:
+    def __init__(self, client, operation):
+        self.client = client
+        self.operation = operation
+
+    def paginate(self, **kwargs):
+        if self.operation != 'list_objects_v2':
+            yield getattr(self.client, self.operation)(**kwargs)
+            return
+        token = None
+        while True:
+            args = dict(kwargs)
+            if token:
+                args['ContinuationToken'] = token
+            page = self.client.list_objects_v2(**args)
+            yield page
+            if not page['IsTruncated']:
+                return
+            token = page['NextContinuationToken']
@@ -0,0 +1,377 @@
+# chunk_store.py
+"""Lưu file lớn dạng chunk content-addressed (content-defined chunking + manifest).
+
+Thông lượng chia chunk: rolling hash Gear tính bằng numpy (~100+ MB/s mỗi luồng, vector hóa
+theo khối). Không có numpy thì dùng vòng lặp Python thuần, chỉ ~5 MB/s mỗi luồng (giữ GIL):
+file 10 GB mất hơn 30 phút chỉ để tìm ranh giới chunk. Hai cách cho cùng ranh giới chunk,
+nên chunk đã lưu vẫn được dùng lại khi đổi cách tính.
+"""
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy
+except ImportError:  # numpy là tùy chọn; không có thì tính hash bằng vòng lặp Python (chậm)
+    numpy = None
+
+KB = 1024
+MB = 1024 * KB
+
+# Các hằng số định dạng lưu trữ chunk (PHẢI KHỚP VỚI WEB ADMIN s3_backend_client.py)
+CHUNK_PREFIX = "chunks/"
+FORMAT_METADATA_KEY = "backup-format"
+MANIFEST_FORMAT = "chunked-manifest-v1"
+
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+# Bảng Gear: 256 số 64-bit cố định, sinh từ SHA-256 để ranh giới chunk ổn định giữa các lần chạy
+GEAR = [
+    int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], "big")
+    for i in range(256)
+]
+GEAR_ARRAY = numpy.array(GEAR, dtype=numpy.uint64) if numpy is not None else None
+
+# Số vị trí tính hash mỗi lần bằng numpy (khối nhỏ nằm gọn trong cache CPU; bộ nhớ tạm ~ 16 byte / vị trí)
+SCAN_BLOCK_SIZE = 64 * KB
+
+
+def chunk_key(digest, prefix=CHUNK_PREFIX):
+    """Key S3 của một chunk: chunks/ab/abcdef... (chia thư mục con theo 2 ký tự đầu)."""
+    return f"{prefix}{digest[:2]}/{digest}"
+
+
+class ContentDefinedChunker:
+    """Chia file thành các chunk theo nội dung bằng rolling hash Gear (kiểu FastCDC).
+
+    Ranh giới chunk phụ thuộc vào nội dung chứ không phụ thuộc vị trí, nên khi
+    sửa/chèn vài byte thì chỉ 1-2 chunk quanh chỗ sửa thay đổi, các chunk còn lại
+    giữ nguyên hash và không cần upload lại.
+    """
+
+    def __init__(self, min_size=256 * KB, avg_size=1 * MB, max_size=4 * MB):
+        if not min_size < avg_size < max_size:
+            raise ValueError("Chunk sizes must satisfy min_size < avg_size < max_size")
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+
+        # Điểm cắt khi các bit cao của hash đều bằng 0 (bit cao phụ thuộc ~64 byte gần nhất).
+        # Xác suất 1 / 2^bits tại mỗi vị trí sau min_size -> kích thước trung bình ~ avg_size.
+        bits = max(1, (avg_size - min_size).bit_length() - 1)
+        self._mask = ((1 << bits) - 1) << (_HASH_BITS - bits)
+
+    def _find_cut(self, buf, start, end):
+        """Tìm điểm cắt chunk trong buf[start:end]; trả về chỉ số kết thúc chunk."""
+        length = end - start
+        if length <= self.min_size:
+            return end
+
+        stop = start + min(length, self.max_size)
+        # Bỏ qua min_size byte đầu: không có điểm cắt nào ở đó, không cần tính hash
+        first = start + self.min_size
+        if numpy is None:
+            return self._find_cut_python(buf, first, stop)
+
+        mask = numpy.uint64(self._mask)
+        # Khối đầu bằng khoảng cách kỳ vọng tới điểm cắt, sau đó tăng gấp đôi
+        block = min(SCAN_BLOCK_SIZE, max(4 * KB, self.avg_size - self.min_size))
+        pos = first
+        while pos < stop:
+            block_end = min(stop, pos + block)
+            hits = numpy.flatnonzero((self._gear_hashes(buf, first, pos, block_end) & mask) == 0)
+            if hits.size:
+                return pos + int(hits[0]) + 1
+            pos = block_end
+            block = min(SCAN_BLOCK_SIZE, block * 2)
+        return stop
+
+    def _find_cut_python(self, buf, first, stop):
+        gear = GEAR
+        mask = self._mask
+        h = 0
+        for i in range(first, stop):
+            h = ((h << 1) + gear[buf[i]]) & _HASH_MASK
+            if not h & mask:
+                return i + 1
+        return stop
+
+    @staticmethod
+    def _gear_hashes(buf, first, lo, hi):
+        """Giá trị hash Gear tại các vị trí [lo, hi), với hash bắt đầu từ 0 tại `first`.
+
+        h[i] = sum(GEAR[buf[i - k]] << k, k = 0..63) (mod 2^64): chỉ 64 byte gần nhất ảnh hưởng,
+        nên mỗi khối chỉ cần thêm 63 byte ngữ cảnh phía trước. Tổng được tính bằng 6 bước
+        nhân đôi cửa sổ (1, 2, 4, ... 64 byte) thay vì lặp từng byte.
+        """
+        context = max(first, lo - (_HASH_BITS - 1))
+        data = numpy.frombuffer(buf, dtype=numpy.uint8, count=hi - context, offset=context)
+        h = GEAR_ARRAY[data]
+        del data  # không giữ view trên bytearray (iter_chunks còn cắt bớt buf)
+        width = 1
+        while width < _HASH_BITS:
+            h[width:] += h[:-width] << numpy.uint64(width)
+            width *= 2
+        return h[lo - context:]
+
+    def iter_chunks(self, file_obj):
+        """Đọc file theo luồng và trả về từng chunk (bytes); bộ nhớ tối đa ~ 2 * max_size."""
+        buf = bytearray()
+        eof = False
+        while True:
+            while not eof and len(buf) < self.max_size:
+                block = file_obj.read(self.max_size)
+                if not block:
+                    eof = True
+                    break
+                buf.extend(block)
+
+            if not buf:
+                return
+
+            cut = self._find_cut(buf, 0, len(buf))
+            yield bytes(buf[:cut])
+            del buf[:cut]
+
+
+class ManifestIndex:
+    """Chỉ mục cục bộ (SQLite): object key -> các chunk digest mà manifest tại key tham chiếu.
+
+    ChunkStore ghi nhận mỗi manifest vừa ghi; bước dọn chunk (retention) đọc tập chunk còn
+    sống từ đây thay vì HEAD/GET mọi object trong bucket. Object không phải manifest được
+    lưu với danh sách rỗng, nên mỗi object chỉ bị kiểm tra qua S3 nhiều nhất một lần.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS manifests (
+                key    TEXT PRIMARY KEY,
+                chunks TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def record(self, key, digests):
+        self.record_many([(key, digests)])
+
+    def record_many(self, items):
+        """items: list (key, list digest); digest rỗng nghĩa là object không phải manifest."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO manifests (key, chunks) VALUES (?, ?)",
+                [(key, json.dumps(sorted(set(digests)))) for key, digests in items]
+            )
+            self._conn.commit()
+
+    def snapshot(self):
+        """Trả về dict key -> list digest của mọi object đã biết."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, chunks FROM manifests").fetchall()
+        return {key: json.loads(chunks) for key, chunks in rows}
+
+    def remove_many(self, keys):
+        with self._lock:
+            self._conn.executemany("DELETE FROM manifests WHERE key = ?", [(key,) for key in keys])
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ChunkStore:
+    """Lưu file dưới dạng chunk content-addressed + 1 manifest cho mỗi phiên bản.
+
+    - Chunk: chunks/<sha256>, chỉ upload những chunk chưa có trong bucket.
+    - Manifest: lưu tại chính versioned key (ví dụ report_20251214_133045.log), đánh dấu
+      bằng metadata backup-format=chunked-manifest-v1 để Web Admin ghép lại khi restore.
+    """
+
+    def __init__(self, s3_client, bucket_name, chunker=None, concurrency=4, prefix=CHUNK_PREFIX,
+                 throttle=None):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.chunker = chunker or ContentDefinedChunker()
+        self.concurrency = max(1, concurrency)
+        self.prefix = prefix
+        self.throttle = throttle or (lambda nbytes=0: None)  # Rate limiter của StorageClient
+
+        self._known_chunks = None  # Nạp lười từ bucket ở lần upload chunked đầu tiên
+        self._known_lock = threading.Lock()
+
+        # Dọn chunk (retention): các upload chạy song song với nhau nhưng loại trừ bước xóa chunk
+        self._gate = threading.Condition()
+        self._active_uploads = 0
+        self._collecting = False
+        self._touched = None  # digest được dùng bởi manifest ghi trong lúc đang dọn (None: không dọn)
+        self.manifest_index = None  # ManifestIndex (khi bật dọn chunk): ghi nhận chunk của mỗi manifest
+
+    def _ensure_known_chunks(self):
+        """Liệt kê (phân trang) các chunk đã có trong bucket một lần, sau đó dùng cache."""
+        with self._known_lock:
+            if self._known_chunks is not None:
+                return
+            known = set()
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=self.prefix):
+                for obj in page.get('Contents', []):
+                    known.add(obj['Key'].rsplit('/', 1)[-1])
+            self._known_chunks = known
+
+    def invalidate(self):
+        """Xóa cache chunk đã biết (gọi sau khi dọn chunk trong bucket)."""
+        with self._known_lock:
+            self._known_chunks = None
+
+    # ---- Phối hợp với dọn chunk không còn được tham chiếu (retention.py) ----
+
+    def begin_collect(self):
+        """Bắt đầu ghi nhận các chunk được manifest mới tham chiếu (trước khi liệt kê manifest)."""
+        with self._known_lock:
+            self._touched = set()
+
+    def end_collect(self):
+        with self._known_lock:
+            self._touched = None
+
+    @contextmanager
+    def collecting(self):
+        """Chặn upload chunked mới và chờ upload đang chạy xong trong lúc xóa chunk.
+
+        Trả về tập digest đã được tham chiếu kể từ begin_collect(); không được xóa các digest này.
+        """
+        with self._gate:
+            self._gate.wait_for(lambda: not self._collecting)
+            self._collecting = True
+            self._gate.wait_for(lambda: self._active_uploads == 0)
+        try:
+            with self._known_lock:
+                touched = self._touched or set()
+            yield touched
+        finally:
+            self.end_collect()
+            with self._gate:
+                self._collecting = False
+                self._gate.notify_all()
+
+    def forget(self, digests):
+        """Bỏ các chunk sắp bị xóa khỏi cache: upload sau đó sẽ upload lại nếu cần."""
+        with self._known_lock:
+            if self._known_chunks is not None:
+                self._known_chunks.difference_update(digests)
+
+    @contextmanager
+    def _upload_slot(self):
+        with self._gate:
+            self._gate.wait_for(lambda: not self._collecting)
+            self._active_uploads += 1
+        try:
+            yield
+        finally:
+            with self._gate:
+                self._active_uploads -= 1
+                self._gate.notify_all()
+
+    def _is_known(self, digest):
+        with self._known_lock:
+            return digest in self._known_chunks
+
+    def _put_chunk(self, digest, data):
+        self.throttle(len(data))
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=chunk_key(digest, self.prefix),
+            Body=data
+        )
+        with self._known_lock:
+            self._known_chunks.add(digest)
+
+    def upload(self, file_path, key, original_name):
+        """Chia file thành chunk, upload các chunk mới song song rồi ghi manifest tại `key`."""
+        with self._upload_slot():
+            return self._upload(file_path, key, original_name)
+
+    def _upload(self, file_path, key, original_name):
+        self._ensure_known_chunks()
+
+        chunks = []
+        scheduled = set()
+        uploaded_bytes = 0
+        # Giới hạn số chunk đang chờ upload để bộ nhớ không tăng theo kích thước file
+        slots = threading.BoundedSemaphore(self.concurrency * 2)
+        futures = []
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            with open(file_path, "rb") as f:
+                for data in self.chunker.iter_chunks(f):
+                    digest = hashlib.sha256(data).hexdigest()
+                    chunks.append({'hash': digest, 'size': len(data)})
+
+                    if digest in scheduled or self._is_known(digest):
+                        continue
+                    scheduled.add(digest)
+                    uploaded_bytes += len(data)
+
+                    slots.acquire()
+                    future = executor.submit(self._put_chunk, digest, data)
+                    future.add_done_callback(lambda _: slots.release())
+                    futures.append(future)
+
+                    # Dừng sớm nếu một chunk trước đó đã lỗi
+                    failed = next((fu for fu in futures if fu.done() and fu.exception()), None)
+                    if failed is not None:
+                        failed.result()
+
+            for future in futures:
+                future.result()
+        except Exception:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+        manifest = {
+            'format': MANIFEST_FORMAT,
+            'filename': original_name,
+            'size': sum(chunk['size'] for chunk in chunks),
+            'chunk_prefix': self.prefix,
+            'chunks': chunks
+        }
+        body = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+        self.throttle(len(body))
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            Body=body,
+            ContentType='application/json',
+            Metadata={FORMAT_METADATA_KEY: MANIFEST_FORMAT}
+        )
+        with self._known_lock:
+            if self._touched is not None:
+                self._touched.update(chunk['hash'] for chunk in chunks)
+        if self.manifest_index is not None:
+            self.manifest_index.record(key, [chunk['hash'] for chunk in chunks])
+
+        return {
+            'chunk_count': len(chunks),
+            'uploaded_chunks': len(scheduled),
+            'uploaded_bytes': uploaded_bytes,
+            'manifest_bytes': len(body)
+        }
@@ -0,0 +1,76 @@
+# compression.py
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd là tùy chọn; không có thư viện thì dùng gzip
+    zstandard = None
+
+# Metadata lưu trên object (PHẢI KHỚP VỚI WEB ADMIN s3_backend_client.py)
+CODEC_METADATA_KEY = "backup-codec"
+ORIGINAL_SIZE_METADATA_KEY = "original-size"
+
+SUPPORTED_CODECS = ("gzip", "zstd")
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3}
+
+READ_BLOCK_SIZE = 1024 * 1024
+SAMPLE_SIZE = 64 * 1024
+
+# Định dạng đã nén sẵn: nén lại chỉ tốn CPU mà không giảm dung lượng
+COMPRESSED_EXTENSIONS = {
+    ".gz", ".tgz", ".zip", ".zst", ".xz", ".bz2", ".7z", ".rar", ".lz4", ".br",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".avif",
+    ".mp3", ".aac", ".ogg", ".flac", ".mp4", ".mkv", ".avi", ".mov", ".webm",
+    ".docx", ".xlsx", ".pptx", ".odt", ".jar", ".apk", ".pdf",
+}
+
+
+def resolve_codec(codec, logger=None):
+    """Chuẩn hóa cấu hình codec; None nếu tắt nén. zstd không có thư viện -> gzip."""
+    codec = (codec or "none").lower()
+    if codec in ("", "none", "off", "false"):
+        return None
+    if codec not in SUPPORTED_CODECS:
+        raise ValueError(f"Unsupported compression codec '{codec}', expected one of {SUPPORTED_CODECS}")
+    if codec == "zstd" and zstandard is None:
+        if logger:
+            logger.log_system_event("zstandard is not installed, falling back to gzip compression.", "WARNING")
+        return "gzip"
+    return codec
+
+
+def make_compressor(codec, level=None):
+    """Tạo compressor dạng stream có compress(data) và flush()."""
+    level = DEFAULT_LEVELS[codec] if level is None else level
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    # wbits=31: định dạng gzip (có header + CRC), giải nén được bằng gzip/zcat thông thường
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def is_worth_compressing(file_path, codec, level=None, min_ratio=0.9):
+    """Bỏ qua định dạng đã nén và file mà mẫu đầu file nén kém (tỉ lệ > min_ratio)."""
+    if os.path.splitext(file_path)[1].lower() in COMPRESSED_EXTENSIONS:
+        return False
+
+    with open(file_path, "rb") as f:
+        sample = f.read(SAMPLE_SIZE)
+    if not sample:
+        return False
+
+    compressor = make_compressor(codec, level)
+    compressed = compressor.compress(sample) + compressor.flush()
+    return len(compressed) / len(sample) <= min_ratio
+
+
+def iter_compressed(file_obj, codec, level=None):
+    """Đọc file theo khối và trả về dần các khối dữ liệu đã nén."""
+    compressor = make_compressor(codec, level)
+    for block in iter(lambda: file_obj.read(READ_BLOCK_SIZE), b""):
+        data = compressor.compress(block)
+        if data:
+            yield data
+    tail = compressor.flush()
+    if tail:
+        yield tail
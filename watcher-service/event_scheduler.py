@@ -0,0 +1,113 @@
+# event_scheduler.py
+import heapq
+import threading
+import time
+
+
+class CoalescingScheduler:
+    """Gom các sự kiện liên tiếp của cùng một file (trailing-edge debounce).
+
+    Mỗi sự kiện gọi touch(path). File chỉ được chuyển đi backup (callback(path))
+    khi đã "im lặng" đủ `quiet_period` giây kể từ lần ghi cuối, hoặc khi đã chờ quá
+    `max_delay` giây kể từ sự kiện đầu tiên (để file bị ghi liên tục vẫn được backup).
+    Sau khi gọi callback, path bị xóa khỏi bảng chờ nên bộ nhớ không tăng mãi.
+    """
+
+    def __init__(self, quiet_period=2.0, max_delay=30.0, logger=None):
+        self.quiet_period = quiet_period
+        self.max_delay = max_delay  # None: không giới hạn thời gian chờ
+        self.logger = logger
+
+        self._pending = {}   # path -> [first_seen, last_seen]
+        self._heap = []      # (thời điểm dự kiến, path); được tính lại khi lấy ra
+        self._cond = threading.Condition()
+        self._callback = None
+        self._thread = None
+        self._running = False
+
+    def start(self, callback):
+        self._callback = callback
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="event-scheduler", daemon=True)
+        self._thread.start()
+
+    def touch(self, path):
+        """Ghi nhận một sự kiện của path. Trả về True nếu đây là sự kiện đầu tiên của đợt."""
+        now = time.monotonic()
+        with self._cond:
+            entry = self._pending.get(path)
+            if entry is not None:
+                entry[1] = now
+                return False
+            self._pending[path] = [now, now]
+            heapq.heappush(self._heap, (self._due_time(now, now), path))
+            self._cond.notify()
+            return True
+
+    def cancel(self, path):
+        """Bỏ path khỏi bảng chờ (ví dụ file đã bị xóa)."""
+        with self._cond:
+            self._pending.pop(path, None)
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._pending)
+
+    def stop(self, flush=True):
+        """Dừng scheduler; flush=True sẽ backup ngay mọi file còn đang chờ."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if flush:
+            with self._cond:
+                remaining = list(self._pending)
+                self._pending.clear()
+                self._heap = []
+            for path in remaining:
+                self._fire(path)
+
+    def _due_time(self, first_seen, last_seen):
+        due = last_seen + self.quiet_period
+        if self.max_delay is not None:
+            due = min(due, first_seen + self.max_delay)
+        return due
+
+    def _run(self):
+        while True:
+            ready = []
+            with self._cond:
+                if not self._running:
+                    return
+
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    _, path = heapq.heappop(self._heap)
+                    entry = self._pending.get(path)
+                    if entry is None:
+                        continue  # Đã bị cancel
+                    due = self._due_time(*entry)
+                    if due > now:
+                        # Có sự kiện mới trong lúc chờ: lùi thời điểm backup
+                        heapq.heappush(self._heap, (due, path))
+                        continue
+                    del self._pending[path]
+                    ready.append(path)
+
+                if not ready:
+                    timeout = self._heap[0][0] - now if self._heap else None
+                    self._cond.wait(timeout)
+                    continue
+
+            for path in ready:
+                self._fire(path)
+
+    def _fire(self, path):
+        try:
+            self._callback(path)
+        except Exception as e:
+            if self.logger:
+                self.logger.log_system_event(f"Scheduler callback failed for {path}: {e}", "ERROR")
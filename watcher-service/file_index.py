@@ -0,0 +1,97 @@
+# file_index.py
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path):
+    """Tính SHA-256 của file theo từng khối, không nạp toàn bộ file vào bộ nhớ."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FileIndex:
+    """Chỉ mục cục bộ (SQLite) lưu trạng thái lần backup gần nhất của mỗi file.
+
+    path -> (size, mtime_ns, sha256, destination). Được lưu trong LOG_DIR (HostPath)
+    nên vẫn còn sau khi Pod khởi động lại.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path        TEXT PRIMARY KEY,
+                size        INTEGER NOT NULL,
+                mtime_ns    INTEGER NOT NULL,
+                sha256      TEXT NOT NULL,
+                destination TEXT,
+                updated_at  REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, path):
+        """Trả về dict trạng thái đã lưu của file, hoặc None nếu chưa từng backup."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, sha256, destination FROM files WHERE path = ?",
+                (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'size': row[0],
+            'mtime_ns': row[1],
+            'sha256': row[2],
+            'destination': row[3]
+        }
+
+    def update(self, path, size, mtime_ns, sha256, destination):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO files (path, size, mtime_ns, sha256, destination, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size,
+                    mtime_ns = excluded.mtime_ns,
+                    sha256 = excluded.sha256,
+                    destination = excluded.destination,
+                    updated_at = excluded.updated_at
+                """,
+                (path, size, mtime_ns, sha256, destination, time.time())
+            )
+            self._conn.commit()
+
+    def snapshot(self):
+        """Trả về dict path -> (size, mtime_ns) của mọi file đã biết (dùng khi quét lúc khởi động)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT path, size, mtime_ns FROM files").fetchall()
+        return {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+
+    def remove(self, path):
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,186 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+HISTORY_COLUMNS = (
+    'timestamp',
+    'status',
+    'source',
+    'destination',
+    'size_bytes',
+    'duration_seconds',
+    'error',
+    'error_code',
+    'stored_size_bytes'
+)
+
+JSON_LOG_SUFFIXES = ('.json', '.jsonl', '.json.gz', '.jsonl.gz')
+
+INSERT_SQL = (
+    f"INSERT OR IGNORE INTO backups ({', '.join(HISTORY_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in HISTORY_COLUMNS)})"
+)
+
+
+class HistoryIndex:
+    def __init__(self, db_path, readonly: bool = False):
+        self.db_path = Path(db_path)
+        self.readonly = readonly
+        self._lock = threading.Lock()
+
+        if readonly:
+            self._conn = sqlite3.connect(
+                f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False
+            )
+            return
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS backups (
+                id               INTEGER PRIMARY KEY,
+                timestamp        TEXT NOT NULL,
+                status           TEXT NOT NULL,
+                source           TEXT NOT NULL,
+                destination      TEXT,
+                size_bytes       INTEGER,
+                duration_seconds REAL,
+                error            TEXT,
+                error_code       TEXT,
+                stored_size_bytes INTEGER,
+                UNIQUE (source, timestamp, status)
+            );
+            CREATE INDEX IF NOT EXISTS idx_backups_timestamp ON backups (timestamp);
+            CREATE INDEX IF NOT EXISTS idx_backups_status_timestamp ON backups (status, timestamp);
+            CREATE TABLE IF NOT EXISTS imported_logs (
+                name TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+            """
+        )
+        # Indexes created before stored_size_bytes existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(backups)")}
+        if 'stored_size_bytes' not in columns:
+            self._conn.execute("ALTER TABLE backups ADD COLUMN stored_size_bytes INTEGER")
+        self._conn.commit()
+
+    @staticmethod
+    def _row(log_data: Dict[str, Any]) -> tuple:
+        return tuple(log_data.get(column) for column in HISTORY_COLUMNS)
+
+    def record(self, log_data: Dict[str, Any]):
+        self.record_many([log_data])
+
+    def record_many(self, records: List[Dict[str, Any]]):
+        with self._lock:
+            self._conn.executemany(INSERT_SQL, [self._row(record) for record in records])
+            self._conn.commit()
+
+    def import_json_logs(self, log_dir) -> int:
+        # Backfill from backup_*.json / backup_*.jsonl; files already imported at
+        # the same size are skipped, and duplicate records are ignored by UNIQUE
+        from backup_logger import load_json_log
+
+        imported = 0
+        for path in sorted(Path(log_dir).glob("backup_*.json*")):
+            if not path.name.endswith(JSON_LOG_SUFFIXES) or '.export.' in path.name:
+                continue
+            size = path.stat().st_size
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT size FROM imported_logs WHERE name = ?", (path.name,)
+                ).fetchone()
+            if row is not None and row[0] == size:
+                continue
+
+            try:
+                records = load_json_log(path)
+            except (OSError, json.JSONDecodeError):
+                continue
+
+            with self._lock:
+                cursor = self._conn.executemany(
+                    INSERT_SQL, [self._row(record) for record in records if record.get('source')]
+                )
+                imported += max(cursor.rowcount, 0)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO imported_logs (name, size) VALUES (?, ?)",
+                    (path.name, size)
+                )
+                self._conn.commit()
+        return imported
+
+    def query(
+        self,
+        source: Optional[str] = None,
+        q: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 50
+    ) -> Dict[str, Any]:
+        clauses = []
+        params: List[Any] = []
+        if source:
+            clauses.append("source = ?")
+            params.append(source)
+        if q:
+            clauses.append("source LIKE ? ESCAPE '\\'")
+            escaped = q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f"%{escaped}%")
+        if status:
+            clauses.append("status = ?")
+            params.append(status.upper())
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            total = self._conn.execute(
+                f"SELECT COUNT(*) FROM backups {where}", params
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {', '.join(HISTORY_COLUMNS)} FROM backups {where} "
+                f"ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size]
+            ).fetchall()
+
+        return {
+            'records': [dict(zip(HISTORY_COLUMNS, row)) for row in rows],
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (total + page_size - 1) // page_size
+        }
+
+    def latest_id(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM backups").fetchone()[0]
+
+    def records_after(self, last_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        # Records appended after `last_id`, oldest first; used to tail the index
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, {', '.join(HISTORY_COLUMNS)} FROM backups "
+                f"WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, limit)
+            ).fetchall()
+        return [dict(zip(('id',) + HISTORY_COLUMNS, row)) for row in rows]
+
+    def last_backup(self, source: str) -> Optional[Dict[str, Any]]:
+        records = self.query(source=source, status='SUCCESS', page_size=1)['records']
+        return records[0] if records else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,109 @@
+# metrics.py
+import threading
+import time
+from collections import OrderedDict
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+# Bucket (giây) cho độ trễ upload và độ trễ từ lúc phát hiện thay đổi tới lúc upload
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+LAG_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60, 120, 300, 900, 3600)
+
+# Giới hạn số file đang chờ đo lag (file bị xóa trước khi backup sẽ không bao giờ được lấy ra)
+MAX_PENDING_DETECTIONS = 100000
+
+
+class WatcherMetrics:
+    """Metrics Prometheus của Watcher, cập nhật qua listener của BackupLogger.
+
+    Không cần sửa luồng backup: mọi counter/histogram được suy ra từ các sự kiện
+    log_file_detected / log_backup_start / log_backup_success / log_backup_failure /
+    log_backup_deduplicated. Độ sâu hàng đợi được đọc trực tiếp khi Prometheus scrape.
+    """
+
+    def __init__(self):
+        self.uploads = Counter(
+            'watcher_backups_total', 'Backups by result', ['status']
+        )
+        self.uploaded_bytes = Counter(
+            'watcher_uploaded_bytes_total', 'Bytes of source files uploaded successfully'
+        )
+        self.upload_duration = Histogram(
+            'watcher_upload_duration_seconds', 'Upload duration per file', buckets=LATENCY_BUCKETS
+        )
+        self.upload_throughput = Histogram(
+            'watcher_upload_throughput_bytes_per_second', 'Per-file upload throughput',
+            buckets=(64e3, 256e3, 1e6, 4e6, 16e6, 64e6, 256e6, 1e9)
+        )
+        self.event_lag = Histogram(
+            'watcher_event_to_upload_lag_seconds',
+            'Time from first detected change to upload start (includes debounce and queueing)',
+            buckets=LAG_BUCKETS
+        )
+        self.dedup_bytes = Counter(
+            'watcher_deduplicated_bytes_total', 'Bytes not uploaded because content was unchanged'
+        )
+        self.errors = Counter(
+            'watcher_upload_errors_total', 'Failed uploads by S3 error code', ['code']
+        )
+        self.events = Counter(
+            'watcher_file_events_total', 'File change events that started a backup batch', ['event_type']
+        )
+        self.queue_depth = Gauge('watcher_upload_queue_depth', 'Files waiting in or being processed by the upload queue')
+        self.debounce_pending = Gauge('watcher_debounce_pending_files', 'Files waiting for the debounce quiet period')
+        self.retry_pending = Gauge('watcher_retry_queue_depth', 'Failed files waiting in the durable retry queue')
+        self.circuit_open = Gauge('watcher_circuit_breaker_open', '1 while uploads are paused by the circuit breaker')
+
+        self._lock = threading.Lock()
+        # path -> time.monotonic() của sự kiện đầu tiên chưa được backup, cũ nhất trước
+        self._detected_at = OrderedDict()
+
+    def attach(self, logger, upload_queue=None, scheduler=None, retry_queue=None):
+        logger.add_listener(self.on_log_event)
+        if upload_queue is not None:
+            self.queue_depth.set_function(upload_queue.qsize)
+        if scheduler is not None:
+            self.debounce_pending.set_function(scheduler.pending_count)
+        if retry_queue is not None:
+            self.retry_pending.set_function(retry_queue.pending_count)
+            self.circuit_open.set_function(lambda: retry_queue.breaker.state != retry_queue.breaker.CLOSED)
+
+    def _pop_detection(self, file_path):
+        with self._lock:
+            return self._detected_at.pop(file_path, None)
+
+    def on_log_event(self, event, data):
+        if event == 'file_detected':
+            self.events.labels(data['event_type']).inc()
+            with self._lock:
+                file_path = data['file_path']
+                if file_path not in self._detected_at:
+                    # Đầy: chỉ bỏ các mục cũ nhất (thường là file đã bị xóa trước khi backup)
+                    while len(self._detected_at) >= MAX_PENDING_DETECTIONS:
+                        self._detected_at.popitem(last=False)
+                    self._detected_at[file_path] = time.monotonic()
+
+        elif event == 'backup_start':
+            detected = self._pop_detection(data['file_path'])
+            if detected is not None:
+                self.event_lag.observe(time.monotonic() - detected)
+
+        elif event == 'backup_success':
+            self.uploads.labels('success').inc()
+            self.uploaded_bytes.inc(data['file_size'])
+            self.upload_duration.observe(data['duration'])
+            if data['duration'] > 0:
+                self.upload_throughput.observe(data['file_size'] / data['duration'])
+
+        elif event == 'backup_failure':
+            self._pop_detection(data['file_path'])
+            self.uploads.labels('failed').inc()
+            self.errors.labels(data.get('error_code') or 'unknown').inc()
+
+        elif event == 'backup_deduplicated':
+            self._pop_detection(data['file_path'])
+            self.uploads.labels('deduplicated').inc()
+            self.dedup_bytes.inc(data['file_size'])
+
+    def serve(self, port):
+        """Mở HTTP server (thread nền) phục vụ /metrics."""
+        start_http_server(port)
@@ -0,0 +1,115 @@
+# rate_limiter.py
+import heapq
+import itertools
+import threading
+import time
+
+# Request nhỏ hơn hoặc bằng ngưỡng này được ưu tiên (file nhỏ không phải chờ sau file lớn)
+DEFAULT_PRIORITY_MAX_BYTES = 1024 * 1024
+
+PRIORITY_HIGH = 0
+PRIORITY_LOW = 1
+
+
+class TokenBucket:
+    """Token bucket: nạp `rate` token mỗi giây, tích lũy tối đa `capacity` token."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated_at = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount):
+        """Số giây cần chờ để có đủ `amount` token (0 nếu đã đủ)."""
+        self._refill()
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """Giới hạn băng thông (byte/giây) và số request S3 (request/giây) cho mọi upload.
+
+    Mỗi request gọi acquire(số byte) trước khi gửi. Các request chờ theo thứ tự ưu tiên:
+    request <= priority_max_bytes (file nhỏ, part cuối) được phục vụ trước các part lớn.
+    Request lớn hơn dung lượng bucket được trả token theo từng phần, nên file nhỏ đến sau
+    vẫn được chen vào giữa thay vì chờ cả file lớn. 0 = không giới hạn.
+    """
+
+    def __init__(self, bytes_per_second=0, requests_per_second=0, burst_seconds=1.0,
+                 priority_max_bytes=DEFAULT_PRIORITY_MAX_BYTES, clock=time.monotonic):
+        self.priority_max_bytes = priority_max_bytes
+        self.bytes_bucket = None
+        self.requests_bucket = None
+        if bytes_per_second:
+            self.bytes_bucket = TokenBucket(
+                bytes_per_second, max(1.0, bytes_per_second * burst_seconds), clock
+            )
+        if requests_per_second:
+            self.requests_bucket = TokenBucket(
+                requests_per_second, max(1.0, requests_per_second * burst_seconds), clock
+            )
+
+        self._cond = threading.Condition()
+        self._waiters = []  # heap (priority, seq) của các request đang chờ token
+        self._seq = itertools.count()
+
+    @property
+    def enabled(self):
+        return self.bytes_bucket is not None or self.requests_bucket is not None
+
+    def acquire(self, nbytes=0):
+        """Chặn cho tới khi được phép gửi một request mang `nbytes` byte."""
+        if not self.enabled:
+            return
+        priority = PRIORITY_HIGH if nbytes <= self.priority_max_bytes else PRIORITY_LOW
+        slice_size = int(self.bytes_bucket.capacity) if self.bytes_bucket is not None else nbytes
+
+        first = min(nbytes, slice_size) if self.bytes_bucket is not None else 0
+        self._take(priority, 1, first)
+        remaining = nbytes - first if self.bytes_bucket is not None else 0
+        while remaining > 0:
+            portion = min(remaining, slice_size)
+            self._take(priority, 0, portion)
+            remaining -= portion
+
+    def _wait_time(self, requests, nbytes):
+        wait = 0.0
+        if requests and self.requests_bucket is not None:
+            wait = self.requests_bucket.wait_time(requests)
+        if nbytes and self.bytes_bucket is not None:
+            wait = max(wait, self.bytes_bucket.wait_time(nbytes))
+        return wait
+
+    def _take(self, priority, requests, nbytes):
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    if self._waiters[0] == ticket:
+                        wait = self._wait_time(requests, nbytes)
+                        if wait <= 0:
+                            if requests and self.requests_bucket is not None:
+                                self.requests_bucket.consume(requests)
+                            if nbytes and self.bytes_bucket is not None:
+                                self.bytes_bucket.consume(nbytes)
+                            return
+                        self._cond.wait(wait)
+                    else:
+                        # Chỉ request đứng đầu hàng được lấy token; các request khác chờ tới lượt
+                        self._cond.wait()
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
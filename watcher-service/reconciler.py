@@ -0,0 +1,111 @@
+# reconciler.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StartupReconciler:
+    """Quét WATCH_DIR khi khởi động để backup các file đã thay đổi trong lúc Pod không chạy.
+
+    - Duyệt cây thư mục bằng os.scandir, mỗi thư mục con là một task riêng chạy song
+      song trên thread pool (stat() nhả GIL nên các syscall chạy song song thực sự).
+    - So sánh (size, mtime_ns) với trạng thái đã biết và chỉ gửi các file khác đi backup.
+    """
+
+    def __init__(self, watch_dir, known_state, submit, logger=None, workers=16,
+                 recursive=True, skip_suffixes=()):
+        """
+        known_state: dict path -> (size, mtime_ns) từ FileIndex, hoặc
+                     dict path -> mtime (giây) của bản backup mới nhất (từ bucket listing).
+        submit: hàm nhận đường dẫn file cần backup (ví dụ UploadQueue.submit).
+        """
+        self.watch_dir = watch_dir
+        self.known_state = known_state
+        self.submit = submit
+        self.logger = logger
+        self.workers = max(1, workers)
+        self.recursive = recursive
+        self.skip_suffixes = tuple(skip_suffixes)
+
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._done = threading.Condition(self._lock)
+        self._executor = None
+        self.stats = {'directories': 0, 'files': 0, 'changed': 0, 'errors': 0}
+
+    def _is_changed(self, path, stat):
+        known = self.known_state.get(path)
+        if known is None:
+            return True
+        if isinstance(known, tuple):
+            size, mtime_ns = known
+            return size != stat.st_size or mtime_ns != stat.st_mtime_ns
+        # Trạng thái từ bucket: file đổi nếu được sửa sau lần backup mới nhất
+        return stat.st_mtime > known
+
+    def _schedule(self, directory):
+        with self._lock:
+            self._outstanding += 1
+        self._executor.submit(self._scan_dir, directory)
+
+    def _scan_dir(self, directory):
+        changed = []
+        files = 0
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.recursive:
+                                self._schedule(entry.path)
+                            continue
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        if entry.name.endswith(self.skip_suffixes):
+                            continue
+
+                        files += 1
+                        stat = entry.stat(follow_symlinks=False)
+                        if self._is_changed(entry.path, stat):
+                            changed.append(entry.path)
+                    except OSError:
+                        # File biến mất trong lúc quét: bỏ qua
+                        continue
+        except OSError as e:
+            with self._lock:
+                self.stats['errors'] += 1
+            if self.logger:
+                self.logger.log_system_event(f"Reconcile: cannot scan {directory}: {e}", "WARNING")
+
+        for path in changed:
+            self.submit(path)
+
+        with self._lock:
+            self.stats['directories'] += 1
+            self.stats['files'] += files
+            self.stats['changed'] += len(changed)
+            self._outstanding -= 1
+            if self._outstanding == 0:
+                self._done.notify_all()
+
+    def run(self):
+        """Quét toàn bộ cây thư mục, chờ đến khi xong và trả về thống kê."""
+        start = time.time()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="reconcile")
+        try:
+            self._schedule(self.watch_dir)
+            with self._lock:
+                while self._outstanding > 0:
+                    self._done.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+        self.stats['duration_seconds'] = round(time.time() - start, 2)
+        if self.logger:
+            self.logger.log_system_event(
+                f"Reconcile finished: {self.stats['files']} files in {self.stats['directories']} "
+                f"directories scanned, {self.stats['changed']} changed, "
+                f"{self.stats['duration_seconds']}s", "INFO"
+            )
+        return self.stats
@@ -0,0 +1,358 @@
+# retention.py
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from botocore.exceptions import ClientError
+from chunk_store import CHUNK_PREFIX, FORMAT_METADATA_KEY, MANIFEST_FORMAT
+from storage_client import parse_versioned_key
+
+# Giới hạn của S3 DeleteObjects: tối đa 1.000 key mỗi request
+DELETE_BATCH_SIZE = 1000
+
+
+class RetentionPolicy:
+    """Chọn các phiên bản cần giữ của một file gốc.
+
+    - keep_last: N phiên bản mới nhất.
+    - keep_daily / keep_weekly / keep_monthly (grandfather-father-son): phiên bản mới nhất
+      của mỗi ngày / tuần (ISO) / tháng, cho N ngày / tuần / tháng gần nhất có backup.
+    - max_age_days: xóa phiên bản cũ hơn N ngày (áp dụng sau các luật giữ ở trên).
+    Một phiên bản được giữ nếu bất kỳ luật keep_* nào giữ nó (không đặt luật keep_* nào:
+    giữ tất cả, chỉ áp dụng max_age_days). Phiên bản mới nhất của mỗi file luôn được giữ.
+    """
+
+    def __init__(self, keep_last=0, keep_daily=0, keep_weekly=0, keep_monthly=0, max_age_days=0):
+        self.keep_last = keep_last
+        self.keep_daily = keep_daily
+        self.keep_weekly = keep_weekly
+        self.keep_monthly = keep_monthly
+        self.max_age_days = max_age_days
+
+    def is_enabled(self):
+        return any((self.keep_last, self.keep_daily, self.keep_weekly, self.keep_monthly, self.max_age_days))
+
+    def describe(self):
+        return (
+            f"keep_last={self.keep_last} daily={self.keep_daily} weekly={self.keep_weekly} "
+            f"monthly={self.keep_monthly} max_age_days={self.max_age_days}"
+        )
+
+    @staticmethod
+    def _keep_per_period(versions, count, period_of, keep):
+        periods = set()
+        for key, backup_time in versions:
+            if len(periods) >= count:
+                return
+            period = period_of(backup_time)
+            if period not in periods:
+                periods.add(period)
+                keep.add(key)
+
+    def select(self, versions, now):
+        """`versions`: list (key, thời điểm backup) của một file gốc. Trả về tập key được giữ."""
+        versions = sorted(versions, key=lambda version: version[1], reverse=True)
+        if not versions:
+            return set()
+
+        rules = (self.keep_last, self.keep_daily, self.keep_weekly, self.keep_monthly)
+        if any(rules):
+            keep = {key for key, _ in versions[:self.keep_last]}
+            self._keep_per_period(versions, self.keep_daily, lambda t: t.date(), keep)
+            self._keep_per_period(versions, self.keep_weekly, lambda t: t.isocalendar()[:2], keep)
+            self._keep_per_period(versions, self.keep_monthly, lambda t: (t.year, t.month), keep)
+        else:
+            keep = {key for key, _ in versions}
+
+        if self.max_age_days:
+            cutoff = now - timedelta(days=self.max_age_days)
+            keep = {key for key, backup_time in versions if key in keep and backup_time >= cutoff}
+
+        keep.add(versions[0][0])
+        return keep
+
+
+class RetentionEngine:
+    """Dọn các phiên bản backup cũ theo RetentionPolicy.
+
+    Liệt kê bucket (phân trang), nhóm các versioned key theo file gốc, tính phiên bản cần
+    xóa rồi xóa bằng DeleteObjects theo lô tối đa 1.000 key. Thời điểm backup lấy từ
+    timestamp trong key (giờ địa phương như Watcher ghi); object khác không bao giờ bị xóa.
+
+    chunk_store (chỉ khi chạy trong Watcher): sau khi xóa manifest, xóa các chunk không còn
+    manifest nào tham chiếu và cũ hơn `chunk_grace_hours`. Tập chunk còn tham chiếu lấy từ
+    chunk_store.manifest_index (nếu có). Bước xóa chunk chặn upload chunked để không xóa
+    chunk mà một upload đang dùng lại.
+    """
+
+    def __init__(self, storage_client, policy, logger=None, batch_size=DELETE_BATCH_SIZE,
+                 dry_run=False, chunk_store=None, chunk_grace_hours=24, concurrency=8):
+        self.storage_client = storage_client
+        self.s3_client = storage_client.s3_client
+        self.bucket_name = storage_client.bucket_name
+        self.policy = policy
+        self.logger = logger
+        self.batch_size = min(max(1, batch_size), DELETE_BATCH_SIZE)
+        self.dry_run = dry_run
+        self.chunk_store = chunk_store
+        self.chunk_grace_hours = chunk_grace_hours
+        self.concurrency = max(1, concurrency)
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _log(self, message, level="INFO"):
+        if self.logger:
+            self.logger.log_system_event(message, level)
+
+    def _iter_objects(self, prefix=''):
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            # Dừng giữa chừng bằng exception: listing không đầy đủ sẽ cho kết quả xóa sai
+            if self._stop.is_set():
+                raise RuntimeError("Retention stopped during bucket listing")
+            for obj in page.get('Contents', []):
+                yield obj
+
+    # ---- Tính phiên bản cần xóa ----
+
+    def plan(self, now=None):
+        """Trả về (danh sách key cần xóa, số file gốc, số phiên bản đã xét)."""
+        now = now or datetime.now()
+        groups = {}
+        scanned = 0
+        for obj in self._iter_objects():
+            key = obj['Key']
+            if key.startswith(CHUNK_PREFIX):
+                continue
+            parsed = parse_versioned_key(key)
+            if parsed is None:
+                continue  # Không phải phiên bản do Watcher tạo: không bao giờ xóa
+            original_name, backup_time = parsed
+            groups.setdefault(original_name, []).append((key, backup_time))
+            scanned += 1
+
+        victims = []
+        for versions in groups.values():
+            keep = self.policy.select(versions, now)
+            victims.extend(key for key, _ in versions if key not in keep)
+        return sorted(victims), len(groups), scanned
+
+    # ---- Xóa theo lô ----
+
+    def delete_keys(self, keys):
+        """Xóa `keys` bằng DeleteObjects theo lô; trả về (số key đã xóa, list lỗi)."""
+        deleted = 0
+        errors = []
+        for start in range(0, len(keys), self.batch_size):
+            if self._stop.is_set():
+                break  # Watcher đang dừng: phần còn lại được xóa ở lần chạy sau
+            batch = keys[start:start + self.batch_size]
+            self.storage_client.throttle()
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+            )
+            # Quiet: S3 chỉ trả về các key xóa lỗi
+            batch_errors = response.get('Errors', [])
+            errors.extend(batch_errors)
+            deleted += len(batch) - len(batch_errors)
+        return deleted, errors
+
+    # ---- Dọn chunk ----
+
+    def _manifest_chunks(self, key):
+        """Các chunk digest mà object `key` tham chiếu (rỗng nếu không phải manifest, None nếu
+        object đã bị xóa). Chỉ GET object có metadata manifest."""
+        try:
+            head = self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+            if head.get('Metadata', {}).get(FORMAT_METADATA_KEY) != MANIFEST_FORMAT:
+                return ()
+            body = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)['Body']
+            manifest = json.loads(body.read())
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return None
+            raise
+        return [chunk['hash'] for chunk in manifest['chunks']]
+
+    def _referenced_chunks(self):
+        """Tập chunk digest được các object còn lại trong bucket tham chiếu.
+
+        Lấy từ ManifestIndex (manifest do ChunkStore ghi nhận, object đã kiểm tra ở lần trước);
+        chỉ object chưa có trong chỉ mục (backup cũ, ghi bởi Pod khác) mới bị HEAD (và GET
+        nếu là manifest) qua S3, rồi được lưu vào chỉ mục cho các lần dọn sau.
+        """
+        index = self.chunk_store.manifest_index
+        keys = [obj['Key'] for obj in self._iter_objects() if not obj['Key'].startswith(CHUNK_PREFIX)]
+        known = index.snapshot() if index is not None else {}
+
+        referenced = set()
+        unknown = []
+        for key in keys:
+            if key in known:
+                referenced.update(known[key])
+            else:
+                unknown.append(key)
+
+        found = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for key, digests in zip(unknown, executor.map(self._manifest_chunks, unknown)):
+                if digests is not None:
+                    referenced.update(digests)
+                    found.append((key, digests))
+
+        if index is not None:
+            index.record_many(found)
+            # Object không còn trong bucket (đã bị xóa, kể cả bởi CronJob retention)
+            live = set(keys)
+            index.remove_many([key for key in known if key not in live])
+        if unknown:
+            self._log(f"Retention: inspected {len(unknown)} unindexed object(s) for chunk references", "DEBUG")
+        return referenced
+
+    def collect_chunks(self):
+        """Xóa chunk không còn được tham chiếu; trả về số chunk đã xóa (hoặc sẽ xóa nếu dry_run)."""
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=self.chunk_grace_hours)
+
+        # 1. Chunk đủ cũ (chunk mới có thể thuộc một upload chưa ghi manifest)
+        candidates = {
+            obj['Key'].rsplit('/', 1)[-1]: obj['Key']
+            for obj in self._iter_objects(CHUNK_PREFIX)
+            if obj['LastModified'] < cutoff
+        }
+        if not candidates:
+            return 0
+
+        # 2. Chunk được các manifest còn lại tham chiếu.
+        # Manifest ghi sau thời điểm này được ChunkStore ghi nhận riêng (begin_collect)
+        self.chunk_store.begin_collect()
+        try:
+            referenced = self._referenced_chunks()
+        except BaseException:
+            self.chunk_store.end_collect()
+            raise
+
+        # 3. Xóa trong lúc chặn upload chunked; bỏ qua chunk mà các upload vừa xong dùng lại
+        with self.chunk_store.collecting() as touched:
+            garbage = sorted(set(candidates) - referenced - touched)
+            if self.dry_run or not garbage:
+                return len(garbage)
+            self.chunk_store.forget(garbage)
+            deleted, errors = self.delete_keys([candidates[digest] for digest in garbage])
+        if errors:
+            self._log(f"Retention: failed to delete {len(errors)} chunk(s), e.g. {errors[0]}", "WARNING")
+        return deleted
+
+    # ---- Chạy ----
+
+    def run(self, now=None):
+        """Một lần dọn: tính phiên bản cần xóa, xóa theo lô, rồi dọn chunk (nếu bật)."""
+        started = datetime.now()
+        victims, files, scanned = self.plan(now)
+        summary = {
+            'files': files,
+            'versions': scanned,
+            'expired': len(victims),
+            'deleted': 0,
+            'errors': 0,
+            'chunks_deleted': 0,
+            'dry_run': self.dry_run
+        }
+
+        if self.dry_run:
+            for key in victims:
+                self._log(f"Retention (dry run): would delete {key}", "DEBUG")
+        elif victims:
+            deleted, errors = self.delete_keys(victims)
+            summary['deleted'] = deleted
+            summary['errors'] = len(errors)
+            if errors:
+                self._log(
+                    f"Retention: failed to delete {len(errors)} object(s), e.g. {errors[0]}", "WARNING"
+                )
+
+        if self.chunk_store is not None:
+            summary['chunks_deleted'] = self.collect_chunks()
+
+        self._log(
+            f"Retention{' (dry run)' if self.dry_run else ''} [{self.policy.describe()}]: "
+            f"{files} files, {scanned} versions, {len(victims)} expired, {summary['deleted']} deleted, "
+            f"{summary['chunks_deleted']} unreferenced chunks in {(datetime.now() - started).total_seconds():.1f}s",
+            "INFO"
+        )
+        return summary
+
+    # ---- Job định kỳ trong Watcher ----
+
+    def start(self, interval_seconds, initial_delay=60):
+        self._thread = threading.Thread(
+            target=self._run_periodic,
+            args=(interval_seconds, initial_delay),
+            name="retention",
+            daemon=True
+        )
+        self._thread.start()
+
+    def _run_periodic(self, interval_seconds, initial_delay):
+        delay = initial_delay
+        while not self._stop.wait(delay):
+            try:
+                self.run()
+            except Exception as e:
+                self._log(f"Retention run failed: {e}", "ERROR")
+            delay = interval_seconds
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# Hàm tiện ích để tạo policy từ biến môi trường (dùng chung cho Watcher và CronJob)
+def create_policy_from_env():
+    return RetentionPolicy(
+        keep_last=int(os.getenv("RETENTION_KEEP_LAST", "0")),
+        keep_daily=int(os.getenv("RETENTION_KEEP_DAILY", "0")),
+        keep_weekly=int(os.getenv("RETENTION_KEEP_WEEKLY", "0")),
+        keep_monthly=int(os.getenv("RETENTION_KEEP_MONTHLY", "0")),
+        max_age_days=int(os.getenv("RETENTION_MAX_AGE_DAYS", "0"))
+    )
+
+
+def main():
+    """Chạy một lần dọn (K8s CronJob): python retention.py [--dry-run]."""
+    from storage_client import create_client_from_env
+    from backup_logger import get_logger
+
+    logger = get_logger(
+        name="retention",
+        log_dir=os.getenv("LOG_DIR", "/app/logs"),
+        log_level=os.getenv("LOG_LEVEL", "INFO"),
+        json_format=os.getenv("JSON_LOG_FORMAT", "jsonl")
+    )
+    policy = create_policy_from_env()
+    if not policy.is_enabled():
+        logger.log_system_event("Retention: no policy configured (RETENTION_KEEP_* / RETENTION_MAX_AGE_DAYS), nothing to do.", "WARNING")
+        return 0
+
+    # Không dọn chunk ở đây: cache chunk của Watcher đang chạy không biết chunk đã bị xóa
+    engine = RetentionEngine(
+        create_client_from_env(),
+        policy,
+        logger=logger,
+        batch_size=int(os.getenv("RETENTION_DELETE_BATCH", str(DELETE_BATCH_SIZE))),
+        dry_run="--dry-run" in sys.argv[1:] or os.getenv("RETENTION_DRY_RUN", "false").lower() == "true"
+    )
+    try:
+        summary = engine.run()
+    finally:
+        logger.close()
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
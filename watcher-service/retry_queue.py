@@ -0,0 +1,313 @@
+# retry_queue.py
+import os
+import time
+import random
+import sqlite3
+import threading
+from botocore.exceptions import BotoCoreError, ClientError
+
+# Mã lỗi S3 cho thấy MinIO đang quá tải / không sẵn sàng (tính vào circuit breaker)
+TRANSIENT_ERROR_CODES = {
+    "SlowDown", "ServiceUnavailable", "InternalError", "RequestTimeout",
+    "RequestTimeTooSkewed", "Throttling", "ThrottlingException", "XMinioServerNotInitialized"
+}
+
+
+def is_transient_error(error):
+    """Lỗi do MinIO/mạng (không phải do file): mở circuit breaker khi lặp lại liên tục."""
+    if isinstance(error, BotoCoreError):
+        return True
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+        return code in TRANSIENT_ERROR_CODES or status >= 500
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+def is_retryable_error(error):
+    """File đã bị xóa thì không cần thử lại; mọi lỗi khác đều được đưa vào hàng đợi thử lại."""
+    return not isinstance(error, FileNotFoundError)
+
+
+class RetryPolicy:
+    """Exponential backoff với full jitter: delay ngẫu nhiên trong [0, min(max, base * 2^n)]."""
+
+    def __init__(self, base_delay=2.0, max_delay=900.0, multiplier=2.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    def delay(self, attempt):
+        ceiling = min(self.max_delay, self.base_delay * (self.multiplier ** max(0, attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """Ngắt upload khi MinIO liên tục lỗi để không dội request vào storage đang sập.
+
+    closed -> (failure_threshold lỗi liên tiếp) -> open -> (sau reset_timeout) -> half_open:
+    chỉ cho một upload thử; thành công thì closed, thất bại thì open lại.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, logger=None):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.logger = logger
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def retry_after(self):
+        """Số giây còn lại trước khi cho phép upload thử (0 nếu đang closed)."""
+        with self._lock:
+            if self._current_state() != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self):
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED and self.logger:
+                self.logger.log_system_event("Circuit breaker closed: MinIO uploads succeed again.", "INFO")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Upload thử kết thúc mà không cho biết gì về MinIO (lỗi do file, bị bỏ qua...):
+        vẫn half_open, upload kế tiếp được làm lượt thử mới."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            state = self._current_state()
+            if state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if state != self.OPEN and self.logger:
+                    self.logger.log_system_event(
+                        f"Circuit breaker OPEN after {self._failures} consecutive failures; "
+                        f"pausing uploads for {self.reset_timeout:.0f}s.", "ERROR"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class RetryQueue:
+    """Hàng đợi thử lại lưu trên đĩa (SQLite), còn nguyên sau khi Pod khởi động lại.
+
+    - Mỗi file lỗi được hẹn lại sau RetryPolicy.delay(attempts) giây.
+    - Một thread nền gửi lại các file đến hạn qua `submit`, tối đa `drain_batch` file mỗi
+      `poll_interval` giây, và dừng hẳn khi circuit breaker đang mở (tránh thundering herd).
+    - Thất bại quá `max_attempts` lần (0: không giới hạn) thì bỏ và ghi log lỗi.
+    """
+
+    # Thời gian giữ chỗ cho một file đã gửi lại, tránh gửi trùng khi nó còn nằm trong hàng đợi upload
+    LEASE_SECONDS = 300.0
+
+    def __init__(self, db_path, submit=None, policy=None, breaker=None, max_attempts=20,
+                 drain_batch=20, poll_interval=1.0, logger=None):
+        self.db_path = db_path
+        self.submit = submit
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker(logger=logger)
+        self.max_attempts = max_attempts
+        self.drain_batch = max(1, drain_batch)
+        self.poll_interval = poll_interval
+        self.logger = logger
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS retries (
+                path            TEXT PRIMARY KEY,
+                attempts        INTEGER NOT NULL,
+                next_attempt_at REAL NOT NULL,
+                last_error      TEXT,
+                first_failed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_retries_due ON retries (next_attempt_at)")
+        # Lease của lần chạy trước không còn ý nghĩa: thử lại ngay các file đang chờ
+        self._conn.execute("UPDATE retries SET next_attempt_at = MIN(next_attempt_at, ?)", (time.time(),))
+        self._conn.commit()
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- Gọi từ BackupEventHandler ----
+
+    def allow_upload(self):
+        return self.breaker.allow()
+
+    def defer(self, file_path):
+        """Circuit đang mở: hẹn lại file sau khi breaker cho phép, giãn ngẫu nhiên để tránh dồn cục."""
+        wait = self.breaker.retry_after() + random.uniform(0, self.breaker.reset_timeout)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO retries (path, attempts, next_attempt_at, last_error, first_failed_at)
+                VALUES (?, 0, ?, 'deferred: circuit open', ?)
+                ON CONFLICT(path) DO UPDATE SET next_attempt_at = excluded.next_attempt_at
+                """,
+                (file_path, now + wait, now)
+            )
+            self._conn.commit()
+
+    def record_success(self, file_path):
+        self.breaker.record_success()
+        self.remove(file_path)
+
+    def record_failure(self, file_path, error, error_message):
+        """Ghi nhận lỗi upload; trả về số giây đến lần thử tiếp theo, hoặc None nếu không thử lại."""
+        if is_transient_error(error):
+            self.breaker.record_failure()
+        else:
+            # Không để lượt thử half_open treo mãi khi nó lỗi vì lý do khác MinIO
+            self.breaker.release_probe()
+        if not is_retryable_error(error):
+            self.remove(file_path)
+            return None
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts FROM retries WHERE path = ?", (file_path,)
+            ).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            if self.max_attempts and attempts > self.max_attempts:
+                self._conn.execute("DELETE FROM retries WHERE path = ?", (file_path,))
+                self._conn.commit()
+                give_up = True
+            else:
+                delay = max(self.policy.delay(attempts), self.breaker.retry_after())
+                self._conn.execute(
+                    """
+                    INSERT INTO retries (path, attempts, next_attempt_at, last_error, first_failed_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET
+                        attempts = excluded.attempts,
+                        next_attempt_at = excluded.next_attempt_at,
+                        last_error = excluded.last_error
+                    """,
+                    (file_path, attempts, now + delay, error_message, now)
+                )
+                self._conn.commit()
+                give_up = False
+
+        if give_up:
+            if self.logger:
+                self.logger.log_system_event(
+                    f"Giving up on {file_path} after {self.max_attempts} failed attempts: {error_message}",
+                    "ERROR"
+                )
+            return None
+        if self.logger:
+            self.logger.log_system_event(
+                f"Retry #{attempts} for {file_path} scheduled in {delay:.1f}s", "WARNING"
+            )
+        return delay
+
+    def remove(self, file_path):
+        with self._lock:
+            self._conn.execute("DELETE FROM retries WHERE path = ?", (file_path,))
+            self._conn.commit()
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM retries").fetchone()[0]
+
+    # ---- Thread gửi lại ----
+
+    def start(self, submit=None):
+        if submit is not None:
+            self.submit = submit
+        self._thread = threading.Thread(target=self._run, name="retry-queue", daemon=True)
+        self._thread.start()
+
+    def _take_due(self, limit):
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM retries WHERE next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            paths = [row[0] for row in rows]
+            self._conn.executemany(
+                "UPDATE retries SET next_attempt_at = ? WHERE path = ?",
+                [(now + self.LEASE_SECONDS, path) for path in paths]
+            )
+            self._conn.commit()
+        return paths
+
+    def drain_once(self):
+        """Gửi lại các file đến hạn (một lô); trả về số file đã gửi."""
+        state = self.breaker.state
+        if state == CircuitBreaker.OPEN:
+            return 0
+        # Half-open: chỉ cần một upload thử để biết MinIO đã sống lại chưa
+        limit = 1 if state == CircuitBreaker.HALF_OPEN else self.drain_batch
+
+        submitted = 0
+        for file_path in self._take_due(limit):
+            if not os.path.exists(file_path):
+                self.remove(file_path)
+                continue
+            self.submit(file_path)
+            submitted += 1
+        return submitted
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.drain_once()
+            except Exception as e:
+                if self.logger:
+                    self.logger.log_system_event(f"Retry queue error: {e}", "ERROR")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._conn.close()
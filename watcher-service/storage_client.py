@@ -1,9 +1,42 @@
 # storage_client.py (ĐÃ SỬA ĐỔI)
 import os
-import boto3
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
-from datetime import datetime # Thêm import này
+from datetime import datetime, timedelta, timezone # Thêm import này
+from chunk_store import ChunkStore, ContentDefinedChunker, KB
+from rate_limiter import RateLimiter
+from s3_connection import create_s3_client
+from compression import (
+    CODEC_METADATA_KEY,
+    ORIGINAL_SIZE_METADATA_KEY,
+    is_worth_compressing,
+    iter_compressed,
+    resolve_codec
+)
+
+MB = 1024 * 1024
+
+# Giới hạn của S3 multipart: part tối thiểu 5 MB (trừ part cuối), tối đa 10.000 part
+S3_MIN_PART_SIZE = 5 * MB
+S3_MAX_PARTS = 10000
+
+# Versioned key: <thư mục/>tên_YYYYMMDD_HHMMSS.ext
+VERSIONED_KEY_PATTERN = re.compile(
+    r"^(?P<stem>.+)_(?P<timestamp>\d{8}_\d{6})(?P<ext>\.[^./]*)?$"
+)
+
+
+def parse_versioned_key(key):
+    """Tách versioned key thành (tên file gốc, datetime backup); None nếu không đúng định dạng."""
+    match = VERSIONED_KEY_PATTERN.match(key)
+    if not match:
+        return None
+    original_name = match.group('stem') + (match.group('ext') or '')
+    timestamp = datetime.strptime(match.group('timestamp'), "%Y%m%d_%H%M%S")
+    return original_name, timestamp
 
 # Tải các biến môi trường từ file .env (nếu có)
 load_dotenv()
@@ -11,17 +44,60 @@ load_dotenv()
 class StorageClient:
     """Class xử lý giao tiếp với S3-compatible storage (MinIO)."""
     
-    def __init__(self, endpoint, access_key, secret_key, bucket_name):
+    def __init__(
+        self,
+        endpoint,
+        access_key,
+        secret_key,
+        bucket_name,
+        multipart_threshold=64 * MB,
+        multipart_part_size=16 * MB,
+        multipart_concurrency=4,
+        chunked_threshold=None,
+        chunk_avg_size=1 * MB,
+        compression_codec=None,
+        compression_level=None,
+        compression_min_ratio=0.9,
+        rate_limiter=None
+    ):
         self.bucket_name = bucket_name
         self.endpoint = endpoint
+        # Giữ lại để runtime asyncio tạo client aiobotocore với cùng thông tin đăng nhập
+        self.access_key = access_key
+        self.secret_key = secret_key
         
-        # 1. Khởi tạo S3 Client
-        self.s3_client = boto3.client(
-            's3',
-            endpoint_url=endpoint,
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key
-        )
+        # Cấu hình multipart: file >= threshold sẽ được upload theo từng part song song
+        self.multipart_threshold = multipart_threshold
+        self.multipart_part_size = max(multipart_part_size, S3_MIN_PART_SIZE)
+        self.multipart_concurrency = max(1, multipart_concurrency)
+        
+        # Nén khi upload (None: tắt). Codec được lưu vào metadata để Web Admin giải nén khi restore
+        self.compression_codec = compression_codec
+        self.compression_level = compression_level
+        self.compression_min_ratio = compression_min_ratio
+        
+        # Giới hạn băng thông / số request tới MinIO (None: không giới hạn)
+        self.rate_limiter = rate_limiter
+        
+        # 1. Khởi tạo S3 Client (tạo lười; pool, keep-alive, retry, timeout từ s3_connection)
+        self.s3_client = create_s3_client(endpoint, access_key, secret_key)
+        
+        # Chế độ lưu chunk (content-defined chunking) cho file >= chunked_threshold.
+        # None: tắt, mọi file được upload nguyên vẹn như cũ.
+        self.chunked_threshold = chunked_threshold
+        self.chunk_store = None
+        if chunked_threshold is not None:
+            self.chunk_store = ChunkStore(
+                self.s3_client,
+                bucket_name,
+                chunker=ContentDefinedChunker(
+                    min_size=chunk_avg_size // 4,
+                    avg_size=chunk_avg_size,
+                    max_size=chunk_avg_size * 4
+                ),
+                concurrency=self.multipart_concurrency,
+                throttle=self.throttle
+            )
         
     def ensure_bucket_exists(self, logger=None):
         # ... (Hàm này giữ nguyên)
@@ -45,34 +121,295 @@ class StorageClient:
                     logger.log_system_event(f"Error checking bucket '{self.bucket_name}': {e}", "ERROR")
                 raise
 
-    def upload(self, file_path: str):
-        """Upload file từ đường dẫn cục bộ lên MinIO, sử dụng Versioning Key."""
-        
-        file_name = os.path.basename(file_path)
+    def throttle(self, nbytes=0):
+        """Chờ token của rate limiter trước khi gửi một request mang `nbytes` byte."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(nbytes)
+
+    def versioned_key_for(self, file_name):
+        """Tạo Unique Versioning Key: filename_YYYYMMDD_HHmmss.ext"""
         base, ext = os.path.splitext(file_name)
-        
-        # Tạo Unique Versioning Key: filename_YYYYMMDD_HHmmss.ext
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        versioned_key = f"{base}_{timestamp}{ext}" # Key S3 mới
+        return f"{base}_{timestamp}{ext}" # Key S3 mới
 
-        with open(file_path, "rb") as f:
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=versioned_key, # SỬ DỤNG KEY CÓ VERSION
-                Body=f
-            )
-        
+    def upload_mode(self, file_path, file_size):
+        """Cách upload() sẽ gửi file: "chunked", "compressed", "multipart" hoặc "put"."""
+        if self.chunk_store is not None and file_size >= self.chunked_threshold:
+            return "chunked"
+        if self.compression_codec and is_worth_compressing(
+                file_path, self.compression_codec, self.compression_level, self.compression_min_ratio):
+            return "compressed"
+        if file_size >= self.multipart_threshold:
+            return "multipart"
+        return "put"
+
+    def upload_result(self, file_name, versioned_key, stored_size, chunk_info=None, codec=None,
+                      object_size=None):
         return {
             'destination': f"s3://{self.bucket_name}/{versioned_key}",
             'filename': file_name,
-            'versioned_key': versioned_key # Trả về key mới
+            'versioned_key': versioned_key, # Trả về key mới
+            'chunked': chunk_info,
+            'codec': codec,
+            'stored_size': stored_size,
+            # Kích thước object tại versioned key (bản nén / manifest), đúng như listing bucket
+            'object_size': stored_size if object_size is None else object_size
         }
 
-# Hàm tiện ích để tạo client từ biến môi trường (Giữ nguyên)
+    def upload(self, file_path: str, object_name: str = None, mode: str = None):
+        """Upload file từ đường dẫn cục bộ lên MinIO, sử dụng Versioning Key.
+        
+        object_name: đường dẫn tương đối trong WATCH_DIR (ví dụ "docs/report.pdf") để
+        các file trùng tên ở thư mục con không ghi đè lên nhau; mặc định là tên file.
+        mode: kết quả upload_mode() nếu đã tính trước (tránh đọc mẫu nén lần nữa).
+        """
+        
+        file_name = object_name or os.path.basename(file_path)
+        versioned_key = self.versioned_key_for(file_name)
+
+        file_size = os.path.getsize(file_path)
+        mode = mode or self.upload_mode(file_path, file_size)
+        chunk_info = None
+        codec = None
+        stored_size = file_size
+        if mode == "chunked":
+            # Chỉ upload các chunk chưa có + manifest tại versioned key
+            chunk_info = self.chunk_store.upload(file_path, versioned_key, file_name)
+            stored_size = chunk_info['uploaded_bytes']
+        elif mode == "compressed":
+            codec = self.compression_codec
+            stored_size = self._compressed_upload(file_path, versioned_key, file_size, codec)
+        elif mode == "multipart":
+            self._multipart_upload(file_path, versioned_key, file_size)
+        else:
+            self.throttle(file_size)
+            with open(file_path, "rb") as f:
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=versioned_key, # SỬ DỤNG KEY CÓ VERSION
+                    Body=f
+                )
+        
+        object_size = chunk_info['manifest_bytes'] if chunk_info else stored_size
+        return self.upload_result(file_name, versioned_key, stored_size, chunk_info, codec, object_size)
+
+    def latest_backup_times(self):
+        """Liệt kê bucket (phân trang) và trả về tên file gốc -> thời điểm backup mới nhất."""
+        latest = {}
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name):
+            for obj in page.get('Contents', []):
+                parsed = parse_versioned_key(obj['Key'])
+                if parsed is None:
+                    continue
+                original_name, _ = parsed
+                modified = obj['LastModified'].timestamp()
+                if modified > latest.get(original_name, 0):
+                    latest[original_name] = modified
+        return latest
+
+    def _part_size_for(self, file_size):
+        """Tăng part size nếu cần để không vượt quá 10.000 part của S3."""
+        part_size = self.multipart_part_size
+        while part_size * S3_MAX_PARTS < file_size:
+            part_size *= 2
+        return part_size
+
+    def _upload_part(self, key, upload_id, part_number, data):
+        self.throttle(len(data))
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket_name,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data
+        )
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+    def _abort_multipart(self, key, upload_id):
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id
+            )
+        except ClientError:
+            pass
+
+    def _compressed_upload(self, file_path, key, file_size, codec):
+        """Nén file theo luồng và upload; trả về số byte thực sự lưu trên MinIO.
+
+        Dữ liệu nén được gom thành từng part: nếu cả file nén nhỏ hơn 1 part thì dùng
+        put_object, ngược lại chuyển sang multipart và gửi các part song song ngay khi đủ dữ liệu.
+        """
+        metadata = {
+            CODEC_METADATA_KEY: codec,
+            ORIGINAL_SIZE_METADATA_KEY: str(file_size)
+        }
+        part_size = self._part_size_for(file_size)
+        buffer = bytearray()
+        stored_size = 0
+        upload_id = None
+        part_number = 0
+        futures = []
+        # Giới hạn số part đang chờ gửi để bộ nhớ không tăng theo kích thước file
+        slots = threading.BoundedSemaphore(self.multipart_concurrency * 2)
+
+        executor = ThreadPoolExecutor(max_workers=self.multipart_concurrency)
+        try:
+            def submit_part(data):
+                nonlocal part_number
+                part_number += 1
+                slots.acquire()
+                future = executor.submit(self._upload_part, key, upload_id, part_number, data)
+                future.add_done_callback(lambda _: slots.release())
+                futures.append(future)
+
+                # Dừng nén và abort sớm nếu một part trước đó đã lỗi
+                failed = next((fu for fu in futures if fu.done() and fu.exception()), None)
+                if failed is not None:
+                    failed.result()
+
+            with open(file_path, "rb") as f:
+                for block in iter_compressed(f, codec, self.compression_level):
+                    buffer.extend(block)
+                    stored_size += len(block)
+                    while len(buffer) >= part_size:
+                        if upload_id is None:
+                            self.throttle()
+                            upload_id = self.s3_client.create_multipart_upload(
+                                Bucket=self.bucket_name,
+                                Key=key,
+                                Metadata=metadata
+                            )['UploadId']
+                        submit_part(bytes(buffer[:part_size]))
+                        del buffer[:part_size]
+
+            if upload_id is None:
+                self.throttle(len(buffer))
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=key,
+                    Body=bytes(buffer),
+                    Metadata=metadata
+                )
+                return stored_size
+
+            if buffer:
+                submit_part(bytes(buffer))
+            parts = [future.result() for future in futures]
+            self.throttle()
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+            return stored_size
+        except Exception:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if upload_id is not None:
+                self._abort_multipart(key, upload_id)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+    def _multipart_upload(self, file_path, key, file_size):
+        """Upload multipart: đọc từng part trực tiếp từ đĩa và gửi song song.
+
+        Mỗi worker chỉ đọc part của mình khi đến lượt, nên bộ nhớ dùng tối đa
+        khoảng concurrency * part_size thay vì toàn bộ file.
+        Nếu có lỗi, multipart upload sẽ bị abort để MinIO không giữ part mồ côi.
+        """
+        part_size = self._part_size_for(file_size)
+        part_count = (file_size + part_size - 1) // part_size
+
+        self.throttle()
+        upload_id = self.s3_client.create_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=key
+        )['UploadId']
+
+        def upload_part(part_number):
+            offset = (part_number - 1) * part_size
+            with open(file_path, "rb") as f:
+                f.seek(offset)
+                data = f.read(part_size)
+            return self._upload_part(key, upload_id, part_number, data)
+
+        executor = ThreadPoolExecutor(max_workers=self.multipart_concurrency)
+        try:
+            futures = [
+                executor.submit(upload_part, part_number)
+                for part_number in range(1, part_count + 1)
+            ]
+            parts = [future.result() for future in futures]
+
+            self.throttle()
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            # Hủy các part chưa chạy, chờ các part đang gửi rồi abort toàn bộ upload
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._abort_multipart(key, upload_id)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+    def abort_stale_multipart_uploads(self, older_than_hours=24, logger=None):
+        """Abort các multipart upload dang dở (ví dụ Pod bị kill giữa chừng) quá `older_than_hours`."""
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=older_than_hours)
+        aborted = 0
+
+        paginator = self.s3_client.get_paginator('list_multipart_uploads')
+        for page in paginator.paginate(Bucket=self.bucket_name):
+            for upload in page.get('Uploads', []):
+                if upload['Initiated'] >= cutoff:
+                    continue
+                try:
+                    self.s3_client.abort_multipart_upload(
+                        Bucket=self.bucket_name,
+                        Key=upload['Key'],
+                        UploadId=upload['UploadId']
+                    )
+                    aborted += 1
+                except ClientError as e:
+                    if logger:
+                        logger.log_system_event(
+                            f"Failed to abort multipart upload {upload['Key']}: {e}", "WARNING"
+                        )
+
+        if logger and aborted:
+            logger.log_system_event(f"Aborted {aborted} stale multipart upload(s).", "WARNING")
+        return aborted
+
+# Hàm tiện ích để tạo client từ biến môi trường
 def create_client_from_env():
     return StorageClient(
         endpoint=os.getenv("MINIO_ENDPOINT"),
         access_key=os.getenv("MINIO_ACCESS_KEY"),
         secret_key=os.getenv("MINIO_SECRET_KEY"),
-        bucket_name=os.getenv("MINIO_BUCKET")
+        bucket_name=os.getenv("MINIO_BUCKET"),
+        multipart_threshold=int(os.getenv("MULTIPART_THRESHOLD_MB", "64")) * MB,
+        multipart_part_size=int(os.getenv("MULTIPART_PART_SIZE_MB", "16")) * MB,
+        multipart_concurrency=int(os.getenv("MULTIPART_CONCURRENCY", "4")),
+        chunked_threshold=(
+            int(os.getenv("CHUNKED_THRESHOLD_MB", "256")) * MB
+            if os.getenv("CHUNKED_STORAGE_ENABLED", "false").lower() == "true"
+            else None
+        ),
+        chunk_avg_size=int(os.getenv("CHUNK_AVG_SIZE_KB", "1024")) * KB,
+        compression_codec=resolve_codec(os.getenv("COMPRESSION_CODEC", "none")),
+        compression_level=int(os.getenv("COMPRESSION_LEVEL")) if os.getenv("COMPRESSION_LEVEL") else None,
+        compression_min_ratio=float(os.getenv("COMPRESSION_MIN_RATIO", "0.9")),
+        rate_limiter=RateLimiter(
+            bytes_per_second=float(os.getenv("UPLOAD_RATE_LIMIT_MBPS", "0")) * MB,
+            requests_per_second=float(os.getenv("UPLOAD_RATE_LIMIT_RPS", "0")),
+            burst_seconds=float(os.getenv("UPLOAD_RATE_BURST_SECONDS", "1")),
+            priority_max_bytes=int(os.getenv("UPLOAD_PRIORITY_MAX_KB", "1024")) * KB
+        )
     )
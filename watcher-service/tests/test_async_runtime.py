@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import sys
+import asyncio
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from async_runtime import AsyncStorageClient, ByteBudget
+
+KB = 1024
+
+
+class FakeStorageClient:
+    bucket_name = "backups"
+
+    def upload_mode(self, file_path, file_size):
+        return "put"
+
+    def throttle(self, nbytes=0):
+        pass
+
+    def versioned_key_for(self, file_name):
+        return file_name
+
+    def upload_result(self, file_name, versioned_key, stored_size):
+        return {'destination': f"s3://backups/{versioned_key}", 'stored_size': stored_size}
+
+
+class FakeAioClient:
+    """put_object giả: ghi lại tổng số byte body đang được giữ cùng lúc."""
+
+    def __init__(self):
+        self.in_memory = 0
+        self.peak = 0
+
+    async def put_object(self, Bucket, Key, Body):
+        self.in_memory += len(Body)
+        self.peak = max(self.peak, self.in_memory)
+        await asyncio.sleep(0.01)
+        self.in_memory -= len(Body)
+
+
+def test_inline_bodies_stay_within_byte_budget(tmp_path):
+    """Concurrent small uploads never hold more than the inline budget in memory."""
+
+    paths = []
+    for i in range(20):
+        path = tmp_path / f"f{i}.bin"
+        path.write_bytes(b"x" * (100 * KB))
+        paths.append(str(path))
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            client = AsyncStorageClient(
+                FakeStorageClient(), executor, inline_put_max=1024 * KB, inline_budget=300 * KB
+            )
+            client._client = FakeAioClient()
+            results = await asyncio.gather(*(client.upload(path) for path in paths))
+            return client._client, results
+
+    aio, results = asyncio.run(run())
+    assert len(results) == 20 and all(r['stored_size'] == 100 * KB for r in results)
+    assert 100 * KB <= aio.peak <= 300 * KB
+
+
+def test_body_larger_than_budget_still_goes_through_alone():
+    """A body bigger than the whole budget is admitted once nothing else holds bytes."""
+
+    async def run():
+        budget = ByteBudget(10)
+        await budget.acquire(4)
+        large = asyncio.ensure_future(budget.acquire(50))
+        await asyncio.sleep(0.01)
+        assert not large.done()
+        await budget.release(4)
+        await asyncio.wait_for(large, 1)
+        await budget.release(50)
+
+    asyncio.run(run())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import io
+import sys
+import random
+import hashlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from chunk_store import ContentDefinedChunker, KB
+
+
+def chunk_digests(chunker, data):
+    return [hashlib.sha256(chunk).hexdigest() for chunk in chunker.iter_chunks(io.BytesIO(data))]
+
+
+def test_chunks_reassemble_and_respect_size_bounds():
+    """Chunks concatenate back to the input and stay within min/max size (except the last)."""
+
+    data = random.Random(1).randbytes(512 * KB)
+    chunker = ContentDefinedChunker(min_size=2 * KB, avg_size=8 * KB, max_size=32 * KB)
+
+    chunks = list(chunker.iter_chunks(io.BytesIO(data)))
+    assert b"".join(chunks) == data
+    assert all(2 * KB <= len(chunk) <= 32 * KB for chunk in chunks[:-1])
+    assert len(chunks[-1]) <= 32 * KB
+    # Content-defined cuts: far more than the 16 chunks a max_size split would give
+    assert len(chunks) > 30
+
+
+def test_insert_only_changes_chunks_around_the_edit():
+    """Inserting bytes in the middle keeps the cut points before and after the edit."""
+
+    data = random.Random(2).randbytes(512 * KB)
+    edited = data[:200 * KB] + b"inserted bytes" + data[200 * KB:]
+    chunker = ContentDefinedChunker(min_size=2 * KB, avg_size=8 * KB, max_size=32 * KB)
+
+    before = chunk_digests(chunker, data)
+    after = chunk_digests(chunker, edited)
+
+    changed = set(after) - set(before)
+    assert 1 <= len(changed) <= 2
+    assert len(set(before) & set(after)) >= len(before) - 2
+
+
+def test_cut_points_are_stable_across_read_sizes():
+    """Cut points depend only on content, not on how the file is read."""
+
+    class SmallReads(io.BytesIO):
+        def read(self, size=-1):
+            return super().read(min(size, 1000) if size and size > 0 else 1000)
+
+    data = random.Random(3).randbytes(256 * KB)
+    chunker = ContentDefinedChunker(min_size=2 * KB, avg_size=8 * KB, max_size=32 * KB)
+
+    assert list(chunker.iter_chunks(SmallReads(data))) == list(chunker.iter_chunks(io.BytesIO(data)))
+
+
+def test_vectorized_and_python_cut_points_match(monkeypatch):
+    """The numpy Gear hash finds exactly the cut points of the pure-Python loop."""
+
+    import chunk_store
+    if chunk_store.numpy is None:
+        return
+
+    data = random.Random(4).randbytes(256 * KB)
+    chunker = ContentDefinedChunker(min_size=2 * KB, avg_size=8 * KB, max_size=32 * KB)
+    vectorized = chunk_digests(chunker, data)
+
+    monkeypatch.setattr(chunk_store, "numpy", None)
+    assert chunk_digests(chunker, data) == vectorized
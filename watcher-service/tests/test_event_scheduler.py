@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from event_scheduler import CoalescingScheduler
+
+
+def collect(scheduler):
+    fired = []
+    lock = threading.Lock()
+
+    def callback(path):
+        with lock:
+            fired.append((path, time.monotonic()))
+
+    scheduler.start(callback)
+    return fired
+
+
+def test_burst_of_events_fires_once_after_quiet_period():
+    """Many writes to one file produce a single callback after the last write (trailing edge)."""
+
+    scheduler = CoalescingScheduler(quiet_period=0.2, max_delay=None)
+    fired = collect(scheduler)
+
+    assert scheduler.touch("/data/a.log") is True
+    for _ in range(5):
+        time.sleep(0.05)
+        assert scheduler.touch("/data/a.log") is False
+    last_touch = time.monotonic()
+
+    time.sleep(0.6)
+    scheduler.stop(flush=False)
+
+    assert [path for path, _ in fired] == ["/data/a.log"]
+    assert fired[0][1] - last_touch >= 0.2
+    assert scheduler.pending_count() == 0
+
+
+def test_max_delay_fires_file_that_never_goes_quiet():
+    """A file written continuously is still backed up once max_delay has passed."""
+
+    scheduler = CoalescingScheduler(quiet_period=0.2, max_delay=0.3)
+    fired = collect(scheduler)
+
+    first_touch = time.monotonic()
+    deadline = first_touch + 0.6
+    while time.monotonic() < deadline:
+        scheduler.touch("/data/busy.log")
+        time.sleep(0.02)
+    scheduler.stop(flush=False)
+
+    assert fired, "max_delay must force a backup while events keep arriving"
+    assert fired[0][1] - first_touch < 0.5
+
+
+def test_cancel_and_flush_on_stop():
+    """Cancelled paths never fire; stop(flush=True) fires everything still pending."""
+
+    scheduler = CoalescingScheduler(quiet_period=10, max_delay=None)
+    fired = collect(scheduler)
+
+    scheduler.touch("/data/deleted.log")
+    scheduler.touch("/data/kept.log")
+    scheduler.cancel("/data/deleted.log")
+    assert scheduler.pending_count() == 1
+
+    scheduler.stop(flush=True)
+    assert [path for path, _ in fired] == ["/data/kept.log"]
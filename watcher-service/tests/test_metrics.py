@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import metrics
+from metrics import WatcherMetrics
+
+
+def test_full_detection_table_evicts_only_oldest(monkeypatch):
+    """At the pending-detection limit the oldest entry is dropped; lag samples of newer files survive."""
+
+    monkeypatch.setattr(metrics, "MAX_PENDING_DETECTIONS", 3)
+    watcher_metrics = WatcherMetrics()
+
+    for name in ("a", "b", "c", "b", "d"):
+        watcher_metrics.on_log_event('file_detected', {'file_path': name, 'event_type': 'modified'})
+
+    assert list(watcher_metrics._detected_at) == ["b", "c", "d"]
+    assert watcher_metrics._pop_detection("a") is None
+    assert watcher_metrics._pop_detection("c") is not None
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rate_limiter import TokenBucket, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_at_rate_up_to_capacity():
+    """Tokens refill at `rate` per second and never exceed `capacity`."""
+
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=20, clock=clock)
+
+    assert bucket.wait_time(20) == 0.0
+    bucket.consume(20)
+    assert bucket.wait_time(5) == 0.5
+
+    clock.now += 0.5
+    assert bucket.wait_time(5) == 0.0
+
+    clock.now += 100
+    assert bucket.wait_time(21) == 0.1  # capped at 20 tokens
+
+
+def test_limiter_enforces_bytes_per_second():
+    """Sending more than the burst takes about (bytes - burst) / rate seconds."""
+
+    limiter = RateLimiter(bytes_per_second=100_000, burst_seconds=0.1)
+
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire(10_000)  # the first 10 KB is covered by the burst
+    elapsed = time.monotonic() - start
+
+    assert 0.4 <= elapsed < 1.5
+
+
+def test_disabled_limiter_never_blocks():
+    """Both limits at 0 means no limiting at all."""
+
+    limiter = RateLimiter()
+    assert not limiter.enabled
+    start = time.monotonic()
+    for _ in range(1000):
+        limiter.acquire(10**9)
+    assert time.monotonic() - start < 0.5
+
+
+def test_small_request_is_served_before_waiting_large_one():
+    """A small upload arriving later overtakes a large part already waiting for tokens."""
+
+    limiter = RateLimiter(requests_per_second=10, burst_seconds=0.1, priority_max_bytes=1024)
+    limiter.acquire(0)  # empty the bucket
+    order = []
+
+    def send(name, nbytes):
+        limiter.acquire(nbytes)
+        order.append(name)
+
+    large = threading.Thread(target=send, args=("large", 64 * 1024 * 1024))
+    small = threading.Thread(target=send, args=("small", 100))
+    large.start()
+    time.sleep(0.02)
+    small.start()
+    large.join(5)
+    small.join(5)
+
+    assert order == ["small", "large"]
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+import sys
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from fake_s3 import FakeS3Client
+from chunk_store import ChunkStore, ContentDefinedChunker, ManifestIndex, CHUNK_PREFIX, KB
+from retention import RetentionEngine, RetentionPolicy
+
+
+class FakeStorageClient:
+    def __init__(self, s3_client):
+        self.s3_client = s3_client
+        self.bucket_name = "backups"
+        self.delete_requests = 0
+
+    def throttle(self, nbytes=0):
+        self.delete_requests += 1
+
+
+class CountingS3Client(FakeS3Client):
+    def __init__(self):
+        super().__init__(keep_data=True)
+        self.heads = []
+        self.gets = []
+
+    def head_object(self, Bucket, Key):
+        self.heads.append(Key)
+        return super().head_object(Bucket, Key)
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self.gets.append(Key)
+        return super().get_object(Bucket, Key, **kwargs)
+
+
+def versions_at(*times):
+    return [(f"v{i}", datetime.fromisoformat(t)) for i, t in enumerate(times, 1)]
+
+
+def test_select_keeps_grandfather_father_son_buckets():
+    """keep_last / daily / weekly (ISO) / monthly each keep the newest version of their period."""
+
+    versions = versions_at(
+        "2026-03-31T10:00:00",  # v1 Tue, ISO week 14
+        "2026-03-31T08:00:00",  # v2 same day, older
+        "2026-03-30T09:00:00",  # v3 Mon, week 14
+        "2026-03-29T09:00:00",  # v4 Sun, week 13
+        "2026-03-20T09:00:00",  # v5 week 12
+        "2026-02-15T09:00:00",  # v6 February
+        "2026-01-10T09:00:00",  # v7 January
+        "2025-12-01T09:00:00",  # v8 December
+    )
+    policy = RetentionPolicy(keep_last=1, keep_daily=3, keep_weekly=2, keep_monthly=3)
+
+    keep = policy.select(versions, now=datetime(2026, 3, 31, 12))
+    assert keep == {"v1", "v3", "v4", "v6", "v7"}
+
+
+def test_select_max_age_always_keeps_newest():
+    """max_age_days drops old versions, but the newest version of a file is never deleted."""
+
+    now = datetime(2026, 3, 31, 12)
+    policy = RetentionPolicy(max_age_days=30)
+
+    recent = versions_at("2026-03-30T00:00:00", "2026-03-01T13:00:00", "2026-02-01T00:00:00")
+    assert policy.select(recent, now) == {"v1", "v2"}
+
+    stale = versions_at("2025-01-02T00:00:00", "2025-01-01T00:00:00")
+    assert policy.select(stale, now) == {"v1"}
+    assert RetentionPolicy(keep_last=3).select([], now) == set()
+
+
+def test_run_deletes_expired_versions_in_batches():
+    """Expired versioned keys are deleted in batches; foreign objects are never touched."""
+
+    s3 = FakeS3Client()
+    now = datetime(2026, 3, 31, 12)
+    for i in range(10):
+        backup_time = now - timedelta(days=i)
+        s3.put_object(Bucket="backups", Key=f"docs/report_{backup_time:%Y%m%d_%H%M%S}.txt", Body=b"x")
+    s3.put_object(Bucket="backups", Key="notes.txt", Body=b"not a version")
+    storage = FakeStorageClient(s3)
+
+    engine = RetentionEngine(storage, RetentionPolicy(keep_last=3), batch_size=2)
+    summary = engine.run(now)
+
+    assert (summary['files'], summary['versions'], summary['expired'], summary['deleted']) == (1, 10, 7, 7)
+    assert storage.delete_requests == 4
+    assert sorted(s3.objects) == [
+        "docs/report_20260329_120000.txt", "docs/report_20260330_120000.txt",
+        "docs/report_20260331_120000.txt", "notes.txt"
+    ]
+
+
+def test_chunk_gc_reads_live_set_from_manifest_index(tmp_path):
+    """Chunk GC deletes unreferenced chunks and only inspects objects missing from the index."""
+
+    s3 = CountingS3Client()
+    storage = FakeStorageClient(s3)
+    store = ChunkStore(s3, "backups", chunker=ContentDefinedChunker(min_size=1 * KB, avg_size=4 * KB, max_size=16 * KB))
+    store.manifest_index = ManifestIndex(str(tmp_path / "manifest_index.db"))
+
+    rng = random.Random(7)
+    for day, name in ((1, "old.bin"), (2, "new.bin")):
+        path = tmp_path / name
+        path.write_bytes(rng.randbytes(64 * KB))
+        store.upload(str(path), f"data_2026010{day}_000000.bin", "data.bin")
+    s3.put_object(Bucket="backups", Key="plain_20260101_000000.txt", Body=b"plain upload")
+
+    aged = datetime.now(timezone.utc) - timedelta(days=3)
+    for obj in s3.objects.values():
+        obj['last_modified'] = aged
+    chunks_before = sum(1 for key in s3.objects if key.startswith(CHUNK_PREFIX))
+
+    engine = RetentionEngine(storage, RetentionPolicy(keep_last=1), chunk_store=store, chunk_grace_hours=1)
+    summary = engine.run(datetime(2026, 1, 3))
+
+    assert summary['deleted'] == 1
+    assert 0 < summary['chunks_deleted'] < chunks_before
+    # Indexed manifests are never fetched; the plain object is inspected once with HEAD only
+    assert s3.heads == ["plain_20260101_000000.txt"]
+    assert s3.gets == []
+
+    # Every remaining chunk belongs to the surviving manifest
+    new_chunks = set(store.manifest_index.snapshot()["data_20260102_000000.bin"])
+    assert {key.rsplit('/', 1)[-1] for key in s3.objects if key.startswith(CHUNK_PREFIX)} == new_chunks
+    assert "data_20260101_000000.bin" not in store.manifest_index.snapshot()
+
+    engine.run(datetime(2026, 1, 3))
+    assert s3.heads == ["plain_20260101_000000.txt"]
+    store.manifest_index.close()
+
+
+def test_chunk_gc_falls_back_to_reading_unindexed_manifests(tmp_path):
+    """Manifests written before the index existed are read once and then indexed."""
+
+    s3 = CountingS3Client()
+    storage = FakeStorageClient(s3)
+    chunker = ContentDefinedChunker(min_size=1 * KB, avg_size=4 * KB, max_size=16 * KB)
+    path = tmp_path / "data.bin"
+    path.write_bytes(random.Random(8).randbytes(32 * KB))
+    ChunkStore(s3, "backups", chunker=chunker).upload(str(path), "data_20260101_000000.bin", "data.bin")
+
+    aged = datetime.now(timezone.utc) - timedelta(days=3)
+    for obj in s3.objects.values():
+        obj['last_modified'] = aged
+    chunks = {key for key in s3.objects if key.startswith(CHUNK_PREFIX)}
+
+    store = ChunkStore(s3, "backups", chunker=chunker)
+    store.manifest_index = ManifestIndex(str(tmp_path / "manifest_index.db"))
+    engine = RetentionEngine(storage, RetentionPolicy(keep_last=1), chunk_store=store, chunk_grace_hours=1)
+
+    assert engine.run(datetime(2026, 1, 2))['chunks_deleted'] == 0
+    assert s3.gets == ["data_20260101_000000.bin"]
+    assert chunks <= set(s3.objects)
+
+    engine.run(datetime(2026, 1, 2))
+    assert s3.gets == ["data_20260101_000000.bin"]
+    store.manifest_index.close()
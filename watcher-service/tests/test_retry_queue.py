@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backup_logger import get_logger
+from file_index import FileIndex, hash_file
+from retry_queue import RetryQueue, RetryPolicy, CircuitBreaker
+from watcher_service import BackupEventHandler
+
+
+def make_handler(tmp_path, retry_queue):
+    logger = get_logger(name="test_retry_dedup", log_dir=str(tmp_path / "logs"), console_output=False)
+    file_index = FileIndex(str(tmp_path / "file_index.db"))
+    handler = BackupEventHandler(
+        None, logger, file_index=file_index, retry_queue=retry_queue, watch_dir=str(tmp_path)
+    )
+    return handler, file_index, logger
+
+
+def test_deduplicated_retry_is_removed_from_queue(tmp_path):
+    """A retried path whose content is unchanged leaves the queue instead of being re-leased forever."""
+    
+    queue = RetryQueue(str(tmp_path / "retry.db"), policy=RetryPolicy(base_delay=0, max_delay=0))
+    handler, file_index, logger = make_handler(tmp_path, queue)
+    queue.submit = handler.backup_file
+    
+    path = tmp_path / "report.txt"
+    path.write_text("unchanged", encoding='utf-8')
+    stat = path.stat()
+    file_index.update(str(path), stat.st_size, stat.st_mtime_ns, hash_file(str(path)), "s3://bucket/report_v.txt")
+    
+    queue.record_failure(str(path), ConnectionError("reset"), "General Upload Error: reset")
+    assert queue.pending_count() == 1
+    
+    assert queue.drain_once() == 1
+    assert queue.pending_count() == 0
+    
+    # Only mtime changed: deduplicated by hash, also removed
+    queue.record_failure(str(path), ConnectionError("reset"), "General Upload Error: reset")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    queue.drain_once()
+    assert queue.pending_count() == 0
+    
+    queue.close()
+    file_index.close()
+    logger.close()
+
+
+def test_deleted_file_is_removed_from_queue(tmp_path):
+    """A queued path that no longer exists is dropped by prepare_backup."""
+    
+    queue = RetryQueue(str(tmp_path / "retry.db"), policy=RetryPolicy(base_delay=0, max_delay=0))
+    handler, file_index, logger = make_handler(tmp_path, queue)
+    
+    queue.record_failure(str(tmp_path / "gone.txt"), ConnectionError("reset"), "General Upload Error: reset")
+    assert handler.prepare_backup(str(tmp_path / "gone.txt")) is None
+    assert queue.pending_count() == 0
+    
+    queue.close()
+    file_index.close()
+    logger.close()
+
+
+def test_backoff_delay_grows_and_is_capped():
+    """Full-jitter delay stays within base * 2^(n-1), capped at max_delay."""
+    
+    policy = RetryPolicy(base_delay=1.0, max_delay=8.0)
+    for attempt, ceiling in ((1, 1.0), (2, 2.0), (3, 4.0), (4, 8.0), (10, 8.0)):
+        delays = [policy.delay(attempt) for _ in range(200)]
+        assert all(0 <= d <= ceiling for d in delays)
+        assert max(delays) > ceiling / 2
+
+
+def test_due_paths_are_leased_until_they_report_back(tmp_path):
+    """A drained path is not resubmitted while leased; failures and give-up update the queue."""
+    
+    submitted = []
+    queue = RetryQueue(
+        str(tmp_path / "retry.db"), submit=submitted.append,
+        policy=RetryPolicy(base_delay=0, max_delay=0), max_attempts=2
+    )
+    path = tmp_path / "report.txt"
+    path.write_text("data", encoding='utf-8')
+    
+    assert queue.record_failure(str(path), ValueError("boom"), "boom") == 0
+    assert queue.drain_once() == 1
+    assert queue.drain_once() == 0  # leased: still pending but not due
+    assert submitted == [str(path)]
+    assert queue.pending_count() == 1
+    
+    # Second failure reschedules, third exceeds max_attempts and drops the path
+    queue.record_failure(str(path), ValueError("boom"), "boom")
+    assert queue.drain_once() == 1
+    assert queue.record_failure(str(path), ValueError("boom"), "boom") is None
+    assert queue.pending_count() == 0
+    
+    # Deleted files are not retried at all
+    assert queue.record_failure(str(path), FileNotFoundError(), "gone") is None
+    assert queue.pending_count() == 0
+    queue.close()
+
+
+def test_leases_are_released_on_restart(tmp_path):
+    """Paths leased by a previous process are due again as soon as the queue reopens."""
+    
+    path = tmp_path / "report.txt"
+    path.write_text("data", encoding='utf-8')
+    submitted = []
+    
+    queue = RetryQueue(str(tmp_path / "retry.db"), submit=submitted.append,
+                       policy=RetryPolicy(base_delay=0, max_delay=0))
+    queue.record_failure(str(path), ValueError("boom"), "boom")
+    assert queue.drain_once() == 1
+    queue.close()
+    
+    reopened = RetryQueue(str(tmp_path / "retry.db"), submit=submitted.append)
+    assert reopened.drain_once() == 1
+    assert submitted == [str(path), str(path)]
+    reopened.close()
+
+
+def test_circuit_breaker_opens_probes_and_closes():
+    """closed -> open after the threshold -> one half-open probe -> closed or open again."""
+    
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert 0 < breaker.retry_after() <= 0.1
+    
+    time.sleep(0.12)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+    
+    # Failed probe re-opens immediately, without waiting for the threshold
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    
+    time.sleep(0.12)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.retry_after() == 0.0
+
+
+def test_open_circuit_pauses_drain(tmp_path):
+    """No retries are submitted while the circuit is open; half-open submits a single probe."""
+    
+    submitted = []
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    queue = RetryQueue(str(tmp_path / "retry.db"), submit=submitted.append,
+                       policy=RetryPolicy(base_delay=0, max_delay=0), breaker=breaker)
+    for name in ("a.txt", "b.txt", "c.txt"):
+        path = tmp_path / name
+        path.write_text(name, encoding='utf-8')
+        queue.record_failure(str(path), ConnectionError("refused"), "refused")
+    
+    assert breaker.state == CircuitBreaker.OPEN
+    # Delays wait for the breaker, so nothing is due before it half-opens
+    assert queue.drain_once() == 0
+    
+    time.sleep(0.25)
+    assert queue.drain_once() == 1
+    assert len(submitted) == 1
+    queue.close()
+
+
+def test_non_transient_probe_failure_releases_the_probe(tmp_path):
+    """A half-open probe that fails for a file-level reason lets the next upload probe."""
+    
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    queue = RetryQueue(str(tmp_path / "retry.db"), breaker=breaker)
+    queue.record_failure(str(tmp_path / "a.txt"), ConnectionError("refused"), "refused")
+    assert breaker.state == CircuitBreaker.OPEN
+    
+    time.sleep(0.07)
+    assert queue.allow_upload()
+    queue.record_failure(str(tmp_path / "b.txt"), PermissionError("denied"), "denied")
+    assert queue.record_failure(str(tmp_path / "c.txt"), FileNotFoundError("gone"), "gone") is None
+    
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert queue.allow_upload()
+    assert not queue.allow_upload()
+    queue.record_success(str(tmp_path / "d.txt"))
+    assert [queue.allow_upload() for _ in range(3)] == [True, True, True]
+    queue.close()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from upload_queue import UploadQueue
+
+
+def test_jobs_for_same_path_never_overlap_and_end_with_latest(tmp_path):
+    """Jobs for one path never overlap, and a run always follows the last submit."""
+
+    events = []
+    lock = threading.Lock()
+    active = set()
+    overlaps = []
+    last_submit = {}
+
+    def handler(path):
+        with lock:
+            if path in active:
+                overlaps.append(path)
+            active.add(path)
+            events.append((path, time.monotonic()))
+        time.sleep(0.005)
+        with lock:
+            active.discard(path)
+
+    q = UploadQueue(max_size=100, workers=4)
+    q.start(handler)
+    for i in range(10):
+        for name in ("a.txt", "b.txt", "c.txt"):
+            assert q.submit(str(tmp_path / name))
+            last_submit[str(tmp_path / name)] = time.monotonic()
+    q.shutdown(wait=True)
+
+    assert overlaps == []
+    for path, submitted_at in last_submit.items():
+        runs = [at for p, at in events if p == path]
+        assert 1 <= len(runs) <= 10
+        assert runs[-1] >= submitted_at
+    assert q.qsize() == 0
+
+
+def test_hot_path_collapses_into_one_rerun(tmp_path):
+    """Events for a path that is uploading collapse into a single rerun instead of piling up."""
+
+    release = threading.Event()
+    started = threading.Event()
+    runs = []
+
+    def handler(path):
+        runs.append(path)
+        started.set()
+        release.wait(5)
+
+    q = UploadQueue(max_size=2, workers=2)
+    q.start(handler)
+    hot = str(tmp_path / "hot.txt")
+    assert q.submit(hot)
+    assert started.wait(5)
+
+    for _ in range(1000):
+        assert q.submit(hot, timeout=5)
+    assert q.qsize() <= 3
+
+    release.set()
+    q.shutdown(wait=True)
+    # One rerun for the collapsed events, plus at most one per job still queued at release
+    assert set(runs) == {hot} and 2 <= len(runs) <= 4
+    assert q.qsize() == 0
+
+
+def test_full_queue_blocks_submit_until_worker_frees_a_slot(tmp_path):
+    """A full queue applies backpressure: submit blocks and times out instead of growing."""
+
+    release = threading.Event()
+    started = threading.Event()
+    done = []
+
+    def handler(path):
+        started.set()
+        release.wait(5)
+        done.append(path)
+
+    q = UploadQueue(max_size=2, workers=1)
+    q.start(handler)
+    assert q.submit(str(tmp_path / "busy.txt"))
+    assert started.wait(5)
+
+    # Worker is busy: two more jobs fill the queue, the next one blocks
+    assert q.submit(str(tmp_path / "1.txt"))
+    assert q.submit(str(tmp_path / "2.txt"))
+    begin = time.monotonic()
+    assert not q.submit(str(tmp_path / "3.txt"), timeout=0.2)
+    assert time.monotonic() - begin >= 0.2
+
+    release.set()
+    assert q.submit(str(tmp_path / "3.txt"), timeout=5)
+    q.shutdown(wait=True)
+    assert len(done) == 4
+    assert not q.submit(str(tmp_path / "late.txt"))
@@ -0,0 +1,116 @@
+# upload_queue.py
+import queue
+import threading
+
+
+class UploadQueue:
+    """Hàng đợi upload có giới hạn, được xử lý bởi một nhóm worker thread.
+
+    - Hàng đợi đầy thì submit() sẽ chặn luồng gọi (backpressure).
+    - Các job của cùng một đường dẫn không bao giờ chạy song song: job đến trong lúc path
+      đang upload được gộp thành một lần chạy lại sau đó (đọc nội dung mới nhất), nên file
+      bị sửa liên tục cũng không làm tăng bộ nhớ vượt quá max_size.
+    """
+
+    _STOP = object()
+
+    def __init__(self, max_size=1000, workers=4, logger=None):
+        self.max_size = max_size
+        self.workers = max(1, workers)
+        self.logger = logger
+
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._active_paths = set()   # Đường dẫn đang được một worker xử lý
+        self._rerun_paths = set()    # Đường dẫn có job mới trong lúc đang upload
+        self._threads = []
+        self._handler = None
+        self._accepting = False
+
+    def start(self, handler):
+        """Khởi động các worker; handler(path) được gọi cho mỗi job."""
+        self._handler = handler
+        self._accepting = True
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                name=f"upload-worker-{i}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, file_path, timeout=None):
+        """Đưa file vào hàng đợi. Chặn khi hàng đợi đầy (tối đa `timeout` giây).
+
+        Trả về False nếu queue đã dừng hoặc hết thời gian chờ.
+        """
+        if not self._accepting:
+            return False
+        try:
+            self._queue.put(file_path, block=True, timeout=timeout)
+            return True
+        except queue.Full:
+            if self.logger:
+                self.logger.log_system_event(
+                    f"Upload queue full ({self.max_size}), dropping job for {file_path}",
+                    "WARNING"
+                )
+            return False
+
+    def qsize(self):
+        """Số job đang chờ (gồm cả các lần chạy lại của path đang upload)."""
+        with self._lock:
+            waiting = len(self._rerun_paths)
+        return self._queue.qsize() + waiting
+
+    def shutdown(self, wait=True):
+        """Ngừng nhận job mới, xử lý hết các job còn lại rồi dừng worker."""
+        self._accepting = False
+        if wait:
+            self._queue.join()
+        for _ in self._threads:
+            self._queue.put(self._STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _worker_loop(self):
+        while True:
+            file_path = self._queue.get()
+            if file_path is self._STOP:
+                self._queue.task_done()
+                return
+
+            with self._lock:
+                if file_path in self._active_paths:
+                    # Worker khác đang upload file này: đánh dấu chạy lại một lần sau khi xong.
+                    # task_done() của job đánh dấu được gọi khi lần chạy lại kết thúc;
+                    # các job trùng sau đó đã được gộp vào nên xong ngay.
+                    if file_path in self._rerun_paths:
+                        self._queue.task_done()
+                    else:
+                        self._rerun_paths.add(file_path)
+                    continue
+                self._active_paths.add(file_path)
+
+            self._run_path(file_path)
+
+    def _run_path(self, file_path):
+        """Chạy job hiện tại, rồi chạy lại nếu có job mới của cùng path trong lúc đó."""
+        while True:
+            try:
+                self._handler(file_path)
+            except Exception as e:
+                if self.logger:
+                    self.logger.log_system_event(
+                        f"Upload worker error for {file_path}: {e}", "ERROR"
+                    )
+            finally:
+                self._queue.task_done()
+
+            with self._lock:
+                if file_path not in self._rerun_paths:
+                    self._active_paths.discard(file_path)
+                    return
+                self._rerun_paths.discard(file_path)
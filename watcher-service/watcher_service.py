@@ -1,6 +1,8 @@
 import os
 import time
 import sys
+import signal
+import threading
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
@@ -10,131 +12,319 @@ from botocore.exceptions import ClientError
 sys.path.insert(0, str(Path(__file__).parent.parent / "logging-module"))
 from backup_logger import get_logger
 from storage_client import create_client_from_env
+from upload_queue import UploadQueue
+from file_index import FileIndex, hash_file
+from chunk_store import ManifestIndex
+from event_scheduler import CoalescingScheduler
+from reconciler import StartupReconciler
+from async_runtime import AsyncUploadRuntime, MB
+from metrics import WatcherMetrics
+from retry_queue import RetryQueue, RetryPolicy, CircuitBreaker
+from retention import RetentionEngine, create_policy_from_env
 
 # Hằng số cho cơ chế Restore Tạm thời (PHẢI KHỚP VỚI WEB ADMIN)
 RESTORE_TEMP_SUFFIX = ".RESTORE_TEMP"
 
+# Đuôi file tạm khi Web Admin lưu / upload file (ghi file tạm rồi đổi tên nguyên tử)
+# (PHẢI KHỚP VỚI WEB ADMIN)
+UPLOAD_TEMP_SUFFIX = ".UPLOAD_TEMP"
+TEMP_SUFFIXES = (RESTORE_TEMP_SUFFIX, UPLOAD_TEMP_SUFFIX)
+
 # Lấy các biến môi trường từ môi trường triển khai K8s
 WATCH_DIR = os.getenv("WATCH_DIR", "/mnt/source")
 LOG_DIR = os.getenv("LOG_DIR", "/app/logs")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 MINIO_BUCKET = os.getenv("MINIO_BUCKET", "ceph-backup-bucket")
+# "jsonl": journal chỉ ghi nối (O(1) mỗi bản ghi), "array": định dạng JSON cũ
+JSON_LOG_FORMAT = os.getenv("JSON_LOG_FORMAT", "jsonl")
+# Số worker upload song song và kích thước tối đa hàng đợi upload
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+UPLOAD_QUEUE_SIZE = int(os.getenv("UPLOAD_QUEUE_SIZE", "1000"))
+# Bỏ qua upload khi nội dung file không đổi (so sánh size/mtime rồi SHA-256)
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+FILE_INDEX_PATH = os.getenv("FILE_INDEX_PATH", os.path.join(LOG_DIR, "file_index.db"))
+# Ghi log bất đồng bộ: luồng nền ghi theo lô; khi hàng đợi đầy thì "block" (chờ) hoặc "drop" (bỏ bản ghi)
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_OVERFLOW_POLICY = os.getenv("LOG_OVERFLOW_POLICY", "block")
+# Xoay vòng log: sang file mới mỗi ngày hoặc khi vượt LOG_MAX_BYTES_MB, nén gzip file đã đóng,
+# xóa log cũ hơn LOG_RETENTION_DAYS ngày và giữ tổng dung lượng log dưới LOG_MAX_TOTAL_MB (0: không giới hạn)
+LOG_MAX_BYTES_MB = int(os.getenv("LOG_MAX_BYTES_MB", "100"))
+LOG_COMPRESS = os.getenv("LOG_COMPRESS", "true").lower() == "true"
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "30"))
+LOG_MAX_TOTAL_MB = int(os.getenv("LOG_MAX_TOTAL_MB", "1024"))
+# Chỉ mục lịch sử backup (SQLite) để Web Admin tra cứu nhanh (rỗng: tắt)
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", os.path.join(LOG_DIR, "backup_history.db"))
+# Debounce: chờ file "im lặng" QUIET giây (tối đa MAX_DELAY giây) rồi mới backup
+DEBOUNCE_QUIET_SECONDS = float(os.getenv("DEBOUNCE_QUIET_SECONDS", "2"))
+DEBOUNCE_MAX_DELAY_SECONDS = float(os.getenv("DEBOUNCE_MAX_DELAY_SECONDS", "30"))
+# Theo dõi cả thư mục con, và quét đối soát WATCH_DIR khi khởi động
+WATCH_RECURSIVE = os.getenv("WATCH_RECURSIVE", "true").lower() == "true"
+RECONCILE_ON_STARTUP = os.getenv("RECONCILE_ON_STARTUP", "true").lower() == "true"
+RECONCILE_WORKERS = int(os.getenv("RECONCILE_WORKERS", "16"))
+# "threads": worker pool (UPLOAD_WORKERS); "asyncio": event loop + tối đa ASYNC_MAX_IN_FLIGHT upload đồng thời
+WATCHER_RUNTIME = os.getenv("WATCHER_RUNTIME", "threads").lower()
+ASYNC_MAX_IN_FLIGHT = int(os.getenv("ASYNC_MAX_IN_FLIGHT", "256"))
+ASYNC_IO_WORKERS = int(os.getenv("ASYNC_IO_WORKERS", "8"))
+ASYNC_INLINE_PUT_MAX_MB = int(os.getenv("ASYNC_INLINE_PUT_MAX_MB", "8"))
+# Tổng dung lượng (MB) nội dung file nhỏ được giữ trong bộ nhớ cùng lúc khi gửi bằng aiobotocore
+ASYNC_INLINE_PUT_BUDGET_MB = int(os.getenv("ASYNC_INLINE_PUT_BUDGET_MB", "128"))
+# Cổng HTTP phục vụ /metrics cho Prometheus (0: tắt)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+# Thử lại upload lỗi (exponential backoff + jitter), hàng đợi lưu trên đĩa để không mất thay đổi khi Pod restart
+RETRY_ENABLED = os.getenv("RETRY_ENABLED", "true").lower() == "true"
+RETRY_QUEUE_PATH = os.getenv("RETRY_QUEUE_PATH", os.path.join(LOG_DIR, "retry_queue.db"))
+RETRY_BASE_DELAY_SECONDS = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "2"))
+RETRY_MAX_DELAY_SECONDS = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "900"))
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "20"))
+# Số file tối đa được gửi lại mỗi giây khi MinIO hồi phục (tránh thundering herd)
+RETRY_DRAIN_BATCH = int(os.getenv("RETRY_DRAIN_BATCH", "20"))
+# Circuit breaker: mở sau N lỗi liên tiếp do MinIO, thử lại sau RESET giây
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+# Dọn phiên bản cũ định kỳ theo RETENTION_KEEP_* / RETENTION_MAX_AGE_DAYS (đọc trong retention.py)
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "false").lower() == "true"
+RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", "24"))
+RETENTION_DRY_RUN = os.getenv("RETENTION_DRY_RUN", "false").lower() == "true"
+RETENTION_DELETE_BATCH = int(os.getenv("RETENTION_DELETE_BATCH", "1000"))
+# Xóa chunk không còn manifest nào tham chiếu (chỉ khi bật CHUNKED_STORAGE_ENABLED), bỏ qua chunk mới hơn GRACE giờ
+RETENTION_CHUNK_GC = os.getenv("RETENTION_CHUNK_GC", "true").lower() == "true"
+RETENTION_CHUNK_GC_GRACE_HOURS = float(os.getenv("RETENTION_CHUNK_GC_GRACE_HOURS", "24"))
+# Chỉ mục manifest -> chunk (SQLite) để dọn chunk không phải HEAD/GET mọi object trong bucket
+MANIFEST_INDEX_PATH = os.getenv("MANIFEST_INDEX_PATH", os.path.join(LOG_DIR, "manifest_index.db"))
 
 # ----------------------------------------------------
-# Lớp 1: Xử lý sự kiện (Tích hợp logic Trì hoãn & Restore)
+# Lớp 1: Xử lý sự kiện (Tích hợp logic Debounce & Restore)
 # ----------------------------------------------------
 class BackupEventHandler(FileSystemEventHandler):
     """Xử lý sự kiện tạo và sửa đổi file, kích hoạt backup và ghi log."""
     
-    def __init__(self, storage_client, logger):
+    def __init__(self, storage_client, logger, upload_queue=None, file_index=None, scheduler=None,
+                 watch_dir=WATCH_DIR, retry_queue=None):
         self.storage_client = storage_client
         self.logger = logger
-        self._last_modified = {}  
-        self._created_files = {}  # Lưu trữ file mới tạo, chờ on_modified đầu tiên
-        self._CREATION_SKIP_TIME = 2 # Giây: Thời gian tối đa file được coi là 'mới tạo'
+        self.watch_dir = watch_dir
+        self.upload_queue = upload_queue  # None: upload đồng bộ ngay trên luồng observer
+        self.file_index = file_index      # None: tắt deduplication
+        self.scheduler = scheduler        # None: backup ngay tại mỗi sự kiện (không debounce)
+        self.retry_queue = retry_queue    # None: upload lỗi không được thử lại
 
     def _should_skip_file(self, file_path):
-        """Kiểm tra xem file có phải là file tạm thời hoặc file mới tạo chưa ghi nội dung không."""
+        """Kiểm tra xem file có phải là file tạm thời cần bỏ qua không."""
         
-        # BỎ QUA 1: File tạm thời đang được Web Admin Restore
+        # BỎ QUA: File tạm thời đang được Web Admin Restore
         if file_path.endswith(RESTORE_TEMP_SUFFIX):
             self.logger.log_system_event(
                 f"Skipping temporary file during Restore: {file_path}", 
                 "DEBUG"
             )
             return True
-        
-        # BỎ QUA 2: File mới được tạo gần đây và đang chờ sự kiện modified đầu tiên
-        if file_path in self._created_files:
-            # Nếu file quá cũ, có thể đã bị bỏ lỡ sự kiện modified, ta vẫn backup
-            if time.time() - self._created_files[file_path] > self._CREATION_SKIP_TIME:
-                self.logger.log_system_event(f"File {file_path} created but no modification seen. Forcing backup.", "WARNING")
-                del self._created_files[file_path] # Xóa cờ và cho phép backup
-                return False 
-            
-            # Nếu file còn mới, skip backup và chờ modified
-            self.logger.log_system_event(f"Skipping initial created event for {file_path}. Waiting for modification.", "DEBUG")
+
+        # BỎ QUA: File tạm thời đang được Web Admin lưu / upload (backup khi đổi tên thành file đích)
+        if file_path.endswith(UPLOAD_TEMP_SUFFIX):
             return True
             
         return False
 
+    def _handle_change(self, file_path, event_type):
+        """Ghi nhận thay đổi; scheduler sẽ backup 1 lần khi file đã ghi xong (trailing edge)."""
+        if self._should_skip_file(file_path):
+            return
+        
+        if self.scheduler is None:
+            self.logger.log_file_detected(file_path, event_type)
+            self.dispatch_backup(file_path)
+            return
+        
+        # Chỉ ghi log cho sự kiện đầu tiên của mỗi đợt ghi để tránh log tràn khi ghi liên tục
+        if self.scheduler.touch(file_path):
+            self.logger.log_file_detected(file_path, event_type)
+
     def on_created(self, event):
         if not event.is_directory:
-            # GHI NHẬN: Lưu file vào danh sách chờ và bỏ qua backup
-            self._created_files[event.src_path] = time.time()
-            self.logger.log_file_detected(event.src_path, "initial create (skipped)")
-            # KHÔNG GỌI backup_file
+            # File mới tạo thường chưa ghi xong nội dung: scheduler chờ đến khi file "im lặng"
+            self._handle_change(event.src_path, "created")
 
     def on_modified(self, event):
         if not event.is_directory:
-            file_path = event.src_path
-            
-            # 1. Kiểm tra Restore/Trì hoãn (Skip logic)
-            # Hàm này kiểm tra file tạm, file mới tạo đang chờ và quyết định có nên skip không
-            if self._should_skip_file(file_path):
-                return 
-
-            # 2. Xử lý file mới tạo (nếu nó vừa vượt qua _should_skip_file)
-            is_newly_created = file_path in self._created_files
-            if is_newly_created:
-                del self._created_files[file_path] # Xóa cờ, cho phép backup
-
-            # 3. Kiểm tra Trùng lặp (Debounce)
-            # Chỉ kiểm tra debounce nếu đây KHÔNG phải là sự kiện modified đầu tiên sau created
-            if file_path in self._last_modified and time.time() - self._last_modified[file_path] < 1:
-                if not is_newly_created:
-                    return # Bỏ qua nếu là sự kiện trùng lặp
-                
-            self._last_modified[file_path] = time.time()
-            
-            # 4. Ghi log và Backup
-            log_type = "initial modified" if is_newly_created else "modified"
-            self.logger.log_file_detected(file_path, log_type)
-            
-            self.backup_file(file_path)
+            self._handle_change(event.src_path, "modified")
+
+    def _forget_file(self, file_path):
+        """Bỏ mọi trạng thái của file không còn tồn tại (debounce, chỉ mục dedup, hàng đợi retry)."""
+        if self.scheduler is not None:
+            self.scheduler.cancel(file_path)
+        if self.file_index is not None:
+            self.file_index.remove(file_path)
+        if self.retry_queue is not None:
+            self.retry_queue.remove(file_path)
 
     def on_deleted(self, event):
         # Ghi log sự kiện xóa file
         if not event.is_directory:
             self.logger.log_system_event(f"File DELETED: {event.src_path}", "WARNING")
+            self._forget_file(event.src_path)
 
-    def backup_file(self, file_path):
-        """Thực hiện backup S3 và ghi log kết quả."""
+    def on_moved(self, event):
+        if event.is_directory:
+            return
+        # Web Admin lưu file: file tạm (đã fsync) được đổi tên nguyên tử thành file đích
+        # -> đúng 1 lần backup cho mỗi lần lưu
+        if event.src_path.endswith(UPLOAD_TEMP_SUFFIX):
+            self._handle_change(event.dest_path, "modified")
+            return
+        # Restore: nội dung vừa tải về đã có sẵn trên bucket, không backup lại
+        if event.src_path.endswith(RESTORE_TEMP_SUFFIX):
+            return
+        self.logger.log_system_event(f"File MOVED: {event.src_path} -> {event.dest_path}", "INFO")
+        self._forget_file(event.src_path)
+        self._handle_change(event.dest_path, "moved")
+
+    def object_name_for(self, file_path):
+        """Đường dẫn tương đối trong WATCH_DIR, dùng làm tên object (dấu / trên mọi OS)."""
+        relative = os.path.relpath(file_path, self.watch_dir)
+        if relative.startswith(os.pardir):
+            return os.path.basename(file_path)
+        return relative.replace(os.sep, "/")
+
+    def dispatch_backup(self, file_path):
+        """Đưa file vào hàng đợi upload để không chặn luồng observer của watchdog."""
+        if self.upload_queue is None:
+            self.backup_file(file_path)
+            return
+        # Chặn tại đây nếu hàng đợi đầy (backpressure lên luồng observer)
+        self.upload_queue.submit(file_path)
+
+    def _drop_retry(self, file_path):
+        """Không cần upload nữa (file đã xóa / nội dung không đổi): bỏ file khỏi hàng đợi thử lại.
+
+        Lần gửi lại từ RetryQueue chỉ giữ chỗ (lease) cho file, nên nếu không xóa ở đây
+        file sẽ bị gửi lại mãi mỗi LEASE_SECONDS giây.
+        """
+        if self.retry_queue is not None:
+            self.retry_queue.remove(file_path)
+
+    def prepare_backup(self, file_path):
+        """Bước 1 của backup: kiểm tra file và deduplication, ghi log bắt đầu.
+        
+        Trả về job (dict) cần upload, hoặc None nếu không cần backup.
+        """
         file_path_obj = Path(file_path)
         
-        try:
-            # Tránh lỗi nếu file bị xóa ngay sau khi phát hiện
-            if not file_path_obj.exists():
-                return
-            
-            file_size = file_path_obj.stat().st_size
-            
-            # GHI LOG BẮT ĐẦU
-            self.logger.log_backup_start(file_path, file_size)
-            start_time = time.time()
-            
-            # 1. THỰC HIỆN UPLOAD TỚI MINIO (Key mới)
-            response = self.storage_client.upload(file_path)
-            
-            duration = time.time() - start_time
+        # Tránh lỗi nếu file bị xóa ngay sau khi phát hiện
+        if not file_path_obj.exists():
+            self._drop_retry(file_path)
+            return None
+        
+        stat = file_path_obj.stat()
+        file_size = stat.st_size
+        
+        # 0. DEDUPLICATION: bỏ qua nếu nội dung không đổi so với lần backup trước
+        content_hash = None
+        if self.file_index is not None:
+            previous = self.file_index.get(file_path)
+            if previous and previous['size'] == file_size and previous['mtime_ns'] == stat.st_mtime_ns:
+                # Size và mtime không đổi: không cần đọc lại file
+                self.logger.log_backup_deduplicated(file_path, previous['destination'], file_size)
+                self._drop_retry(file_path)
+                return None
             
-            # GHI LOG THÀNH CÔNG (Dùng Versioned Key mới để log)
-            self.logger.log_backup_success(
-                file_path=file_path,
-                destination=response['destination'], # Key S3 mới có timestamp
-                file_size=file_size,
-                duration=duration
+            content_hash = hash_file(file_path)
+            if previous and previous['sha256'] == content_hash:
+                # Chỉ mtime thay đổi (touch, editor lưu lại nội dung cũ, restore...)
+                self.file_index.update(
+                    file_path, file_size, stat.st_mtime_ns, content_hash, previous['destination']
+                )
+                self.logger.log_backup_deduplicated(file_path, previous['destination'], file_size)
+                self._drop_retry(file_path)
+                return None
+        
+        # Circuit breaker đang mở (MinIO sập): không upload, hẹn lại trong hàng đợi thử lại
+        if self.retry_queue is not None and not self.retry_queue.allow_upload():
+            self.retry_queue.defer(file_path)
+            self.logger.log_system_event(f"Circuit open, backup deferred: {file_path}", "DEBUG")
+            return None
+        
+        # GHI LOG BẮT ĐẦU
+        self.logger.log_backup_start(file_path, file_size)
+        return {
+            'file_path': file_path,
+            'object_name': self.object_name_for(file_path),
+            'file_size': file_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'content_hash': content_hash,
+            'start_time': time.time()
+        }
+
+    def complete_backup(self, job, response):
+        """Bước 3: ghi log thành công và cập nhật chỉ mục sau khi upload xong."""
+        file_path = job['file_path']
+        file_size = job['file_size']
+        duration = time.time() - job['start_time']
+        
+        if response.get('codec'):
+            self.logger.log_system_event(
+                f"Compressed {file_path} with {response['codec']}: "
+                f"{file_size} -> {response['stored_size']} bytes", "DEBUG"
+            )
+        if response.get('chunked'):
+            chunked = response['chunked']
+            self.logger.log_system_event(
+                f"Chunked upload {file_path}: {chunked['uploaded_chunks']}/{chunked['chunk_count']} "
+                f"new chunks ({chunked['uploaded_bytes']} bytes sent)", "DEBUG"
             )
+        
+        # GHI LOG THÀNH CÔNG (Dùng Versioned Key mới để log)
+        self.logger.log_backup_success(
+            file_path=file_path,
+            destination=response['destination'], # Key S3 mới có timestamp
+            file_size=file_size,
+            duration=duration,
+            stored_size=response.get('object_size')
+        )
+        if self.retry_queue is not None:
+            self.retry_queue.record_success(file_path)
+        
+        # Cập nhật chỉ mục, trừ khi file đã bị sửa tiếp trong lúc upload
+        # (khi đó hash không còn khớp với bản vừa upload; sự kiện kế tiếp sẽ xử lý)
+        if job['content_hash'] is not None:
+            try:
+                current = os.stat(file_path)
+            except FileNotFoundError:
+                return
+            if current.st_size == file_size and current.st_mtime_ns == job['mtime_ns']:
+                self.file_index.update(
+                    file_path, file_size, job['mtime_ns'], job['content_hash'], response['destination']
+                )
+
+    def fail_backup(self, file_path, error, file_size=None):
+        """Ghi log thất bại cho một lần backup."""
+        if isinstance(error, ClientError):
+            error_code = error.response['Error']['Code']
+            error_msg = f"S3 Client Error: {error_code}"
+        else:
+            error_code = type(error).__name__
+            error_msg = f"General Upload Error: {str(error)}"
+        # GHI LOG THẤT BẠI
+        self.logger.log_backup_failure(file_path, error_msg, file_size, error_code=error_code)
+        
+        # Đưa vào hàng đợi thử lại thay vì bỏ mất thay đổi cho tới lần sửa file kế tiếp
+        if self.retry_queue is not None:
+            self.retry_queue.record_failure(file_path, error, error_msg)
+
+    def backup_file(self, file_path):
+        """Thực hiện backup S3 và ghi log kết quả."""
+        job = None
+        try:
+            job = self.prepare_backup(file_path)
+            if job is None:
+                return
             
-        except ClientError as e:
-            error_msg = f"S3 Client Error: {e.response['Error']['Code']}"
-            # GHI LOG THẤT BẠI
-            self.logger.log_backup_failure(file_path, error_msg, file_size if 'file_size' in locals() else None)
+            # 2. THỰC HIỆN UPLOAD TỚI MINIO (Key mới)
+            response = self.storage_client.upload(file_path, job['object_name'])
+            self.complete_backup(job, response)
         
         except Exception as e:
-            error_msg = f"General Upload Error: {str(e)}"
-            # GHI LOG THẤT BẠI
-            self.logger.log_backup_failure(file_path, error_msg, file_size if 'file_size' in locals() else None)
+            self.fail_backup(file_path, e, job['file_size'] if job else None)
 
 # ----------------------------------------------------
 # Lớp 2: Quản lý Watcher (Main Orchestrator)
@@ -142,7 +332,20 @@ class BackupEventHandler(FileSystemEventHandler):
 class WatcherOrchestrator:
     def __init__(self):
         # 1. Khởi tạo Logger
-        self.logger = get_logger(name="watcher_core", log_dir=LOG_DIR, log_level=LOG_LEVEL)
+        self.logger = get_logger(
+            name="watcher_core",
+            log_dir=LOG_DIR,
+            log_level=LOG_LEVEL,
+            json_format=JSON_LOG_FORMAT,
+            history_db=HISTORY_DB_PATH or None,
+            async_writes=LOG_ASYNC,
+            queue_size=LOG_QUEUE_SIZE,
+            overflow_policy=LOG_OVERFLOW_POLICY,
+            max_bytes=LOG_MAX_BYTES_MB * MB,
+            compress_rotated=LOG_COMPRESS,
+            retention_days=LOG_RETENTION_DAYS,
+            max_total_bytes=LOG_MAX_TOTAL_MB * MB
+        )
         
         # 2. Khởi tạo Storage Client
         self.storage_client = create_client_from_env()
@@ -154,17 +357,148 @@ class WatcherOrchestrator:
         except Exception as e:
             self.logger.log_system_event(f"CRITICAL: Failed to connect or create MinIO bucket: {e}", "CRITICAL")
             sys.exit(1)
+        
+        # Dọn các multipart upload dang dở từ lần chạy trước (không bắt buộc thành công)
+        try:
+            self.storage_client.abort_stale_multipart_uploads(logger=self.logger)
+        except Exception as e:
+            self.logger.log_system_event(f"Could not clean up stale multipart uploads: {e}", "WARNING")
             
-        self.event_handler = BackupEventHandler(self.storage_client, self.logger)
+        # 4. Khởi tạo hàng đợi upload: worker pool, hoặc event loop asyncio
+        if WATCHER_RUNTIME == "asyncio":
+            self.upload_queue = AsyncUploadRuntime(
+                self.storage_client,
+                max_in_flight=ASYNC_MAX_IN_FLIGHT,
+                max_size=UPLOAD_QUEUE_SIZE,
+                io_workers=ASYNC_IO_WORKERS,
+                inline_put_max=ASYNC_INLINE_PUT_MAX_MB * MB,
+                inline_budget=ASYNC_INLINE_PUT_BUDGET_MB * MB,
+                logger=self.logger
+            )
+        else:
+            self.upload_queue = UploadQueue(
+                max_size=UPLOAD_QUEUE_SIZE,
+                workers=UPLOAD_WORKERS,
+                logger=self.logger
+            )
+        # 5. Chỉ mục nội dung file cho deduplication
+        self.file_index = FileIndex(FILE_INDEX_PATH) if DEDUP_ENABLED else None
+        # Chỉ mục chunk của các manifest (chế độ chunk), dùng khi dọn chunk
+        self.manifest_index = None
+        if self.storage_client.chunk_store is not None:
+            self.manifest_index = ManifestIndex(MANIFEST_INDEX_PATH)
+            self.storage_client.chunk_store.manifest_index = self.manifest_index
+        
+        # 6. Scheduler gom sự kiện (trailing-edge debounce) cho mỗi file
+        self.scheduler = CoalescingScheduler(
+            quiet_period=DEBOUNCE_QUIET_SECONDS,
+            max_delay=DEBOUNCE_MAX_DELAY_SECONDS or None,
+            logger=self.logger
+        )
+        
+        # 7. Hàng đợi thử lại (SQLite) + circuit breaker cho các upload lỗi
+        self.retry_queue = None
+        if RETRY_ENABLED:
+            self.retry_queue = RetryQueue(
+                RETRY_QUEUE_PATH,
+                policy=RetryPolicy(RETRY_BASE_DELAY_SECONDS, RETRY_MAX_DELAY_SECONDS),
+                breaker=CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS, logger=self.logger),
+                max_attempts=RETRY_MAX_ATTEMPTS,
+                drain_batch=RETRY_DRAIN_BATCH,
+                logger=self.logger
+            )
+        
+        self.event_handler = BackupEventHandler(
+            self.storage_client,
+            self.logger,
+            self.upload_queue,
+            self.file_index,
+            self.scheduler,
+            retry_queue=self.retry_queue
+        )
+        if isinstance(self.upload_queue, AsyncUploadRuntime):
+            self.upload_queue.start(self.event_handler)
+        else:
+            self.upload_queue.start(self.event_handler.backup_file)
+        self.scheduler.start(self.event_handler.dispatch_backup)
+        if self.retry_queue is not None:
+            pending = self.retry_queue.pending_count()
+            if pending:
+                self.logger.log_system_event(f"Resuming {pending} pending retries from {RETRY_QUEUE_PATH}", "INFO")
+            self.retry_queue.start(self.event_handler.dispatch_backup)
         self.observer = Observer()
         
+        # 8. Dọn phiên bản cũ định kỳ (retention), chạy trên thread riêng
+        self.retention = None
+        if RETENTION_ENABLED:
+            policy = create_policy_from_env()
+            if policy.is_enabled():
+                self.retention = RetentionEngine(
+                    self.storage_client,
+                    policy,
+                    logger=self.logger,
+                    batch_size=RETENTION_DELETE_BATCH,
+                    dry_run=RETENTION_DRY_RUN,
+                    chunk_store=self.storage_client.chunk_store if RETENTION_CHUNK_GC else None,
+                    chunk_grace_hours=RETENTION_CHUNK_GC_GRACE_HOURS
+                )
+            else:
+                self.logger.log_system_event(
+                    "RETENTION_ENABLED is set but no RETENTION_KEEP_* / RETENTION_MAX_AGE_DAYS policy is configured.",
+                    "WARNING"
+                )
+        
+        # 9. Metrics Prometheus (suy ra từ các sự kiện của logger)
+        self.metrics = WatcherMetrics()
+        self.metrics.attach(self.logger, self.upload_queue, self.scheduler, self.retry_queue)
+        
         self.logger.log_system_event(f"Monitoring directory: {WATCH_DIR}", "INFO")
 
+    def _handle_sigterm(self, signum, frame):
+        """K8s gửi SIGTERM khi dừng Pod: xử lý như Ctrl+C để drain hàng đợi upload."""
+        raise KeyboardInterrupt
+
+    def _load_known_state(self):
+        """Trạng thái đã biết để đối soát: ưu tiên FileIndex, nếu tắt thì dùng bucket listing."""
+        if self.file_index is not None:
+            return self.file_index.snapshot()
+        latest = self.storage_client.latest_backup_times()
+        return {os.path.join(WATCH_DIR, *name.split("/")): ts for name, ts in latest.items()}
+
+    def reconcile(self):
+        """Backup các file đã thay đổi trong lúc watcher không chạy (chạy trên thread riêng)."""
+        try:
+            reconciler = StartupReconciler(
+                WATCH_DIR,
+                self._load_known_state(),
+                self.event_handler.dispatch_backup,
+                logger=self.logger,
+                workers=RECONCILE_WORKERS,
+                recursive=WATCH_RECURSIVE,
+                skip_suffixes=TEMP_SUFFIXES
+            )
+            reconciler.run()
+        except Exception as e:
+            self.logger.log_system_event(f"Startup reconciliation failed: {e}", "ERROR")
+
     def run(self):
         """Thiết lập và chạy watchdog observer."""
-        self.observer.schedule(self.event_handler, WATCH_DIR, recursive=False)
+        signal.signal(signal.SIGTERM, self._handle_sigterm)
+        if METRICS_PORT:
+            self.metrics.serve(METRICS_PORT)
+            self.logger.log_system_event(f"Metrics available on :{METRICS_PORT}/metrics", "INFO")
+        self.observer.schedule(self.event_handler, WATCH_DIR, recursive=WATCH_RECURSIVE)
         self.observer.start()
         self.logger.log_system_event("Watcher Service started and running.", "INFO")
+        
+        # Đối soát sau khi observer đã chạy để không bỏ lỡ thay đổi xảy ra trong lúc quét
+        if RECONCILE_ON_STARTUP:
+            threading.Thread(target=self.reconcile, name="reconcile", daemon=True).start()
+        if self.retention is not None:
+            self.retention.start(RETENTION_INTERVAL_HOURS * 3600)
+            self.logger.log_system_event(
+                f"Retention every {RETENTION_INTERVAL_HOURS:g}h: {self.retention.policy.describe()}", "INFO"
+            )
 
         try:
             while True:
@@ -175,9 +509,31 @@ class WatcherOrchestrator:
         finally:
             self.observer.stop()
             self.observer.join()
+            if self.retention is not None:
+                self.retention.stop()
+            
+            # Đưa ngay các file còn đang chờ debounce vào hàng đợi upload
+            self.scheduler.stop(flush=True)
+            # Ngừng gửi lại; các file chưa thành công vẫn nằm trong DB cho lần chạy sau
+            if self.retry_queue is not None:
+                self.retry_queue.stop()
+            
+            # Upload nốt các file còn trong hàng đợi trước khi thoát
+            self.logger.log_system_event(
+                f"Draining upload queue ({self.upload_queue.qsize()} pending)...", "INFO"
+            )
+            self.upload_queue.shutdown(wait=True)
+            if self.file_index is not None:
+                self.file_index.close()
+            if self.manifest_index is not None:
+                self.manifest_index.close()
+            if self.retry_queue is not None:
+                self.retry_queue.close()
             
             # In thống kê khi watcher dừng
             self.logger.print_stats()
+            # Fsync và đóng journal JSON
+            self.logger.close()
 
 if __name__ == "__main__":
     watcher = WatcherOrchestrator()
@@ -1,9 +1,20 @@
+import io
 import os
 import json
 import time
-from flask import Flask, request, jsonify, render_template
+import threading
+from flask import Flask, Response, g, request, jsonify, render_template, send_file, stream_with_context
 from flask_cors import CORS 
+from botocore.exceptions import ClientError, BotoCoreError
 from s3_backend_client import s3_client # Import S3 Client mới
+from version_index import VersionIndex, parse_versioned_key
+from restore_jobs import RestoreJobManager
+from metrics import WebAdminMetrics
+from history_reader import HistoryReader
+from source_listing import DirectoryListing, SORT_KEYS
+from file_window import read_text_window, WINDOW_MODES
+from uploads import UploadManager, write_file_atomic
+from backup_events import BackupEventStream
 
 app = Flask(__name__)
 CORS(app) 
@@ -14,60 +25,330 @@ SOURCE_DIR = os.getenv("WATCH_DIR", "/mnt/source")
 # Hằng số cho cơ chế Restore Tạm thời
 RESTORE_TEMP_SUFFIX = ".RESTORE_TEMP"
 
+# Đuôi file tạm khi lưu / upload: nội dung được ghi vào file tạm rồi đổi tên nguyên tử thành file đích
+# (PHẢI KHỚP VỚI UPLOAD_TEMP_SUFFIX TRONG WATCHER)
+UPLOAD_TEMP_SUFFIX = ".UPLOAD_TEMP"
+
+# Thời gian (giây) giữ chỉ mục phiên bản trong bộ nhớ trước khi liệt kê lại bucket
+VERSION_INDEX_TTL = int(os.getenv("VERSION_INDEX_TTL", "30"))
+
+# Số job restore chạy đồng thời ở nền
+RESTORE_WORKERS = int(os.getenv("RESTORE_WORKERS", "2"))
+
+# Chỉ mục lịch sử backup (SQLite) do Watcher ghi trong LOG_DIR (volume log được mount chung)
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "/app/logs/backup_history.db")
+
+# Thời gian (giây) tối đa dùng lại danh sách file nguồn khi mtime thư mục không đổi
+# (sửa nội dung file không làm đổi mtime thư mục nên size/mtime có thể cũ tối đa ngần này)
+SOURCE_LISTING_TTL = float(os.getenv("SOURCE_LISTING_TTL", "5"))
+
+# Kích thước cửa sổ đọc file cho editor (byte): mặc định và tối đa mỗi request
+FILE_WINDOW_BYTES = int(os.getenv("FILE_WINDOW_KB", "1024")) * 1024
+FILE_WINDOW_MAX_BYTES = int(os.getenv("FILE_WINDOW_MAX_KB", "8192")) * 1024
+
+# Thời gian (giờ) giữ phiên upload từng phần bị bỏ dở trước khi xóa file tạm
+UPLOAD_SESSION_TTL_HOURS = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+
+# Chu kỳ (giây) đọc bản ghi mới trong chỉ mục lịch sử để đẩy sự kiện backup tới UI (SSE)
+BACKUP_EVENTS_POLL_SECONDS = float(os.getenv("BACKUP_EVENTS_POLL_SECONDS", "1"))
+
 # Đảm bảo thư mục tồn tại khi Flask khởi động
 os.makedirs(SOURCE_DIR, exist_ok=True)
 
+# Danh sách file nguồn (scandir + cache theo mtime thư mục), phục vụ /api/files
+source_listing = DirectoryListing(
+    SOURCE_DIR,
+    skip_suffixes=(RESTORE_TEMP_SUFFIX, UPLOAD_TEMP_SUFFIX),
+    ttl=SOURCE_LISTING_TTL
+)
+
+# Phiên upload từng phần (resumable) cho file lớn, file tạm nằm trong SOURCE_DIR/.uploads;
+# phiên bỏ dở được dọn khi khởi động và mỗi giờ trên thread nền
+uploads = UploadManager(SOURCE_DIR, UPLOAD_TEMP_SUFFIX, ttl=UPLOAD_SESSION_TTL_HOURS * 3600)
+uploads.start()
+
+# Chỉ mục phiên bản backup (nhóm theo tên file gốc), làm mới trên thread nền sau TTL
+version_index = VersionIndex(s3_client, ttl=VERSION_INDEX_TTL)
+
+# Mở chỉ mục lịch sử (chỉ đọc) ở lần truy vấn đầu tiên, khi Watcher đã tạo file DB
+_history_index = None
+_history_lock = threading.Lock()
+
+
+def get_history_index():
+    global _history_index
+    with _history_lock:
+        if _history_index is None and HISTORY_DB_PATH and os.path.exists(HISTORY_DB_PATH):
+            _history_index = HistoryReader(HISTORY_DB_PATH)
+        return _history_index
+
+# Luồng sự kiện backup (SSE) cho UI: đọc tiếp chỉ mục lịch sử, cập nhật version_index tại chỗ
+backup_events = BackupEventStream(
+    get_history_index,
+    version_index,
+    s3_client.bucket,
+    poll_interval=BACKUP_EVENTS_POLL_SECONDS
+)
+
+# Metrics Prometheus (phục vụ tại /metrics)
+metrics = WebAdminMetrics()
+
+# Các job restore chạy nền (trạng thái xem qua /api/backup/jobs/<job_id>)
+restore_jobs = RestoreJobManager(
+    s3_client,
+    workers=RESTORE_WORKERS,
+    on_submit=metrics.restore_submitted,
+    on_finish=metrics.restore_finished
+)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.monotonic()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = getattr(g, 'request_started', None)
+    if started is not None and request.endpoint != 'metrics_endpoint':
+        metrics.observe_request(
+            request.url_rule.rule if request.url_rule else None,
+            request.method,
+            response.status_code,
+            time.monotonic() - started
+        )
+    return response
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    body, content_type = metrics.render()
+    return Response(body, mimetype=content_type)
+
 # ----------------------------------------------------
 # ENDPOINTS CŨ (CRUD File Nguồn)
 # ----------------------------------------------------
 @app.route('/')
 def index():
-    return render_template('index.html')
+    # Id lịch sử mới nhất lúc render: UI nhận tiếp sự kiện backup từ đây (không lỡ sự kiện
+    # giữa lúc tải trang và lúc mở kết nối SSE)
+    try:
+        last_event_id = backup_events.latest_id()
+    except Exception:
+        last_event_id = None
+    return render_template('index.html', last_event_id=last_event_id)
 
 @app.route('/api/files', methods=['GET'])
 def list_files():
+    """Liệt kê file trong thư mục nguồn kèm size/mtime, phân trang bằng cursor.
+
+    Query params:
+    - prefix: chỉ lấy file có tên bắt đầu bằng chuỗi này
+    - sort: name | size | mtime (mặc định name), order: asc | desc
+    - limit: số file mỗi trang (mặc định 200, tối đa 1000)
+    - cursor: giá trị next_cursor của trang trước
+    Trả về ETag; gửi lại qua If-None-Match để nhận 304 khi danh sách không đổi.
+    """
+    # File tạm đang restore / upload (RESTORE_TEMP_SUFFIX, UPLOAD_TEMP_SUFFIX) đã bị loại khi quét thư mục
+    prefix = request.args.get('prefix') or None
+    sort = request.args.get('sort', 'name')
+    order = 'desc' if request.args.get('order') == 'desc' else 'asc'
+    cursor = request.args.get('cursor') or None
+    limit = min(1000, max(1, request.args.get('limit', 200, type=int)))
+    if sort not in SORT_KEYS:
+        return jsonify({'error': f"Invalid sort '{sort}', expected one of {', '.join(SORT_KEYS)}"}), 400
+    
     try:
-        files = [f for f in os.listdir(SOURCE_DIR) if os.path.isfile(os.path.join(SOURCE_DIR, f))]
-        # Loại bỏ các file tạm đang trong quá trình restore
-        files = [f for f in files if not f.endswith(RESTORE_TEMP_SUFFIX)] 
-        return jsonify({'files': sorted(files)}), 200
+        snapshot = source_listing.snapshot()
+        etag = source_listing.query_etag(snapshot, prefix, sort, order, cursor, limit)
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={'ETag': f'"{etag}"'})
+        
+        result = source_listing.query(snapshot, prefix=prefix, sort=sort, order=order, cursor=cursor, limit=limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    
+    response = jsonify(result)
+    response.set_etag(etag)
+    # Trình duyệt luôn hỏi lại bằng If-None-Match, server trả 304 nếu không đổi
+    response.headers['Cache-Control'] = 'no-cache'
+    return response, 200
 
 @app.route('/api/file/<filename>', methods=['GET'])
 def read_file(filename):
+    """Đọc một cửa sổ nội dung text của file (không đọc cả file vào bộ nhớ).
+
+    Query params:
+    - mode: head (mặc định) | tail | range
+    - offset: byte bắt đầu cho mode=range (dùng giá trị `end` của lần đọc trước để đọc tiếp)
+    - max_bytes: kích thước cửa sổ (mặc định FILE_WINDOW_KB, tối đa FILE_WINDOW_MAX_KB)
+    truncated=true nghĩa là nội dung chưa phải toàn bộ file; file nhị phân trả binary=true.
+    """
     file_path = os.path.join(SOURCE_DIR, filename)
+    mode = request.args.get('mode', 'head')
+    if mode not in WINDOW_MODES:
+        return jsonify({'error': f"Invalid mode '{mode}', expected one of {', '.join(WINDOW_MODES)}"}), 400
+    length = min(FILE_WINDOW_MAX_BYTES, max(4096, request.args.get('max_bytes', FILE_WINDOW_BYTES, type=int)))
     try:
-        with open(file_path, 'r') as f:
-            content = f.read()
-        return jsonify({'filename': filename, 'content': content}), 200
+        window = read_text_window(
+            file_path,
+            mode=mode,
+            offset=request.args.get('offset', 0, type=int),
+            length=length
+        )
+        return jsonify(dict(window, filename=filename, raw_url=f"/api/file/{filename}/raw")), 200
     except FileNotFoundError:
         return jsonify({'error': 'File not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/file/<filename>/raw', methods=['GET'])
+def read_file_raw(filename):
+    """Stream nội dung gốc của file (kể cả nhị phân), hỗ trợ HTTP Range / If-Range / ETag."""
+    file_path = os.path.join(SOURCE_DIR, filename)
+    if not os.path.isfile(file_path):
+        return jsonify({'error': 'File not found'}), 404
+    # conditional=True: werkzeug trả 206 cho Range và gửi file theo từng khối (không đọc hết vào RAM)
+    return send_file(
+        file_path,
+        mimetype='application/octet-stream',
+        as_attachment=request.args.get('download') == '1',
+        download_name=filename,
+        conditional=True,
+        max_age=0
+    )
+
+def validate_target_filename(filename):
+    if filename in ('.', '..') or filename.endswith((RESTORE_TEMP_SUFFIX, UPLOAD_TEMP_SUFFIX)):
+        raise ValueError(f"Invalid filename '{filename}'")
+
 @app.route('/api/file/<filename>', methods=['PUT', 'POST'])
 def save_file(filename):
+    """Lưu nội dung từ JSON {content}; ghi vào file tạm rồi đổi tên nguyên tử (Watcher backup 1 lần).
+
+    POST chỉ tạo file mới: 409 nếu tên đã tồn tại (kiểm tra trên server, không dựa vào danh
+    sách đang hiển thị ở UI). PUT tạo mới hoặc ghi đè.
+    """
     file_path = os.path.join(SOURCE_DIR, filename)
     data = request.get_json()
     content = data.get('content', '')
     
+    create_only = request.method == 'POST'
     is_new = not os.path.exists(file_path)
+    if create_only and not is_new:
+        return jsonify({'error': f"File '{filename}' already exists"}), 409
     
     try:
-        with open(file_path, 'w') as f:
-            f.write(content)
+        validate_target_filename(filename)
+        write_file_atomic(io.BytesIO(content.encode('utf-8')), file_path, UPLOAD_TEMP_SUFFIX,
+                          exclusive=create_only)
+        source_listing.invalidate()
         
         message = 'File created successfully.' if is_new else 'File updated successfully.'
         return jsonify({'message': message, 'filename': filename}), 200
+    except FileExistsError:
+        # Request khác vừa tạo cùng tên giữa lúc kiểm tra và lúc ghi
+        return jsonify({'error': f"File '{filename}' already exists"}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/file/<filename>/content', methods=['PUT'])
+def save_file_stream(filename):
+    """Lưu file từ raw request body (stream theo khối, không giữ cả file trong bộ nhớ).
+
+    Body được ghi vào <file>.<id>.UPLOAD_TEMP, fsync rồi os.replace thành file đích, nên
+    Watcher chỉ thấy một lần đổi tên (một bản backup) và không bao giờ đọc phải file ghi dở.
+    """
+    file_path = os.path.join(SOURCE_DIR, filename)
+    is_new = not os.path.exists(file_path)
+    try:
+        validate_target_filename(filename)
+        size = write_file_atomic(request.stream, file_path, UPLOAD_TEMP_SUFFIX)
+        source_listing.invalidate()
+
+        message = 'File created successfully.' if is_new else 'File updated successfully.'
+        return jsonify({'message': message, 'filename': filename, 'size': size}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ----------------------------------------------------
+# Upload từng phần (resumable) cho file lớn
+# ----------------------------------------------------
+# 1. POST /api/uploads {filename, size?}          -> {upload_id, offset: 0, ...}
+# 2. PUT  /api/uploads/<id>?offset=N  (raw body)  -> ghi tiếp từ byte N; 409 kèm offset hiện tại nếu lệch
+#    (mất kết nối: GET /api/uploads/<id> để lấy offset rồi gửi tiếp từ đó)
+# 3. POST /api/uploads/<id>/complete             -> đổi tên nguyên tử thành file đích
+#    DELETE /api/uploads/<id>                    -> hủy phiên, xóa file tạm
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename')
+    if not filename or not isinstance(filename, str) or '/' in filename or os.sep in filename:
+        return jsonify({'error': 'A plain filename is required'}), 400
+    size = data.get('size')
+    if size is not None and (not isinstance(size, int) or size < 0):
+        return jsonify({'error': 'size must be a non-negative integer'}), 400
+    try:
+        validate_target_filename(filename)
+        return jsonify(uploads.create(filename, size=size)), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    session = uploads.get(upload_id)
+    if session is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(session), 200
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+def append_upload(upload_id):
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'error': 'offset query parameter is required'}), 400
+    try:
+        session = uploads.append(upload_id, offset, request.stream)
+    except ValueError as e:
+        return jsonify(dict(uploads.get(upload_id) or {}, error=str(e))), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    if session is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(session), 200
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    try:
+        session = uploads.complete(upload_id)
+    except ValueError as e:
+        return jsonify(dict(uploads.get(upload_id) or {}, error=str(e))), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    if session is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    source_listing.invalidate()
+    return jsonify(dict(session, message='Upload completed.')), 200
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    if not uploads.abort(upload_id):
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify({'message': 'Upload aborted.', 'upload_id': upload_id}), 200
 
 @app.route('/api/file/<filename>', methods=['DELETE'])
 def delete_file(filename):
     file_path = os.path.join(SOURCE_DIR, filename)
     try:
         os.remove(file_path)
+        source_listing.invalidate()
         return jsonify({'message': f'File {filename} deleted successfully.'}), 200
     except FileNotFoundError:
         return jsonify({'error': 'File not found'}), 404
@@ -80,67 +361,169 @@ def delete_file(filename):
 # ----------------------------------------------------
 @app.route('/api/backup/versions', methods=['GET'])
 def list_backup_versions():
-    """Lấy danh sách tất cả các phiên bản file từ MinIO."""
+    """Lấy danh sách phiên bản backup, nhóm theo tên file gốc, có phân trang và lọc.
+
+    Query params:
+    - q: lọc theo chuỗi con trong tên file gốc
+    - page, page_size: phân trang theo file gốc (page_size tối đa 500)
+    - versions_limit: số phiên bản mới nhất trả về cho mỗi file
+    - refresh=1: bỏ qua cache và liệt kê lại bucket
+    """
     try:
-        versions = s3_client.list_all_versions()
+        page = max(1, request.args.get('page', 1, type=int))
+        page_size = min(500, max(1, request.args.get('page_size', 50, type=int)))
+        versions_limit = max(1, request.args.get('versions_limit', 50, type=int))
         
-        # Nhóm các phiên bản theo tên file gốc để dễ hiển thị trên UI
-        # Logic này sẽ giúp UI hiển thị: "report.pdf (3 versions)"
-        grouped_versions = {}
-        for item in versions:
-            # Giả sử tên file gốc không có dấu gạch dưới và ngày tháng phức tạp
-            # (Nếu dùng cơ chế versioning bằng ngày giờ: filename_YYYYMMDD_HHmmss.ext)
-            
-            # Tên file gốc (lý tưởng là Watcher cung cấp metadata)
-            # Ở đây, ta dùng key nguyên bản làm tên phiên bản
-            base_name = item['key']
-            
-            if base_name not in grouped_versions:
-                grouped_versions[base_name] = []
-            
-            grouped_versions[base_name].append(item)
-            
-        return jsonify(grouped_versions), 200
+        result = version_index.query(
+            q=request.args.get('q', '').strip() or None,
+            page=page,
+            page_size=page_size,
+            versions_limit=versions_limit,
+            force_refresh=request.args.get('refresh') == '1'
+        )
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/backup/versions/<path:filename>', methods=['GET'])
+def list_file_versions(filename):
+    """Lấy toàn bộ phiên bản của một file gốc (mới nhất trước)."""
+    try:
+        versions = version_index.versions_of(filename)
+        if not versions:
+            return jsonify({'error': f'No backup versions for {filename}'}), 404
+        return jsonify({'filename': filename, 'versions': versions}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/backup/history', methods=['GET'])
+def backup_history():
+    """Tra cứu lịch sử backup từ chỉ mục SQLite (mới nhất trước).
+
+    Query params:
+    - source: đường dẫn file nguồn chính xác (ví dụ /mnt/source/docs/a.txt)
+    - q: lọc theo chuỗi con trong đường dẫn nguồn
+    - status: SUCCESS | FAILED | DEDUPLICATED
+    - since, until: khoảng thời gian ISO (ví dụ 2025-12-01 hoặc 2025-12-01T08:00:00)
+    - page, page_size: phân trang (page_size tối đa 500)
+    """
+    history = get_history_index()
+    if history is None:
+        return jsonify({'error': f'History index not found at {HISTORY_DB_PATH}'}), 503
+    try:
+        result = history.query(
+            source=request.args.get('source') or None,
+            q=request.args.get('q', '').strip() or None,
+            status=request.args.get('status') or None,
+            since=request.args.get('since') or None,
+            until=request.args.get('until') or None,
+            page=max(1, request.args.get('page', 1, type=int)),
+            page_size=min(500, max(1, request.args.get('page_size', 50, type=int)))
+        )
+        return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/backup/events', methods=['GET'])
+def backup_event_stream():
+    """Server-Sent Events: mỗi kết quả backup của Watcher là một sự kiện `backup`.
+
+    data: {id, status, source, timestamp, size, key, version, ...}; với SUCCESS, `version`
+    có cùng dạng phần tử `versions` của /api/backup/versions để UI chèn thẳng vào danh sách.
+    Lần đầu trang gửi ?last_event_id=<id lúc render>; khi kết nối lại, trình duyệt gửi
+    Last-Event-ID để nhận các sự kiện bị lỡ. Sự kiện
+    `resync` nghĩa là client đã lỡ quá nhiều sự kiện và cần tải lại danh sách.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': f'Invalid Last-Event-ID: {last_event_id}'}), 400
+    return Response(
+        stream_with_context(backup_events.stream(last_event_id)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # nginx ingress: không đệm response
+        }
+    )
+
 
 # ----------------------------------------------------
-# ENDPOINT MỚI 2: Khôi phục File (Sử dụng cơ chế file tạm)
+# ENDPOINT MỚI 2: Khôi phục File (Job nền + cơ chế file tạm)
 # ----------------------------------------------------
 @app.route('/api/backup/restore/<path:object_key>', methods=['POST'])
 def restore_file(object_key):
     """
-    Tải file từ MinIO về HostPath, sử dụng tên tạm thời để Watcher bỏ qua.
-    'object_key' là Key S3 (ví dụ: document.pdf_20251214_133045.pdf)
+    Tạo job nền tải file từ MinIO về HostPath, sử dụng tên tạm thời để Watcher bỏ qua.
+    'object_key' là Key S3 (ví dụ: document_20251214_133045.pdf)
+    Trả về 202 ngay lập tức kèm job_id; theo dõi tiến độ qua /api/backup/jobs/<job_id>.
     """
     
-    # Lấy tên file gốc (ví dụ: document.pdf)
+    # Lấy tên file gốc (ví dụ: document.pdf) từ key document_20251214_133045.pdf
     # Nếu key không phải là versioning, nó chính là tên file gốc
-    base_filename = os.path.basename(object_key)
+    # Key có thể chứa thư mục con (Watcher theo dõi đệ quy): giữ nguyên đường dẫn tương đối
+    parsed = parse_versioned_key(object_key)
+    base_filename = os.path.normpath(parsed[0] if parsed else object_key)
+    if os.path.isabs(base_filename) or base_filename.startswith(os.pardir):
+        return jsonify({'error': f'Invalid object key: {object_key}'}), 400
     
-    # 1. Định nghĩa tên file tạm thời trong HostPath
-    temp_file_path = os.path.join(SOURCE_DIR, base_filename + RESTORE_TEMP_SUFFIX)
+    # Job sẽ tải về file tạm (đuôi RESTORE_TEMP_SUFFIX) rồi đổi tên thành file gốc.
+    # Lệnh đổi tên này sẽ kích hoạt sự kiện cho Watcher
+    final_file_path = os.path.join(SOURCE_DIR, base_filename)
+    job = restore_jobs.submit(object_key, final_file_path, RESTORE_TEMP_SUFFIX)
     
+    return jsonify({
+        'message': f'Restore of {base_filename} from backup key {object_key} started.',
+        'filename': base_filename,
+        'job_id': job['job_id'],
+        'status_url': f"/api/backup/jobs/{job['job_id']}"
+    }), 202
+
+
+@app.route('/api/backup/jobs/<job_id>', methods=['GET'])
+def restore_job_status(job_id):
+    """Trạng thái job restore: queued | running | succeeded | failed, kèm bytes_done/bytes_total."""
+    job = restore_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
+
+
+def s3_error_status(error):
+    """Mã HTTP cho lỗi khi đọc object: 404 chỉ khi object không tồn tại,
+    502 khi MinIO trả lỗi khác hoặc không kết nối được, 500 cho lỗi còn lại."""
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        return 404 if code in ('NoSuchKey', '404', 'NotFound') else 502
+    if isinstance(error, BotoCoreError):
+        return 502
+    return 500
+
+
+# ----------------------------------------------------
+# ENDPOINT MỚI 3: Tải trực tiếp một phiên bản (stream, không ghi đĩa)
+# ----------------------------------------------------
+@app.route('/api/backup/object/<path:object_key>', methods=['GET'])
+def download_object(object_key):
+    """Stream nội dung object từ MinIO tới trình duyệt theo từng khối."""
     try:
-        # 2. Tải file từ MinIO về tên file tạm thời
-        s3_client.download_file(object_key, temp_file_path)
-        
-        # 3. Đổi tên file tạm thời thành tên file gốc
-        # Lệnh này sẽ kích hoạt sự kiện on_created hoặc on_modified cho Watcher
-        final_file_path = os.path.join(SOURCE_DIR, base_filename)
-        os.rename(temp_file_path, final_file_path)
-
-        return jsonify({
-            'message': f'File {base_filename} restored successfully from backup key {object_key}.',
-            'filename': base_filename
-        }), 200
-        
+        size, blocks = s3_client.stream_object(object_key)
     except Exception as e:
-        # Đảm bảo xóa file tạm nếu có lỗi xảy ra trước khi đổi tên
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-        return jsonify({'error': f'Restore failed for {object_key}: {e}'}), 500
+        return jsonify({'error': f'Download failed for {object_key}: {e}'}), s3_error_status(e)
+    
+    parsed = parse_versioned_key(object_key)
+    download_name = os.path.basename(parsed[0] if parsed else object_key)
+    return Response(
+        stream_with_context(metrics.count_stream(blocks)),
+        mimetype='application/octet-stream',
+        headers={
+            'Content-Length': str(size),
+            'Content-Disposition': f'attachment; filename="{download_name}"'
+        }
+    )
 
 if __name__ == '__main__':
     # Chạy trên cổng 8080 để dễ dàng expose trong K8s
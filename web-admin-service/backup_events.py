@@ -0,0 +1,212 @@
+# backup_events.py
+import json
+import queue
+import threading
+import time
+
+
+def object_key_from_destination(destination, bucket):
+    """s3://<bucket>/<key> (destination do Watcher ghi vào lịch sử) -> <key>; None nếu không khớp."""
+    prefix = f"s3://{bucket}/"
+    if not destination or not destination.startswith(prefix):
+        return None
+    return destination[len(prefix):]
+
+
+def format_sse(event, data, event_id=None):
+    """Một message Server-Sent Events (text/event-stream)."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class BackupEventStream:
+    """Đẩy hoạt động backup của Watcher tới trình duyệt (SSE) mà không cần liệt kê lại bucket.
+
+    Watcher ghi mọi kết quả backup vào chỉ mục lịch sử (SQLite, volume log chung). Một luồng nền
+    đọc các bản ghi mới theo id tăng dần (`records_after`), thêm phiên bản mới vào VersionIndex
+    và phát sự kiện tới mọi client đang kết nối. Id bản ghi là id của sự kiện SSE, nên client
+    kết nối lại (header Last-Event-ID) nhận tiếp các sự kiện bị lỡ từ DB. Lần kết nối đầu,
+    trang gửi id lịch sử mới nhất lúc render (?last_event_id=) để không lỡ sự kiện giữa lúc
+    tải trang và lúc kết nối.
+
+    Client không kịp đọc (hàng đợi đầy) nhận sự kiện `resync` để tự tải lại danh sách.
+    """
+
+    def __init__(self, get_history, version_index, bucket, poll_interval=1.0,
+                 max_queue=1000, replay_limit=500):
+        self.get_history = get_history  # hàm trả về HistoryReader (None khi Watcher chưa tạo DB)
+        self.version_index = version_index
+        self.bucket = bucket
+        self.poll_interval = poll_interval
+        self.max_queue = max_queue
+        self.replay_limit = replay_limit
+
+        self._lock = threading.Lock()
+        self._subscribers = {}  # queue -> id bản ghi client bắt đầu nhận
+        self._last_id = None
+        self._thread = None
+
+    # ---- Chuyển bản ghi lịch sử thành sự kiện ----
+
+    def _to_event(self, record):
+        data = {
+            'id': record['id'],
+            'status': record['status'],
+            'source': record['source'],
+            'timestamp': record['timestamp'],
+            # Kích thước object đã lưu (bản nén / manifest), khớp với listing bucket;
+            # bản ghi cũ chưa có stored_size_bytes thì dùng kích thước file gốc
+            'size': record['size_bytes'] if record.get('stored_size_bytes') is None
+                    else record['stored_size_bytes'],
+            'source_size': record['size_bytes'],
+            'duration_seconds': record['duration_seconds'],
+            'error': record['error'],
+            'key': object_key_from_destination(record['destination'], self.bucket),
+            'version': None
+        }
+        if record['status'] == 'SUCCESS' and data['key']:
+            # Phiên bản mới, cùng dạng với phần tử `versions` dựng từ listing bucket
+            self.version_index.add_version(data['key'], data['size'], record['timestamp'])
+            data['version'] = self.version_index.version_for(data['key'], data['size'], record['timestamp'])
+        return record['id'], data
+
+    # ---- Luồng nền đọc lịch sử ----
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="backup-events", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Không còn client: dừng luồng. Lần subscribe sau bắt đầu lại từ vị trí của client
+                    # (phiên bản bị bỏ qua trong lúc dừng có trong lần làm mới VersionIndex theo TTL)
+                    self._thread = None
+                    self._last_id = None
+                    return
+            try:
+                self.poll_once()
+            except Exception:
+                # DB đang được Watcher tạo / xoay vòng: thử lại ở vòng sau
+                pass
+            time.sleep(self.poll_interval)
+
+    def poll_once(self):
+        """Đọc các bản ghi mới và phát tới client; trả về số sự kiện đã phát."""
+        history = self.get_history()
+        if history is None:
+            return 0
+        if self._last_id is None:
+            # Bắt đầu từ client cũ nhất: bản ghi ghi giữa lúc client kết nối và lần đọc đầu
+            # tiên vẫn được phát (client bỏ qua các id đã nhận trong phần replay). Không lùi quá
+            # replay_limit bản ghi: client lỡ nhiều hơn thế đã nhận `resync`.
+            latest = history.latest_id()
+            with self._lock:
+                starts = list(self._subscribers.values())
+            self._last_id = max(min(starts, default=latest), latest - self.replay_limit)
+
+        published = 0
+        while True:
+            records = history.records_after(self._last_id, limit=self.replay_limit)
+            for record in records:
+                self._publish(*self._to_event(record))
+                self._last_id = record['id']
+                published += 1
+            if len(records) < self.replay_limit:
+                return published
+
+    def _publish(self, event_id, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait((event_id, data))
+            except queue.Full:
+                # Client quá chậm: bỏ các sự kiện đang chờ, yêu cầu tải lại toàn bộ danh sách
+                self._drain(q)
+                q.put_nowait((event_id, None))
+
+    @staticmethod
+    def _drain(q):
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                return
+
+    # ---- Client ----
+
+    def latest_id(self):
+        """Id bản ghi lịch sử mới nhất (0 khi chưa có DB): vị trí bắt đầu cho client mới."""
+        history = self.get_history()
+        return history.latest_id() if history is not None else 0
+
+    def subscribe(self, start_id=0):
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers[q] = start_id
+        self._ensure_started()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.pop(q, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _replay(self, last_event_id):
+        """Sự kiện bị lỡ sau `last_event_id`; None nếu lỡ quá nhiều (client cần resync)."""
+        history = self.get_history()
+        if history is None:
+            return []
+        records = history.records_after(last_event_id, limit=self.replay_limit + 1)
+        if len(records) > self.replay_limit:
+            return None
+        return [(record['id'], self._to_event(record)[1]) for record in records]
+
+    def stream(self, last_event_id=None, heartbeat=15.0, retry_ms=3000):
+        """Generator text/event-stream cho một client (dùng với Response + stream_with_context).
+
+        last_event_id: id bản ghi cuối client đã thấy (Last-Event-ID hoặc id lúc render trang);
+        None: chỉ nhận sự kiện từ lúc kết nối.
+        """
+        if last_event_id is None:
+            last_event_id = self.latest_id()
+        q = self.subscribe(last_event_id)
+        try:
+            yield f"retry: {retry_ms}\n\n"
+            sent_id = last_event_id
+            missed = self._replay(last_event_id)
+            if missed is None:
+                yield format_sse('resync', {'reason': 'too many missed events'})
+            else:
+                for event_id, data in missed:
+                    yield format_sse('backup', data, event_id)
+                    sent_id = event_id
+
+            while True:
+                try:
+                    event_id, data = q.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Comment giữ kết nối (proxy không cắt kết nối im lặng)
+                    yield ": keepalive\n\n"
+                    continue
+                if data is None:
+                    yield format_sse('resync', {'reason': 'client too slow'}, event_id)
+                    sent_id = event_id
+                    continue
+                if event_id <= sent_id:
+                    continue  # đã gửi trong phần replay
+                yield format_sse('backup', data, event_id)
+                sent_id = event_id
+        finally:
+            self.unsubscribe(q)
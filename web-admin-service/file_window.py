@@ -0,0 +1,77 @@
+# file_window.py
+import codecs
+import os
+
+WINDOW_MODES = ("head", "tail", "range")
+
+# Số byte đầu file dùng để đoán file nhị phân (có byte NUL)
+BINARY_SNIFF_BYTES = 8192
+
+
+def is_binary_sample(data):
+    return b"\x00" in data[:BINARY_SNIFF_BYTES]
+
+
+def read_text_window(file_path, mode="head", offset=0, length=1024 * 1024):
+    """Đọc một cửa sổ tối đa `length` byte của file text, không đọc cả file vào bộ nhớ.
+
+    - head: từ đầu file; tail: `length` byte cuối (bỏ dòng dở đầu cửa sổ); range: từ `offset`.
+    - Cửa sổ được cắt theo ranh giới ký tự UTF-8, nên [offset, end) là khoảng byte thực sự
+      đã giải mã: đọc tiếp bằng mode=range&offset=end không mất hay lặp ký tự
+      (`length` phải >= 4 để luôn chứa được ít nhất một ký tự).
+    """
+    if mode not in WINDOW_MODES:
+        raise ValueError(f"Unknown mode '{mode}', expected one of {WINDOW_MODES}")
+
+    size = os.path.getsize(file_path)
+    if mode == "head":
+        start = 0
+    elif mode == "tail":
+        start = max(0, size - length)
+    else:
+        start = min(max(0, offset), size)
+
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(length)
+        if start == 0:
+            sample = data
+        else:
+            f.seek(0)
+            sample = f.read(BINARY_SNIFF_BYTES)
+
+    if is_binary_sample(sample):
+        return {
+            'content': None,
+            'binary': True,
+            'size': size,
+            'offset': start,
+            'end': start,
+            'truncated': size > 0
+        }
+
+    # Bỏ byte tiếp nối (10xxxxxx) ở đầu cửa sổ: thuộc ký tự nằm trước offset
+    skip = 0
+    while start > 0 and skip < min(3, len(data)) and data[skip] & 0xC0 == 0x80:
+        skip += 1
+    if mode == "tail" and start > 0:
+        newline = data.find(b"\n", skip)
+        if newline != -1:
+            skip = newline + 1
+    start += skip
+    data = data[skip:]
+
+    # Ký tự bị cắt ở cuối cửa sổ được giữ lại cho lần đọc sau (end lùi về trước nó)
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    at_eof = start + len(data) >= size
+    content = decoder.decode(data, final=at_eof)
+    end = start + len(data) - len(decoder.getstate()[0])
+
+    return {
+        'content': content,
+        'binary': False,
+        'size': size,
+        'offset': start,
+        'end': end,
+        'truncated': start > 0 or end < size
+    }
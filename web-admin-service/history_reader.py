@@ -0,0 +1,132 @@
+# history_reader.py
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+# Cột của bảng backups (PHẢI KHỚP VỚI HISTORY_COLUMNS TRONG logging-module/history_index.py)
+HISTORY_COLUMNS = (
+    'timestamp',
+    'status',
+    'source',
+    'destination',
+    'size_bytes',
+    'duration_seconds',
+    'error',
+    'error_code',
+    'stored_size_bytes'
+)
+
+
+class HistoryReader:
+    """Đọc (chỉ đọc) chỉ mục lịch sử backup SQLite do Watcher ghi.
+
+    DB dùng WAL nên kể cả kết nối chỉ đọc cũng cần tạo/ghi file `-shm` cạnh DB.
+    Nếu thư mục log được mount readOnly, việc mở sẽ thất bại; khi đó reader chuyển sang
+    `immutable=1` (không cần -shm) và mở lại kết nối ở mỗi lần đọc. Ở chế độ này chỉ thấy
+    các bản ghi đã được checkpoint từ WAL vào file DB, nên lịch sử/sự kiện có thể trễ.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self.immutable = False
+
+        try:
+            self._conn = self._connect()
+        except sqlite3.OperationalError:
+            # Không tạo được -shm (volume log readOnly): đọc bản đã checkpoint của file DB
+            self.immutable = True
+            self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        mode = "immutable=1" if self.immutable else "mode=ro"
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?{mode}", uri=True, check_same_thread=False
+        )
+        try:
+            # Lỗi -shm chỉ xuất hiện ở lần đọc đầu tiên, không phải lúc connect
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(backups)")}
+        except sqlite3.Error:
+            conn.close()
+            raise
+        # DB cũ (trước khi có stored_size_bytes) vẫn đọc được: cột thiếu trả về NULL
+        self._select = ', '.join(
+            column if column in columns else f"NULL AS {column}" for column in HISTORY_COLUMNS
+        )
+        return conn
+
+    def _execute(self, sql: str, params=()) -> List[tuple]:
+        with self._lock:
+            if self.immutable:
+                # immutable=1 không phát hiện thay đổi: mở lại để thấy dữ liệu mới đã checkpoint
+                self._conn.close()
+                self._conn = self._connect()
+            return self._conn.execute(sql, params).fetchall()
+
+    def query(
+        self,
+        source: Optional[str] = None,
+        q: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 50
+    ) -> Dict[str, Any]:
+        """Tra cứu lịch sử theo bộ lọc, mới nhất trước, có phân trang."""
+        clauses = []
+        params: List[Any] = []
+        if source:
+            clauses.append("source = ?")
+            params.append(source)
+        if q:
+            clauses.append("source LIKE ? ESCAPE '\\'")
+            escaped = q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f"%{escaped}%")
+        if status:
+            clauses.append("status = ?")
+            params.append(status.upper())
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        total = self._execute(f"SELECT COUNT(*) FROM backups {where}", params)[0][0]
+        rows = self._execute(
+            f"SELECT {self._select} FROM backups {where} "
+            f"ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            params + [page_size, (page - 1) * page_size]
+        )
+
+        return {
+            'records': [dict(zip(HISTORY_COLUMNS, row)) for row in rows],
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (total + page_size - 1) // page_size
+        }
+
+    def latest_id(self) -> int:
+        """Id của bản ghi mới nhất (0 khi DB rỗng)."""
+        return self._execute("SELECT COALESCE(MAX(id), 0) FROM backups")[0][0]
+
+    def records_after(self, last_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        """Các bản ghi có id > last_id, cũ nhất trước; dùng để đọc tiếp chỉ mục."""
+        rows = self._execute(
+            f"SELECT id, {self._select} FROM backups WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit)
+        )
+        return [dict(zip(('id',) + HISTORY_COLUMNS, row)) for row in rows]
+
+    def last_backup(self, source: str) -> Optional[Dict[str, Any]]:
+        """Lần backup thành công gần nhất của một file nguồn."""
+        records = self.query(source=source, status='SUCCESS', page_size=1)['records']
+        return records[0] if records else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,47 @@
+# metrics.py
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+RESTORE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class WebAdminMetrics:
+    """Metrics Prometheus của Web Admin: thời gian request API, job restore và download."""
+
+    def __init__(self):
+        self.request_duration = Histogram(
+            'webadmin_request_duration_seconds', 'HTTP request duration', ['endpoint', 'method', 'status']
+        )
+        self.restores = Counter('webadmin_restore_jobs_total', 'Finished restore jobs by result', ['status'])
+        self.restore_duration = Histogram(
+            'webadmin_restore_duration_seconds', 'Restore job duration (download + rename)',
+            buckets=RESTORE_BUCKETS
+        )
+        self.restore_bytes = Counter('webadmin_restored_bytes_total', 'Bytes written by successful restores')
+        self.restores_in_progress = Gauge('webadmin_restore_jobs_in_progress', 'Restore jobs queued or running')
+        self.download_bytes = Counter('webadmin_download_bytes_total', 'Bytes streamed by direct downloads')
+
+    def observe_request(self, endpoint, method, status, duration):
+        self.request_duration.labels(endpoint or 'unknown', method, str(status)).observe(duration)
+
+    def restore_submitted(self, job):
+        self.restores_in_progress.inc()
+
+    def restore_finished(self, job):
+        """Callback on_finish của RestoreJobManager (nhận bản sao trạng thái job)."""
+        self.restores_in_progress.dec()
+        self.restores.labels(job['status']).inc()
+        if job['started_at'] is not None:
+            self.restore_duration.observe(job['finished_at'] - job['started_at'])
+        if job['status'] == 'succeeded' and job['bytes_total']:
+            self.restore_bytes.inc(job['bytes_total'])
+
+    def count_stream(self, blocks):
+        """Bọc generator download để đếm số byte thực sự gửi tới client."""
+        for block in blocks:
+            self.download_bytes.inc(len(block))
+            yield block
+
+    @staticmethod
+    def render():
+        """(nội dung, content type) cho endpoint /metrics."""
+        return generate_latest(), CONTENT_TYPE_LATEST
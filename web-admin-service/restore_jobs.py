@@ -0,0 +1,108 @@
+# restore_jobs.py
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RestoreJobManager:
+    """Chạy các lệnh restore dưới dạng job nền để không giữ Flask worker trong lúc tải.
+
+    Mỗi job tải object về file tạm (Watcher bỏ qua), sau đó đổi tên nguyên tử thành
+    file đích. Trạng thái và tiến độ (bytes_done / bytes_total) được lưu trong bộ nhớ,
+    chỉ giữ `max_history` job gần nhất.
+    """
+
+    def __init__(self, backend, workers=2, max_history=200, on_submit=None, on_finish=None):
+        """on_submit / on_finish: callback(job) nhận bản sao trạng thái job (ví dụ để ghi metrics)."""
+        self.backend = backend
+        self.max_history = max_history
+        self.on_submit = on_submit
+        self.on_finish = on_finish
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="restore")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def submit(self, object_key, final_path, temp_suffix):
+        """Tạo job restore mới và trả về bản sao trạng thái ban đầu của job.
+
+        File tạm là <final_path>.<job_id>.<temp_suffix> để hai lần restore cùng một file
+        không ghi chồng lên file tạm của nhau.
+        """
+        job_id = uuid.uuid4().hex
+        temp_path = f"{final_path}.{job_id[:8]}{temp_suffix}"
+        job = {
+            'job_id': job_id,
+            'object_key': object_key,
+            'filename': os.path.basename(final_path),
+            'status': 'queued',
+            'bytes_done': 0,
+            'bytes_total': None,
+            'error': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None
+        }
+        with self._lock:
+            self._jobs[job['job_id']] = job
+            self._prune()
+        snapshot = self.get(job['job_id'])
+        self._notify(self.on_submit, job)
+        self._executor.submit(self._run, job, final_path, temp_path)
+        return snapshot
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+
+        if snapshot['bytes_total']:
+            snapshot['progress'] = round(snapshot['bytes_done'] / snapshot['bytes_total'] * 100, 1)
+        else:
+            snapshot['progress'] = 100.0 if snapshot['status'] == 'succeeded' else 0.0
+        return snapshot
+
+    def _prune(self):
+        """Xóa các job đã kết thúc cũ nhất khi vượt quá max_history."""
+        excess = len(self._jobs) - self.max_history
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id]['status'] in ('succeeded', 'failed'):
+                del self._jobs[job_id]
+                excess -= 1
+
+    def _notify(self, callback, job):
+        if callback is None:
+            return
+        try:
+            callback(self.get(job['job_id']) or dict(job))
+        except Exception:
+            pass
+
+    def _update(self, job, **fields):
+        with self._lock:
+            job.update(fields)
+
+    def _run(self, job, final_path, temp_path):
+        self._update(job, status='running', started_at=time.time())
+
+        def progress(done, total):
+            self._update(job, bytes_done=done, bytes_total=total)
+
+        try:
+            os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+            self.backend.download_file(job['object_key'], temp_path, progress_callback=progress)
+            # Đổi tên nguyên tử: Watcher chỉ thấy file hoàn chỉnh
+            os.replace(temp_path, final_path)
+            self._update(job, status='succeeded', finished_at=time.time())
+        except Exception as e:
+            # Đảm bảo xóa file tạm nếu có lỗi xảy ra trước khi đổi tên
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            self._update(job, status='failed', error=str(e), finished_at=time.time())
+        self._notify(self.on_finish, job)
@@ -1,8 +1,18 @@
 # s3_backend_client.py
 import os
-import boto3
+import json
+import zlib
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
+from s3_connection import create_s3_client
+
+try:
+    import zstandard
+except ImportError:  # Chỉ cần khi Watcher bật COMPRESSION_CODEC=zstd
+    zstandard = None
 
 # Tải các biến môi trường
 load_dotenv()
@@ -12,51 +22,221 @@ MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
 MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minioadmin")
 MINIO_BUCKET = os.getenv("MINIO_BUCKET", "ceph-backup-bucket")
 
+# Định dạng lưu trữ chunk của Watcher (PHẢI KHỚP VỚI WATCHER chunk_store.py)
+CHUNK_PREFIX = "chunks/"
+FORMAT_METADATA_KEY = "backup-format"
+MANIFEST_FORMAT = "chunked-manifest-v1"
+
+# Metadata nén của Watcher (PHẢI KHỚP VỚI WATCHER compression.py)
+CODEC_METADATA_KEY = "backup-codec"
+ORIGINAL_SIZE_METADATA_KEY = "original-size"
+
+MB = 1024 * 1024
+DOWNLOAD_BLOCK_SIZE = 1 * MB
+
+# Restore file lớn bằng nhiều GET có Range chạy song song
+RESTORE_PART_SIZE = int(os.getenv("RESTORE_PART_SIZE_MB", "16")) * MB
+RESTORE_CONCURRENCY = int(os.getenv("RESTORE_CONCURRENCY", "4"))
+
+
+def chunk_key(digest, prefix=CHUNK_PREFIX):
+    """Key S3 của một chunk (giống chunk_store.chunk_key bên Watcher)."""
+    return f"{prefix}{digest[:2]}/{digest}"
+
+
+def make_decompressor(codec):
+    """Tạo decompressor dạng stream có decompress(data) cho codec ghi trong metadata."""
+    if codec == "gzip":
+        # wbits=47: tự nhận header gzip/zlib
+        return zlib.decompressobj(47)
+    if codec == "zstd":
+        if zstandard is None:
+            raise Exception("Object is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise Exception(f"Unsupported compression codec '{codec}'")
+
+
+def decompress_stream(blocks, codec):
+    """Giải nén dần một chuỗi khối bytes; trả nguyên nếu object không nén."""
+    if not codec:
+        yield from blocks
+        return
+    decompressor = make_decompressor(codec)
+    for block in blocks:
+        data = decompressor.decompress(block)
+        if data:
+            yield data
+    if codec == "gzip":
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+
 class S3BackendClient:
     """Xử lý các thao tác S3 (MinIO) cho Web Admin API."""
 
     def __init__(self):
         self.bucket = MINIO_BUCKET
-        self.s3_client = boto3.client(
-            's3',
-            endpoint_url=MINIO_ENDPOINT,
-            aws_access_key_id=MINIO_ACCESS_KEY,
-            aws_secret_access_key=MINIO_SECRET_KEY
-        )
+        # Client được tạo ở request đầu tiên: app khởi động không cần kết nối MinIO
+        self.s3_client = create_s3_client(MINIO_ENDPOINT, MINIO_ACCESS_KEY, MINIO_SECRET_KEY)
 
-    def list_all_versions(self):
-        """Liệt kê tất cả các đối tượng (versions) trong bucket MinIO."""
+    def iter_versions(self, prefix=''):
+        """Duyệt tất cả các đối tượng (versions) trong bucket, phân trang 1.000 key mỗi lần gọi."""
         try:
-            # Sử dụng list_objects_v2 để lấy danh sách object
-            response = self.s3_client.list_objects_v2(Bucket=self.bucket)
-            
-            objects = []
-            if 'Contents' in response:
-                for obj in response['Contents']:
-                    objects.append({
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+                for obj in page.get('Contents', []):
+                    # Chunk nội bộ của chế độ lưu chunk không phải là phiên bản backup
+                    if obj['Key'].startswith(CHUNK_PREFIX):
+                        continue
+                    yield {
                         'key': obj['Key'],
                         'last_modified': obj['LastModified'].isoformat(),
                         'size': obj['Size']
-                    })
-            return objects
+                    }
         except ClientError as e:
             raise Exception(f"S3 Error listing objects: {e}")
         except Exception as e:
             raise Exception(f"Error connecting to MinIO: {e}")
 
-    def download_file(self, object_key, destination_path):
-        """Tải file từ MinIO về đường dẫn cục bộ."""
+    def list_all_versions(self):
+        """Liệt kê tất cả các đối tượng (versions) trong bucket MinIO (không bị cắt ở 1.000 key)."""
+        return list(self.iter_versions())
+
+    def describe_object(self, object_key):
+        """Thông tin để tải một phiên bản: kích thước thật, manifest (nếu lưu dạng chunk)
+        và codec (nếu Watcher đã nén object)."""
+        head = self.s3_client.head_object(Bucket=self.bucket, Key=object_key)
+        metadata = head.get('Metadata', {})
+        if metadata.get(FORMAT_METADATA_KEY) != MANIFEST_FORMAT:
+            codec = metadata.get(CODEC_METADATA_KEY)
+            size = int(metadata[ORIGINAL_SIZE_METADATA_KEY]) if codec else head['ContentLength']
+            return {'size': size, 'manifest': None, 'codec': codec}
+
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=object_key)
+        manifest = json.loads(response['Body'].read())
+        return {'size': manifest['size'], 'manifest': manifest, 'codec': None}
+
+    def _manifest_parts(self, manifest):
+        """Danh sách (offset, key chunk, hash, size) theo thứ tự trong file gốc."""
+        prefix = manifest.get('chunk_prefix', CHUNK_PREFIX)
+        offset = 0
+        parts = []
+        for chunk in manifest['chunks']:
+            parts.append((offset, chunk_key(chunk['hash'], prefix), chunk['hash'], chunk['size']))
+            offset += chunk['size']
+        return parts
+
+    def _ranges(self, size):
+        """Chia object thành các khoảng byte (start, end) cho GET song song."""
+        return [
+            (start, min(start + RESTORE_PART_SIZE, size) - 1)
+            for start in range(0, size, RESTORE_PART_SIZE)
+        ]
+
+    def _fetch_to_fd(self, fd, key, offset, byte_range, expected_hash, progress):
+        """Tải một object (hoặc một khoảng byte) và ghi thẳng vào fd tại offset bằng pwrite."""
+        kwargs = {'Bucket': self.bucket, 'Key': key}
+        if byte_range is not None:
+            kwargs['Range'] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        body = self.s3_client.get_object(**kwargs)['Body']
+
+        digest = hashlib.sha256() if expected_hash else None
+        for block in body.iter_chunks(DOWNLOAD_BLOCK_SIZE):
+            os.pwrite(fd, block, offset)
+            offset += len(block)
+            if digest:
+                digest.update(block)
+            if progress:
+                progress(len(block))
+
+        if digest and digest.hexdigest() != expected_hash:
+            raise Exception(f"Chunk {expected_hash} of {key} is corrupted")
+
+    def _fetch_compressed_to_fd(self, fd, object_key, codec, progress):
+        """Object nén không chia Range được: tải tuần tự và giải nén dần vào fd."""
+        body = self.s3_client.get_object(Bucket=self.bucket, Key=object_key)['Body']
+        offset = 0
         try:
-            self.s3_client.download_file(
-                Bucket=self.bucket,
-                Key=object_key,
-                Filename=destination_path
-            )
+            for block in decompress_stream(body.iter_chunks(DOWNLOAD_BLOCK_SIZE), codec):
+                os.pwrite(fd, block, offset)
+                offset += len(block)
+                if progress:
+                    progress(len(block))
+        finally:
+            body.close()
+
+    def download_file(self, object_key, destination_path, progress_callback=None):
+        """Tải file từ MinIO về đường dẫn cục bộ (tự ghép lại nếu là manifest chunk).
+
+        File lớn được tải bằng nhiều GET có Range song song, ghi trực tiếp vào đúng vị trí
+        trong file đích. progress_callback(bytes_done, bytes_total) được gọi khi có tiến độ.
+        """
+        try:
+            info = self.describe_object(object_key)
+            total = info['size']
+            done = [0]
+            lock = threading.Lock()
+
+            def progress(n):
+                with lock:
+                    done[0] += n
+                    current = done[0]
+                if progress_callback:
+                    progress_callback(current, total)
+
+            if info['codec']:
+                tasks = None
+            elif info['manifest'] is not None:
+                tasks = [
+                    (key, offset, None, digest)
+                    for offset, key, digest, _ in self._manifest_parts(info['manifest'])
+                ]
+            elif total > RESTORE_PART_SIZE:
+                tasks = [(object_key, start, (start, end), None) for start, end in self._ranges(total)]
+            else:
+                tasks = [(object_key, 0, None, None)]
+
+            fd = os.open(destination_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.ftruncate(fd, total)
+                if progress_callback:
+                    progress_callback(0, total)
+                if tasks is None:
+                    self._fetch_compressed_to_fd(fd, object_key, info['codec'], progress)
+                else:
+                    with ThreadPoolExecutor(max_workers=RESTORE_CONCURRENCY) as executor:
+                        futures = [
+                            executor.submit(self._fetch_to_fd, fd, key, offset, byte_range, digest, progress)
+                            for key, offset, byte_range, digest in tasks
+                        ]
+                        for future in futures:
+                            future.result()
+                os.fsync(fd)
+            finally:
+                os.close(fd)
             return True
         except ClientError as e:
             raise Exception(f"S3 Error downloading {object_key}: {e}")
         except Exception as e:
             raise Exception(f"General error during download: {e}")
 
+    def stream_object(self, object_key):
+        """Trả về (kích thước, generator các khối bytes) để stream object tới client mà không ghi đĩa."""
+        info = self.describe_object(object_key)
+
+        def generate():
+            if info['manifest'] is not None:
+                keys = [key for _, key, _, _ in self._manifest_parts(info['manifest'])]
+            else:
+                keys = [object_key]
+            for key in keys:
+                body = self.s3_client.get_object(Bucket=self.bucket, Key=key)['Body']
+                try:
+                    yield from decompress_stream(body.iter_chunks(DOWNLOAD_BLOCK_SIZE), info['codec'])
+                finally:
+                    body.close()
+
+        return info['size'], generate()
+
 # Khởi tạo client MinIO cho Web Admin
 s3_client = S3BackendClient()
@@ -0,0 +1,73 @@
+# s3_connection.py
+# Cấu hình kết nối S3 dùng chung cho Watcher và Web Admin
+# (PHẢI GIỐNG NHAU ở watcher-service/ và web-admin-service/)
+import os
+import threading
+import boto3
+from botocore.config import Config
+
+# Mặc định của botocore chỉ có 10 kết nối / client: không đủ cho upload multipart / restore song song
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+
+
+def s3_config_kwargs(max_pool_connections=None):
+    """Tham số botocore Config đọc từ biến môi trường (dùng được cho cả Config và AioConfig)."""
+    return {
+        'max_pool_connections': max_pool_connections or int(
+            os.getenv("S3_MAX_POOL_CONNECTIONS", str(DEFAULT_MAX_POOL_CONNECTIONS))
+        ),
+        'connect_timeout': float(os.getenv("S3_CONNECT_TIMEOUT_SECONDS", "5")),
+        'read_timeout': float(os.getenv("S3_READ_TIMEOUT_SECONDS", "60")),
+        # Giữ kết nối TCP tới MinIO sống giữa các request (tránh bắt tay lại mỗi lần upload)
+        'tcp_keepalive': os.getenv("S3_TCP_KEEPALIVE", "true").lower() == "true",
+        # adaptive: retry có backoff + tự giảm tốc phía client khi MinIO trả SlowDown / 503
+        'retries': {
+            'mode': os.getenv("S3_RETRY_MODE", "adaptive"),
+            'max_attempts': int(os.getenv("S3_MAX_ATTEMPTS", "5"))
+        }
+    }
+
+
+class LazyS3Client:
+    """boto3 S3 client chỉ được tạo ở lần gọi đầu tiên (thread-safe).
+
+    Service khởi động mà không cần MinIO sẵn sàng; mọi thuộc tính (put_object,
+    get_paginator, meta...) được chuyển tiếp tới client thật.
+    """
+
+    def __init__(self, endpoint, access_key, secret_key, config=None):
+        self.endpoint = endpoint
+        self._access_key = access_key
+        self._secret_key = secret_key
+        self._config = config
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = boto3.client(
+                        's3',
+                        endpoint_url=self.endpoint,
+                        aws_access_key_id=self._access_key,
+                        aws_secret_access_key=self._secret_key,
+                        config=self._config or Config(**s3_config_kwargs())
+                    )
+                client = self._client
+        return client
+
+    def __getattr__(self, name):
+        # Chỉ được gọi với thuộc tính không có trên LazyS3Client
+        return getattr(self.get(), name)
+
+
+def create_s3_client(endpoint, access_key, secret_key, max_pool_connections=None):
+    """S3 client (tạo lười) với connection pool, keep-alive, retry và timeout theo cấu hình."""
+    return LazyS3Client(
+        endpoint,
+        access_key,
+        secret_key,
+        config=Config(**s3_config_kwargs(max_pool_connections))
+    )
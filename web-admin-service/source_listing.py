@@ -0,0 +1,176 @@
+# source_listing.py
+import base64
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+SORT_KEYS = ("name", "size", "mtime")
+
+
+def encode_cursor(sort_value, name):
+    """Cursor mờ (keyset): giá trị sắp xếp + tên của mục cuối trang trước."""
+    raw = json.dumps([sort_value, name], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        sort_value, name = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(name, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return sort_value, name
+
+
+class ListingSnapshot:
+    """Kết quả một lần quét thư mục: các file (tên, size, mtime_ns), sắp xếp theo từng khóa khi cần."""
+
+    def __init__(self, entries, dir_mtime_ns):
+        self.entries = entries  # list (name, size, mtime_ns), sắp theo tên
+        self.dir_mtime_ns = dir_mtime_ns
+        self.built_at = time.monotonic()
+        self.etag = self.content_etag(entries)
+        self._orders = {"name": (entries, [(name, name) for name, _, _ in entries])}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_etag(entries):
+        """ETag theo nội dung (tên, size, mtime_ns): giữ nguyên qua các lần dựng lại nếu thư mục không đổi."""
+        digest = hashlib.sha1()
+        for name, size, mtime_ns in entries:
+            digest.update(f"{name}\0{size}\0{mtime_ns}\n".encode('utf-8', 'surrogateescape'))
+        return digest.hexdigest()[:16]
+
+    def ordered(self, sort):
+        """(entries, keys) sắp tăng dần theo (giá trị sort, tên); keys dùng cho bisect."""
+        with self._lock:
+            if sort not in self._orders:
+                index = 1 if sort == "size" else 2
+                entries = sorted(self.entries, key=lambda entry: (entry[index], entry[0]))
+                self._orders[sort] = (entries, [(entry[index], entry[0]) for entry in entries])
+            return self._orders[sort]
+
+
+class DirectoryListing:
+    """Danh sách file trong thư mục nguồn, đọc bằng một lần os.scandir và giữ trong bộ nhớ.
+
+    Snapshot được dựng lại khi mtime của thư mục đổi (tạo / xóa / đổi tên file), khi quá
+    `ttl` giây (nội dung file đổi không làm đổi mtime thư mục) hoặc khi invalidate().
+    """
+
+    def __init__(self, root, skip_suffixes=(), ttl=5.0):
+        self.root = root
+        self.skip_suffixes = tuple(skip_suffixes)
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._snapshot = None
+
+    def _scan(self):
+        entries = []
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.name.endswith(self.skip_suffixes):
+                    continue
+                try:
+                    # is_file() dùng d_type có sẵn từ readdir; chỉ một lần stat() để lấy size/mtime
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.name, stat.st_size, stat.st_mtime_ns))
+        entries.sort()
+        return entries
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def snapshot(self):
+        dir_mtime_ns = os.stat(self.root).st_mtime_ns
+        with self._lock:
+            current = self._snapshot
+        if (current is not None and current.dir_mtime_ns == dir_mtime_ns and
+                time.monotonic() - current.built_at <= self.ttl):
+            return current
+
+        # Chỉ một luồng quét thư mục tại một thời điểm; các luồng khác dùng kết quả vừa dựng
+        with self._refresh_lock:
+            with self._lock:
+                current = self._snapshot
+            if (current is not None and current.dir_mtime_ns == dir_mtime_ns and
+                    time.monotonic() - current.built_at <= self.ttl):
+                return current
+            entries = self._scan()
+            with self._lock:
+                self._snapshot = ListingSnapshot(entries, dir_mtime_ns)
+                return self._snapshot
+
+    @staticmethod
+    def query_etag(snapshot, prefix, sort, order, cursor, limit):
+        params = f"{snapshot.etag}|{prefix}|{sort}|{order}|{cursor}|{limit}"
+        return hashlib.sha1(params.encode('utf-8')).hexdigest()[:24]
+
+    def query(self, snapshot, prefix=None, sort="name", order="asc", cursor=None, limit=200):
+        """Một trang file (lọc theo tiền tố tên), phân trang bằng cursor."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key '{sort}', expected one of {SORT_KEYS}")
+        descending = order == "desc"
+        entries, keys = snapshot.ordered(sort)
+
+        # Khoảng chỉ số chứa các tên có tiền tố `prefix` (chỉ thu hẹp được khi sắp theo tên)
+        lo, hi = 0, len(entries)
+        if prefix and sort == "name":
+            lo = bisect.bisect_left(keys, (prefix, prefix))
+            hi = bisect.bisect_left(keys, (prefix + "\U0010ffff", ""), lo)
+
+        if cursor:
+            position = decode_cursor(cursor)
+            if not isinstance(position[0], str if sort == "name" else int):
+                raise ValueError(f"Cursor does not match sort key '{sort}'")
+            if descending:
+                hi = min(hi, bisect.bisect_left(keys, position))
+            else:
+                lo = max(lo, bisect.bisect_right(keys, position))
+
+        indexes = range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+        page = []
+        last_key = None
+        next_cursor = None
+        for i in indexes:
+            name, size, mtime_ns = entries[i]
+            if prefix and not name.startswith(prefix):
+                continue
+            if len(page) == limit:
+                # Còn ít nhất một mục sau trang này
+                next_cursor = encode_cursor(*last_key)
+                break
+            page.append({
+                'name': name,
+                'size': size,
+                'modified': datetime.fromtimestamp(mtime_ns / 1e9).isoformat()
+            })
+            last_key = keys[i]
+
+        if not prefix:
+            total = len(entries)
+        elif sort == "name":
+            lo_all = bisect.bisect_left(keys, (prefix, prefix))
+            total = bisect.bisect_left(keys, (prefix + "\U0010ffff", ""), lo_all) - lo_all
+        else:
+            total = sum(1 for name, _, _ in entries if name.startswith(prefix))
+
+        return {
+            'files': page,
+            'next_cursor': next_cursor,
+            'total': total,
+            'sort': sort,
+            'order': "desc" if descending else "asc"
+        }
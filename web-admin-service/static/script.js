@@ -12,6 +12,38 @@ const createNewBtn = document.getElementById('create-new-btn');
 const statusMessage = document.getElementById('status-message'); // Cho Editor
 const backupListContainer = document.getElementById('backup-list-container'); // Mới
 const backupStatusMessage = document.getElementById('backup-status-message'); // Mới
+const backupSearchInput = document.getElementById('backup-search');
+const backupPrevBtn = document.getElementById('backup-prev-btn');
+const backupNextBtn = document.getElementById('backup-next-btn');
+const backupPageInfo = document.getElementById('backup-page-info');
+const fileSearchInput = document.getElementById('file-search');
+const fileLoadMoreBtn = document.getElementById('file-load-more-btn');
+const fileCountInfo = document.getElementById('file-count-info');
+const fileWindowBar = document.getElementById('file-window-bar');
+const fileWindowInfo = document.getElementById('file-window-info');
+const windowMoreBtn = document.getElementById('window-more-btn');
+const windowTailBtn = document.getElementById('window-tail-btn');
+const fileDownloadLink = document.getElementById('file-download-link');
+const uploadBtn = document.getElementById('upload-btn');
+const uploadInput = document.getElementById('upload-input');
+
+// Trạng thái phân trang/lọc của danh sách Backup (server-side)
+const BACKUP_PAGE_SIZE = 50;
+let backupPage = 1;
+let backupQuery = '';
+
+// Danh sách file nguồn: phân trang bằng cursor (nút "Load more") và lọc theo tiền tố
+const FILE_PAGE_SIZE = 200;
+let fileCursor = null;
+let filePrefix = '';
+
+// Cửa sổ nội dung đang hiển thị trong editor: file lớn chỉ được tải từng phần
+const FILE_WINDOW_BYTES = 1024 * 1024;
+let fileWindow = null; // {offset, end, size, truncated}
+
+// Upload file lớn theo từng phần (resumable): mỗi request gửi tối đa UPLOAD_CHUNK_BYTES
+const UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024;
+const UPLOAD_MAX_RETRIES = 5;
 
 
 // Hàm 1: Reset trạng thái soạn thảo (Yêu cầu 1)
@@ -20,8 +52,11 @@ function resetEditorState() {
     filenameSpan.textContent = 'Choose or add new file';
     editor.value = '';
     editor.disabled = true;
+    editor.readOnly = false;
     saveBtn.disabled = true;
     deleteBtn.disabled = true;
+    fileWindow = null;
+    fileWindowBar.classList.add('hidden');
     
     // Gỡ active khỏi tất cả các mục trong danh sách
     document.querySelectorAll('#file-list li').forEach(li => li.classList.remove('active'));
@@ -40,22 +75,37 @@ function showStatus(message, type = 'success', target = statusMessage) {
 // ----------------------------------------------------
 // A. Tải và Hiển thị Danh sách File
 // ----------------------------------------------------
-async function loadFiles() {
+async function loadFiles(append = false) {
     try {
-        const response = await fetch(`${API_BASE_URL}/files`);
-        const data = await response.json();
+        const params = new URLSearchParams({ limit: FILE_PAGE_SIZE });
+        if (filePrefix) params.set('prefix', filePrefix);
+        if (append && fileCursor) params.set('cursor', fileCursor);
+
+        const response = await fetch(`${API_BASE_URL}/files?${params}`);
+        const data = await response.json(); // {files: [{name, size, modified}], next_cursor, total}
+        if (!response.ok) {
+            throw new Error(data.error);
+        }
         
-        fileListUl.innerHTML = '';
-        if (data.files.length === 0) {
+        if (!append) {
+            fileListUl.innerHTML = '';
+        }
+        fileCursor = data.next_cursor;
+        fileLoadMoreBtn.classList.toggle('hidden', !fileCursor);
+        fileCountInfo.textContent = `${data.total} files`;
+
+        if (!append && data.files.length === 0) {
             fileListUl.innerHTML = '<li class="empty-message">No files found.</li>';
             return;
         }
 
-        data.files.forEach(filename => {
+        data.files.forEach(file => {
             const li = document.createElement('li');
-            li.textContent = filename;
-            li.dataset.filename = filename;
-            li.addEventListener('click', () => selectFile(filename));
+            li.textContent = file.name;
+            li.title = `${formatBytes(file.size)} · ${new Date(file.modified).toLocaleString()}`;
+            li.dataset.filename = file.name;
+            if (file.name === currentFile) li.classList.add('active');
+            li.addEventListener('click', () => selectFile(file.name));
             fileListUl.appendChild(li);
         });
 
@@ -77,17 +127,42 @@ async function selectFile(filename) {
     deleteBtn.disabled = false;
     
     // Gỡ active khỏi tất cả và thêm vào file được chọn
+    // (file có thể không nằm trong trang danh sách đang tải, ví dụ vừa tạo / restore)
     document.querySelectorAll('#file-list li').forEach(li => li.classList.remove('active'));
-    document.querySelector(`[data-filename="${filename}"]`).classList.add('active');
+    const item = document.querySelector(`#file-list li[data-filename="${CSS.escape(filename)}"]`);
+    if (item) {
+        item.classList.add('active');
+    }
+
+    // 2. Tải nội dung (chỉ cửa sổ đầu tiên nếu file lớn)
+    await loadFileWindow(filename, { mode: 'head' });
+}
 
-    // 2. Tải nội dung
+// Tải một cửa sổ nội dung; append=true nối tiếp vào nội dung đang hiển thị
+async function loadFileWindow(filename, { mode = 'head', offset = 0, append = false } = {}) {
     try {
-        const response = await fetch(`${API_BASE_URL}/file/${filename}`);
+        const params = new URLSearchParams({ mode, max_bytes: FILE_WINDOW_BYTES });
+        if (mode === 'range') params.set('offset', offset);
+
+        const response = await fetch(`${API_BASE_URL}/file/${filename}?${params}`);
+        const data = await response.json(); // {content, binary, size, offset, end, truncated, raw_url}
         if (!response.ok) {
-            throw new Error('Unable to read file content.');
+            throw new Error(data.error || 'Unable to read file content.');
         }
-        const data = await response.json();
-        editor.value = data.content;
+        if (filename !== currentFile) return; // Người dùng đã chọn file khác trong lúc tải
+
+        fileDownloadLink.href = `${data.raw_url}?download=1`;
+        if (data.binary) {
+            editor.value = `Binary file (${formatBytes(data.size)}): use Download to get its content.`;
+            fileWindow = { offset: 0, end: 0, size: data.size, truncated: true };
+        } else if (append && fileWindow) {
+            editor.value += data.content;
+            fileWindow = { offset: fileWindow.offset, end: data.end, size: data.size, truncated: fileWindow.offset > 0 || data.end < data.size };
+        } else {
+            editor.value = data.content;
+            fileWindow = { offset: data.offset, end: data.end, size: data.size, truncated: data.truncated };
+        }
+        updateFileWindowBar(data.binary);
 
     } catch (error) {
         showStatus(error.message || 'Error reading file!', 'error');
@@ -95,6 +170,33 @@ async function selectFile(filename) {
     }
 }
 
+// Nội dung chưa đầy đủ (file lớn / nhị phân): chỉ đọc, tắt Save để không ghi đè file bằng một phần
+function updateFileWindowBar(binary) {
+    const partial = fileWindow.truncated;
+    editor.readOnly = partial;
+    saveBtn.disabled = partial;
+    fileWindowBar.classList.toggle('hidden', !partial);
+    if (!partial) return;
+
+    fileWindowInfo.textContent = binary
+        ? `Binary file · ${formatBytes(fileWindow.size)}`
+        : `Showing ${formatBytes(fileWindow.offset)}–${formatBytes(fileWindow.end)} of ${formatBytes(fileWindow.size)} (read-only)`;
+    windowMoreBtn.classList.toggle('hidden', binary || fileWindow.end >= fileWindow.size);
+    windowTailBtn.classList.toggle('hidden', binary || fileWindow.end >= fileWindow.size);
+}
+
+windowMoreBtn.addEventListener('click', () => {
+    if (currentFile && fileWindow) {
+        loadFileWindow(currentFile, { mode: 'range', offset: fileWindow.end, append: true });
+    }
+});
+
+windowTailBtn.addEventListener('click', () => {
+    if (currentFile) {
+        loadFileWindow(currentFile, { mode: 'tail' });
+    }
+});
+
 // ----------------------------------------------------
 // C. Tạo File Mới (Logic đã sửa đổi - Yêu cầu 2)
 // ----------------------------------------------------
@@ -102,13 +204,8 @@ createNewBtn.addEventListener('click', async () => {
     const newFilename = prompt("Enter new file name (Ex: config.txt):");
     
     if (newFilename) {
-        // Kiểm tra xem file đã tồn tại trên UI chưa
-        if (document.querySelector(`[data-filename="${newFilename}"]`)) {
-            alert("File name already exists. Please choose a different name.");
-            return;
-        }
-
         // 1. Gọi API POST để tạo file rỗng ngay lập tức
+        //    (server trả 409 nếu tên đã tồn tại, kể cả file chưa nằm trong trang danh sách đang tải)
         try {
             const response = await fetch(`${API_BASE_URL}/file/${newFilename}`, {
                 method: 'POST', 
@@ -127,6 +224,8 @@ createNewBtn.addEventListener('click', async () => {
                 await loadFiles(); 
                 selectFile(newFilename); 
 
+            } else if (response.status === 409) {
+                alert("File name already exists. Please choose a different name.");
             } else {
                 throw new Error(data.error);
             }
@@ -144,16 +243,17 @@ createNewBtn.addEventListener('click', async () => {
 saveBtn.addEventListener('click', async () => {
     if (!currentFile) return;
 
-    const url = `${API_BASE_URL}/file/${currentFile}`;
+    // Gửi raw body: server ghi vào file tạm rồi đổi tên nguyên tử (Watcher chỉ backup 1 lần)
+    const url = `${API_BASE_URL}/file/${currentFile}/content`;
     
     // Luôn dùng PUT cho việc cập nhật sau khi file đã tồn tại
     try {
         const response = await fetch(url, {
             method: 'PUT', 
             headers: {
-                'Content-Type': 'application/json',
+                'Content-Type': 'text/plain; charset=utf-8',
             },
-            body: JSON.stringify({ content: editor.value }),
+            body: editor.value,
         });
 
         const data = await response.json();
@@ -168,6 +268,76 @@ saveBtn.addEventListener('click', async () => {
     }
 });
 
+// ----------------------------------------------------
+// D2. Upload File lớn (từng phần, tiếp tục được khi mất kết nối)
+// ----------------------------------------------------
+async function uploadChunk(uploadId, offset, blob) {
+    const response = await fetch(`${API_BASE_URL}/uploads/${uploadId}?offset=${offset}`, {
+        method: 'PUT',
+        headers: { 'Content-Type': 'application/octet-stream' },
+        body: blob,
+    });
+    const data = await response.json();
+    // 409: offset lệch (phần trước đã tới server dù client báo lỗi) -> tiếp tục từ offset của server
+    if (response.ok || (response.status === 409 && data.offset !== undefined)) {
+        return data.offset;
+    }
+    throw new Error(data.error);
+}
+
+async function uploadFileResumable(file) {
+    let response = await fetch(`${API_BASE_URL}/uploads`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name, size: file.size }),
+    });
+    let data = await response.json();
+    if (!response.ok) throw new Error(data.error);
+
+    const uploadId = data.upload_id;
+    let offset = data.offset;
+    let retries = 0;
+    try {
+        while (offset < file.size) {
+            try {
+                offset = await uploadChunk(uploadId, offset, file.slice(offset, offset + UPLOAD_CHUNK_BYTES));
+                retries = 0;
+            } catch (error) {
+                if (++retries > UPLOAD_MAX_RETRIES) throw error;
+                await new Promise(resolve => setTimeout(resolve, 1000 * retries));
+                // Hỏi server đã nhận tới byte nào rồi gửi tiếp từ đó
+                const state = await fetch(`${API_BASE_URL}/uploads/${uploadId}`);
+                if (state.ok) offset = (await state.json()).offset;
+            }
+            showStatus(`Uploading "${file.name}": ${Math.floor(offset * 100 / Math.max(file.size, 1))}%`, 'info');
+        }
+
+        response = await fetch(`${API_BASE_URL}/uploads/${uploadId}/complete`, { method: 'POST' });
+        data = await response.json();
+        if (!response.ok) throw new Error(data.error);
+    } catch (error) {
+        await fetch(`${API_BASE_URL}/uploads/${uploadId}`, { method: 'DELETE' }).catch(() => {});
+        throw error;
+    }
+}
+
+uploadBtn.addEventListener('click', () => uploadInput.click());
+
+uploadInput.addEventListener('change', async () => {
+    const file = uploadInput.files[0];
+    uploadInput.value = '';
+    if (!file) return;
+
+    try {
+        await uploadFileResumable(file);
+        showStatus(`Uploaded "${file.name}" (${formatBytes(file.size)}).`, 'success');
+        await loadFiles();
+    } catch (error) {
+        showStatus('Upload error: ' + error.message, 'error');
+        console.error('Upload error:', error);
+    }
+});
+
 // ----------------------------------------------------
 // E. Xóa File
 // ----------------------------------------------------
@@ -202,71 +372,31 @@ deleteBtn.addEventListener('click', async () => {
 // ----------------------------------------------------
 // F. Tải và Hiển thị Danh sách Backup (MỚI)
 // ----------------------------------------------------
-async function loadBackupHistory() {
+async function loadBackupHistory(page = backupPage) {
     backupListContainer.innerHTML = '<div class="loading-message">Loading history...</div>';
     try {
-        const response = await fetch(`${API_BASE_URL}/backup/versions`);
-        const data = await response.json(); // Data là object {filename: [version_list], ...}
+        const params = new URLSearchParams({ page, page_size: BACKUP_PAGE_SIZE });
+        if (backupQuery) params.set('q', backupQuery);
+
+        const response = await fetch(`${API_BASE_URL}/backup/versions?${params}`);
+        const data = await response.json(); // {files: [{filename, version_count, versions}], total_pages, ...}
+        if (!response.ok) {
+            throw new Error(data.error);
+        }
+
+        backupPage = data.page;
+        updateBackupPager(data);
 
         backupListContainer.innerHTML = '';
-        if (Object.keys(data).length === 0) {
+        if (data.files.length === 0) {
             backupListContainer.innerHTML = '<div class="loading-message">No backup versions found.</div>';
             return;
         }
 
-        // Duyệt qua từng file gốc (key)
-        for (const [baseName, versions] of Object.entries(data)) {
-            const groupDiv = document.createElement('div');
-            groupDiv.className = 'backup-group';
-
-            // Header (Dropdown Trigger)
-            const header = document.createElement('div');
-            header.className = 'backup-file-header';
-            header.innerHTML = `
-                ${baseName} <span>(${versions.length} versions)</span>
-            `;
-            
-            // List Versions (Ẩn ban đầu)
-            const ul = document.createElement('ul');
-            ul.className = 'version-list';
-            
-            // Logic cho Dropdown
-            header.addEventListener('click', () => {
-                ul.classList.toggle('expanded');
-            });
-            
-            // Duyệt qua từng phiên bản (version)
-            // Sắp xếp ngược để thấy phiên bản mới nhất trước
-            versions.sort((a, b) => new Date(b.last_modified) - new Date(a.last_modified)).forEach(version => {
-                const li = document.createElement('li');
-                
-                // Chuẩn hóa thời gian
-                const date = new Date(version.last_modified);
-                const timeStr = date.toLocaleTimeString();
-                const dateStr = date.toLocaleDateString();
-                
-                li.innerHTML = `
-                    <div class="version-info">
-                        <strong>Key: ${version.key}</strong>
-                        <span class="version-time">Modified: ${dateStr} ${timeStr}</span>
-                        <span class="version-time">Size: ${formatBytes(version.size)}</span>
-                    </div>
-                    <button class="restore-action-btn" data-key="${version.key}">Restore</button>
-                `;
-                
-                // Gán sự kiện cho nút Restore
-                li.querySelector('.restore-action-btn').addEventListener('click', (e) => {
-                    e.stopPropagation(); // Ngăn sự kiện click lan ra dropdown
-                    handleRestore(version.key, baseName);
-                });
-                
-                ul.appendChild(li);
-            });
-            
-            groupDiv.appendChild(header);
-            groupDiv.appendChild(ul);
-            backupListContainer.appendChild(groupDiv);
-        }
+        // Duyệt qua từng file gốc
+        data.files.forEach(file => {
+            backupListContainer.appendChild(renderBackupGroup(file));
+        });
 
     } catch (error) {
         showStatus('Error loading backup history!', 'error', backupStatusMessage);
@@ -274,6 +404,155 @@ async function loadBackupHistory() {
     }
 }
 
+function updateBackupPager(data) {
+    const totalPages = Math.max(1, data.total_pages);
+    backupPageInfo.textContent = `Page ${data.page}/${totalPages} (${data.total_files} files)`;
+    backupPrevBtn.disabled = data.page <= 1;
+    backupNextBtn.disabled = data.page >= totalPages;
+}
+
+function renderBackupGroup(file) {
+    const groupDiv = document.createElement('div');
+    groupDiv.className = 'backup-group';
+    groupDiv.dataset.filename = file.filename;
+    groupDiv.dataset.versionCount = file.version_count;
+
+    // Header (Dropdown Trigger)
+    const header = document.createElement('div');
+    header.className = 'backup-file-header';
+    header.innerHTML = `
+        ${file.filename} <span>(${file.version_count} versions)</span>
+    `;
+
+    // List Versions (Ẩn ban đầu)
+    const ul = document.createElement('ul');
+    ul.className = 'version-list';
+
+    // Logic cho Dropdown
+    header.addEventListener('click', () => {
+        ul.classList.toggle('expanded');
+    });
+
+    // Server đã sắp xếp phiên bản mới nhất trước
+    file.versions.forEach(version => {
+        ul.appendChild(renderVersionItem(version, file.filename));
+    });
+
+    groupDiv.appendChild(header);
+    groupDiv.appendChild(ul);
+    return groupDiv;
+}
+
+function renderVersionItem(version, baseName) {
+    const li = document.createElement('li');
+
+    // Chuẩn hóa thời gian
+    const date = new Date(version.backup_time || version.last_modified);
+    const timeStr = date.toLocaleTimeString();
+    const dateStr = date.toLocaleDateString();
+
+    li.innerHTML = `
+        <div class="version-info">
+            <strong>Key: ${version.key}</strong>
+            <span class="version-time">Modified: ${dateStr} ${timeStr}</span>
+            <span class="version-time">Size: ${formatBytes(version.size)}</span>
+        </div>
+        <a class="download-action-btn" href="${API_BASE_URL}/backup/object/${encodeURIComponent(version.key)}" title="Download">⬇</a>
+        <button class="restore-action-btn" data-key="${version.key}">Restore</button>
+    `;
+
+    li.querySelector('.download-action-btn').addEventListener('click', (e) => {
+        e.stopPropagation(); // Tải trực tiếp, không mở/đóng dropdown
+    });
+
+    // Gán sự kiện cho nút Restore
+    li.querySelector('.restore-action-btn').addEventListener('click', (e) => {
+        e.stopPropagation(); // Ngăn sự kiện click lan ra dropdown
+        handleRestore(version.key, baseName);
+    });
+    return li;
+}
+
+fileLoadMoreBtn.addEventListener('click', () => loadFiles(true));
+
+// Lọc danh sách file theo tiền tố tên (chờ người dùng ngừng gõ 300ms)
+let fileSearchTimer = null;
+fileSearchInput.addEventListener('input', () => {
+    clearTimeout(fileSearchTimer);
+    fileSearchTimer = setTimeout(() => {
+        filePrefix = fileSearchInput.value.trim();
+        loadFiles();
+    }, 300);
+});
+
+backupPrevBtn.addEventListener('click', () => loadBackupHistory(backupPage - 1));
+backupNextBtn.addEventListener('click', () => loadBackupHistory(backupPage + 1));
+
+// Lọc theo tên file (chờ người dùng ngừng gõ 300ms rồi mới gọi API)
+let backupSearchTimer = null;
+backupSearchInput.addEventListener('input', () => {
+    clearTimeout(backupSearchTimer);
+    backupSearchTimer = setTimeout(() => {
+        backupQuery = backupSearchInput.value.trim();
+        loadBackupHistory(1);
+    }, 300);
+});
+
+// ----------------------------------------------------
+// F2. Cập nhật danh sách Backup theo thời gian thực (Server-Sent Events)
+// ----------------------------------------------------
+// Server đẩy từng kết quả backup của Watcher; phiên bản mới được chèn thẳng vào danh sách
+// đang hiển thị, không cần gọi lại /api/backup/versions. Lần đầu gửi id lịch sử lúc render
+// trang (không lỡ sự kiện trước khi kết nối); EventSource tự kết nối lại và gửi
+// Last-Event-ID để nhận các sự kiện bị lỡ.
+function connectBackupEvents() {
+    const startId = document.body.dataset.lastEventId;
+    const query = startId ? `?last_event_id=${encodeURIComponent(startId)}` : '';
+    const source = new EventSource(`${API_BASE_URL}/backup/events${query}`);
+
+    source.addEventListener('backup', (e) => {
+        const event = JSON.parse(e.data);
+        if (event.status === 'SUCCESS' && event.version) {
+            applyBackupVersion(event.version);
+            showStatus(`Backed up ${event.version.filename}`, 'success', backupStatusMessage);
+        } else if (event.status === 'FAILED') {
+            showStatus(`Backup failed: ${event.source} (${event.error})`, 'error', backupStatusMessage);
+        }
+    });
+
+    // Đã lỡ quá nhiều sự kiện: tải lại trang danh sách hiện tại
+    source.addEventListener('resync', () => loadBackupHistory(backupPage));
+}
+
+function applyBackupVersion(version) {
+    if (backupQuery && !version.filename.toLowerCase().includes(backupQuery.toLowerCase())) {
+        return;
+    }
+
+    const groups = Array.from(backupListContainer.querySelectorAll('.backup-group'));
+    const group = groups.find(g => g.dataset.filename === version.filename);
+    if (group) {
+        const ul = group.querySelector('.version-list');
+        if (ul.querySelector(`[data-key="${CSS.escape(version.key)}"]`)) return; // đã có
+        ul.insertBefore(renderVersionItem(version, version.filename), ul.firstChild);
+        group.dataset.versionCount = Number(group.dataset.versionCount) + 1;
+        group.querySelector('.backup-file-header span').textContent =
+            `(${group.dataset.versionCount} versions)`;
+        return;
+    }
+
+    // File gốc mới: chỉ chèn nếu tên nằm trong khoảng của trang đang xem (danh sách sắp theo tên)
+    const names = groups.map(g => g.dataset.filename);
+    const isLastPage = backupNextBtn.disabled;
+    if (names.length > 0 && version.filename < names[0] && backupPage > 1) return;
+    if (names.length > 0 && version.filename > names[names.length - 1] && !isLastPage) return;
+
+    const newGroup = renderBackupGroup({ filename: version.filename, version_count: 1, versions: [version] });
+    const next = groups.find(g => g.dataset.filename > version.filename);
+    if (groups.length === 0) backupListContainer.innerHTML = '';
+    backupListContainer.insertBefore(newGroup, next || null);
+}
+
 // ----------------------------------------------------
 // G. Xử lý Phục hồi (Restore)
 // ----------------------------------------------------
@@ -289,28 +568,52 @@ async function handleRestore(objectKey, baseName) {
     const url = `${API_BASE_URL}/backup/restore/${encodedKey}`;
 
     try {
+        // 1. Tạo job restore (server trả về 202 ngay, việc tải chạy ở nền)
         const response = await fetch(url, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
         });
 
         const data = await response.json();
-
-        if (response.ok) {
-            showStatus(data.message, 'success', backupStatusMessage);
-            // Sau khi restore thành công, tải lại danh sách file nguồn
-            await loadFiles(); 
-            // Chọn file vừa được restore để người dùng thấy nội dung
-            selectFile(baseName); 
-        } else {
+        if (!response.ok) {
             throw new Error(data.error);
         }
+
+        // 2. Theo dõi tiến độ job cho đến khi kết thúc
+        const job = await waitForRestoreJob(data.job_id, baseName);
+        if (job.status !== 'succeeded') {
+            throw new Error(job.error || 'Unknown error');
+        }
+
+        showStatus(`File ${data.filename} restored successfully from backup key ${objectKey}.`, 'success', backupStatusMessage);
+        // Sau khi restore thành công, tải lại danh sách file nguồn
+        await loadFiles(); 
+        // Chọn file vừa được restore để người dùng thấy nội dung
+        selectFile(data.filename); 
     } catch (error) {
         showStatus('RESTORE FAILED: ' + error.message, 'error', backupStatusMessage);
         console.error('Restore error:', error);
     }
 }
 
+// Hỏi trạng thái job mỗi giây, hiển thị % tiến độ cho đến khi job thành công/thất bại
+async function waitForRestoreJob(jobId, baseName) {
+    while (true) {
+        const response = await fetch(`${API_BASE_URL}/backup/jobs/${jobId}`);
+        const job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.error);
+        }
+        if (job.status === 'succeeded' || job.status === 'failed') {
+            return job;
+        }
+
+        const total = job.bytes_total ? ` of ${formatBytes(job.bytes_total)}` : '';
+        showStatus(`Restoring ${baseName}... ${job.progress}% (${formatBytes(job.bytes_done)}${total})`, 'info', backupStatusMessage);
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
 // ----------------------------------------------------
 // H. Hàm tiện ích (Định dạng Kích thước File)
 // ----------------------------------------------------
@@ -329,5 +632,6 @@ function formatBytes(bytes, decimals = 2) {
 document.addEventListener('DOMContentLoaded', () => {
     loadFiles();
     loadBackupHistory(); // Tải lịch sử backup khi khởi tạo
+    connectBackupEvents(); // Sau đó chỉ nhận cập nhật (không polling)
     resetEditorState(); 
 });
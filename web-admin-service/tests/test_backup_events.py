@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backup_events import BackupEventStream
+from version_index import VersionIndex
+
+
+class FakeHistory:
+    """latest_id / records_after của HistoryReader trên một list trong bộ nhớ."""
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def add(self, status, name, destination=None):
+        with self._lock:
+            record_id = len(self.records) + 1
+            self.records.append({
+                'id': record_id,
+                'timestamp': f"2026-01-01T00:00:{record_id:02d}",
+                'status': status,
+                'source': f"/data/{name}",
+                'destination': destination,
+                'size_bytes': 10 * record_id,
+                'duration_seconds': 0.1,
+                'error': None if status == 'SUCCESS' else "boom",
+                'error_code': None,
+                'stored_size_bytes': 3 * record_id if status == 'SUCCESS' else None
+            })
+            return record_id
+
+    def latest_id(self):
+        with self._lock:
+            return len(self.records)
+
+    def records_after(self, last_id, limit=500):
+        with self._lock:
+            return [dict(r) for r in self.records if r['id'] > last_id][:limit]
+
+
+class FakeBackend:
+    def iter_versions(self):
+        return iter(())
+
+
+def make_stream(history, **kwargs):
+    index = VersionIndex(FakeBackend())
+    index.refresh()
+    return BackupEventStream(lambda: history, index, "backups", poll_interval=0.01, **kwargs), index
+
+
+def parse(message):
+    fields = dict(line.split(": ", 1) for line in message.strip().splitlines())
+    return fields.get('event'), fields.get('id'), json.loads(fields['data'])
+
+
+def next_event(generator):
+    while True:
+        message = next(generator)
+        if message.startswith(("retry:", ":")):
+            continue
+        return parse(message)
+
+
+def test_last_event_id_replays_missed_events_then_streams_live():
+    """Reconnecting with Last-Event-ID replays later records, then new ones arrive live."""
+    
+    history = FakeHistory()
+    for i in range(4):
+        history.add("SUCCESS", f"f{i}.txt", f"s3://backups/f{i}_20260101_0000{i:02d}.txt")
+    stream, index = make_stream(history)
+    
+    generator = stream.stream(last_event_id=2, heartbeat=0.05)
+    assert [next_event(generator)[1] for _ in range(2)] == ["3", "4"]
+    
+    history.add("FAILED", "broken.txt")
+    event, event_id, data = next_event(generator)
+    assert (event, event_id) == ("backup", "5")
+    assert data['status'] == "FAILED" and data['key'] is None and data['version'] is None
+    
+    generator.close()
+    assert stream.subscriber_count() == 0
+
+
+def test_success_event_carries_version_and_updates_index():
+    """A SUCCESS record becomes a version entry and is added to the VersionIndex."""
+    
+    history = FakeHistory()
+    stream, index = make_stream(history)
+    
+    history.add("SUCCESS", "report.txt", "s3://backups/report_20260101_000001.txt")
+    event, event_id, data = next_event(stream.stream(last_event_id=0, heartbeat=0.05))
+    
+    assert data['key'] == "report_20260101_000001.txt"
+    assert data['version']['filename'] == "report.txt"
+    assert data['size'] == data['version']['size'] == 3  # stored object, not the source file
+    assert data['source_size'] == 10
+    assert index.versions_of("report.txt")[0]['key'] == data['key']
+
+
+def test_too_many_missed_events_asks_client_to_resync():
+    """Replay is bounded: a client that missed too much gets a resync event instead."""
+    
+    history = FakeHistory()
+    for i in range(5):
+        history.add("FAILED", f"f{i}.txt")
+    stream, _ = make_stream(history, replay_limit=3)
+    
+    generator = stream.stream(last_event_id=0, heartbeat=0.05)
+    event, _, data = next_event(generator)
+    assert event == "resync"
+    generator.close()
+
+
+def test_new_client_does_not_miss_records_written_while_connecting():
+    """Records written right after connect are delivered even before the poller's first read."""
+    
+    history = FakeHistory()
+    history.add("FAILED", "old.txt")
+    stream, _ = make_stream(history)
+    stream.poll_interval = 0.2
+    
+    generator = stream.stream(heartbeat=0.05)
+    assert next(generator).startswith("retry:")
+    history.add("FAILED", "new.txt")
+    
+    event, event_id, data = next_event(generator)
+    assert event_id == "2" and data['source'] == "/data/new.txt"
+    generator.close()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from file_window import read_text_window
+
+
+def test_head_window_keeps_split_character_for_next_read(tmp_path):
+    """A multi-byte character cut at the end of the window is left for the next window."""
+    
+    path = tmp_path / "vi.txt"
+    path.write_bytes("abcđef".encode("utf-8"))  # 'đ' is 2 bytes at offset 3
+    
+    first = read_text_window(str(path), mode="head", length=4)
+    assert first['content'] == "abc"
+    assert first['end'] == 3
+    assert first['truncated']
+    
+    rest = read_text_window(str(path), mode="range", offset=first['end'], length=4)
+    assert rest['content'] == "đef"
+    assert rest['end'] == rest['size']
+    assert rest['offset'] == 3
+
+
+def test_range_offset_inside_character_skips_continuation_bytes(tmp_path):
+    """An offset in the middle of a character starts at the next full character."""
+    
+    path = tmp_path / "vi.txt"
+    path.write_bytes("xin chào thế giới".encode("utf-8"))
+    data = path.read_bytes()
+    inside = data.index("à".encode("utf-8")) + 1
+    
+    window = read_text_window(str(path), mode="range", offset=inside, length=64)
+    assert window['offset'] == inside + 1
+    assert window['content'] == "o thế giới"
+
+
+def test_windows_cover_file_without_gaps_or_repeats(tmp_path):
+    """Chaining range reads from `end` decodes the whole file exactly once."""
+    
+    text = "Tiếng Việt có dấu: ắằẳẵặ ếềểễệ 日本語 😀\n" * 50
+    path = tmp_path / "mixed.txt"
+    path.write_text(text, encoding="utf-8")
+    
+    parts = []
+    offset = 0
+    while True:
+        window = read_text_window(str(path), mode="range", offset=offset, length=7)
+        parts.append(window['content'])
+        if window['end'] >= window['size']:
+            break
+        assert window['end'] > offset
+        offset = window['end']
+    assert "".join(parts) == text
+
+
+def test_tail_starts_at_full_line(tmp_path):
+    """Tail drops the partial first line of the window and ends at EOF."""
+    
+    path = tmp_path / "app.log"
+    path.write_text("".join(f"dòng {i}\n" for i in range(100)), encoding="utf-8")
+    
+    window = read_text_window(str(path), mode="tail", length=30)
+    assert window['end'] == window['size']
+    assert window['content'].endswith("dòng 99\n")
+    assert window['content'].startswith("dòng ")
+    assert window['truncated']
+
+
+def test_binary_and_unknown_mode(tmp_path):
+    """Files with NUL bytes are reported as binary; unknown modes are rejected."""
+    
+    path = tmp_path / "blob.bin"
+    path.write_bytes(b"\x00\x01\x02" * 10)
+    
+    window = read_text_window(str(path))
+    assert window['binary'] and window['content'] is None
+    with pytest.raises(ValueError):
+        read_text_window(str(path), mode="middle")
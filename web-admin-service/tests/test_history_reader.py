@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import sys
+import sqlite3
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import history_reader
+from history_reader import HistoryReader
+
+
+def create_db(path, stored_size=True):
+    """Tạo DB lịch sử như Watcher (WAL); stored_size=False mô phỏng DB cũ."""
+
+    conn = sqlite3.connect(str(path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE backups (id INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, status TEXT NOT NULL, "
+        "source TEXT NOT NULL, destination TEXT, size_bytes INTEGER, duration_seconds REAL, "
+        "error TEXT, error_code TEXT" + (", stored_size_bytes INTEGER" if stored_size else "") + ")"
+    )
+    return conn
+
+
+def add(conn, timestamp, status, source, stored_size=None):
+    columns = "timestamp, status, source, size_bytes" + (", stored_size_bytes" if stored_size else "")
+    values = (timestamp, status, source, 100) + ((stored_size,) if stored_size else ())
+    conn.execute(f"INSERT INTO backups ({columns}) VALUES ({', '.join('?' for _ in values)})", values)
+    conn.commit()
+
+
+def test_reader_queries_and_tails_live_wal_db(tmp_path):
+    """The reader sees rows committed to the WAL after it was opened."""
+
+    conn = create_db(tmp_path / "history.db")
+    add(conn, "2026-01-01T00:00:01", "SUCCESS", "/data/a.txt", stored_size=40)
+    reader = HistoryReader(tmp_path / "history.db")
+    assert not reader.immutable
+    assert reader.latest_id() == 1
+
+    add(conn, "2026-01-01T00:00:02", "FAILED", "/data/a.txt")
+    add(conn, "2026-01-01T00:00:03", "SUCCESS", "/data/b_1.txt", stored_size=50)
+
+    assert [r['id'] for r in reader.records_after(1)] == [2, 3]
+    assert reader.query(q="_1")['total'] == 1
+    assert reader.query(status="failed")['records'][0]['source'] == "/data/a.txt"
+    assert reader.last_backup("/data/a.txt")['stored_size_bytes'] == 40
+    reader.close()
+    conn.close()
+
+
+def test_reader_handles_db_without_stored_size_column(tmp_path):
+    """DBs created before stored_size_bytes existed return it as None."""
+
+    conn = create_db(tmp_path / "history.db", stored_size=False)
+    add(conn, "2026-01-01T00:00:01", "SUCCESS", "/data/a.txt")
+    reader = HistoryReader(tmp_path / "history.db")
+
+    record = reader.records_after(0)[0]
+    assert record['stored_size_bytes'] is None and record['size_bytes'] == 100
+    reader.close()
+    conn.close()
+
+
+def test_reader_falls_back_to_immutable_when_shm_cannot_be_created(tmp_path, monkeypatch):
+    """If mode=ro fails (read-only log volume), checkpointed rows are still readable."""
+
+    conn = create_db(tmp_path / "history.db")
+    add(conn, "2026-01-01T00:00:01", "SUCCESS", "/data/a.txt", stored_size=40)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    real_connect = sqlite3.connect
+
+    def connect(database, **kwargs):
+        if "mode=ro" in database:
+            raise sqlite3.OperationalError("unable to open database file")
+        return real_connect(database, **kwargs)
+
+    monkeypatch.setattr(history_reader.sqlite3, "connect", connect)
+    reader = HistoryReader(tmp_path / "history.db")
+    assert reader.immutable
+    assert reader.latest_id() == 1
+
+    add(conn, "2026-01-01T00:00:02", "SUCCESS", "/data/b.txt", stored_size=50)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    assert [r['source'] for r in reader.records_after(1)] == ["/data/b.txt"]
+    reader.close()
+    conn.close()
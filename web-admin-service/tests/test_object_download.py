@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import app as web_admin
+
+
+def client_error(code, operation="HeadObject"):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, operation)
+
+
+def download_status(monkeypatch, error):
+    def stream_object(object_key):
+        raise error
+
+    monkeypatch.setattr(web_admin.s3_client, "stream_object", stream_object)
+    return web_admin.app.test_client().get("/api/backup/object/report_20260101_000000.txt").status_code
+
+
+def test_missing_object_is_404(monkeypatch):
+    """Only a missing key maps to 404 (HEAD reports it as a bare '404')."""
+
+    assert download_status(monkeypatch, client_error("404")) == 404
+    assert download_status(monkeypatch, client_error("NoSuchKey", "GetObject")) == 404
+
+
+def test_storage_failures_are_not_404(monkeypatch):
+    """Other MinIO errors and connection failures are 502; anything else is 500."""
+
+    assert download_status(monkeypatch, client_error("AccessDenied")) == 502
+    assert download_status(monkeypatch, client_error("SlowDown")) == 502
+    assert download_status(monkeypatch, EndpointConnectionError(endpoint_url="http://minio:9000")) == 502
+    assert download_status(monkeypatch, ValueError("bad manifest")) == 500
+
+
+def test_existing_object_streams(monkeypatch):
+    """A successful stream keeps its size and attachment name."""
+
+    monkeypatch.setattr(web_admin.s3_client, "stream_object", lambda key: (5, iter([b"hello"])))
+    response = web_admin.app.test_client().get("/api/backup/object/docs/report_20260101_000000.txt")
+
+    assert response.status_code == 200
+    assert response.data == b"hello"
+    assert 'filename="report.txt"' in response.headers['Content-Disposition']
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from source_listing import DirectoryListing
+
+
+def names(result):
+    return [f['name'] for f in result['files']]
+
+
+def page(listing, **kwargs):
+    return listing.query(listing.snapshot(), **kwargs)
+
+
+def test_cursor_continues_after_inserts_and_deletes(tmp_path):
+    """Keyset cursor resumes after the last name seen, without skipping or repeating files."""
+    
+    for name in "abcdefg":
+        (tmp_path / f"{name}.txt").write_text(name)
+    listing = DirectoryListing(str(tmp_path), ttl=60)
+    
+    first = page(listing, limit=3)
+    assert names(first) == ["a.txt", "b.txt", "c.txt"]
+    assert first['total'] == 7
+    
+    # Changes before and after the cursor between the two requests
+    (tmp_path / "b2.txt").write_text("before cursor")
+    (tmp_path / "c.txt").unlink()
+    (tmp_path / "d.txt").unlink()
+    (tmp_path / "d2.txt").write_text("after cursor")
+    listing.invalidate()
+    
+    second = page(listing, limit=3, cursor=first['next_cursor'])
+    assert names(second) == ["d2.txt", "e.txt", "f.txt"]
+    
+    last = page(listing, limit=3, cursor=second['next_cursor'])
+    assert names(last) == ["g.txt"]
+    assert last['next_cursor'] is None
+
+
+def test_sort_by_size_descending_with_prefix(tmp_path):
+    """Ties on the sort value are broken by name; the prefix filter applies to every page."""
+    
+    for name, size in (("log_a", 30), ("log_b", 10), ("log_c", 30), ("other", 50), ("log_d", 20)):
+        (tmp_path / name).write_bytes(b"x" * size)
+    listing = DirectoryListing(str(tmp_path))
+    
+    first = page(listing, prefix="log_", sort="size", order="desc", limit=2)
+    assert names(first) == ["log_c", "log_a"]
+    assert first['total'] == 4
+    
+    second = page(listing, prefix="log_", sort="size", order="desc", limit=2, cursor=first['next_cursor'])
+    assert names(second) == ["log_d", "log_b"]
+    assert second['next_cursor'] is None
+
+
+def test_skips_temp_files_and_directories(tmp_path):
+    """Temp files and sub-directories (e.g. .uploads) are not listed."""
+    
+    (tmp_path / "data.txt").write_text("ok")
+    (tmp_path / "data.txt.1a2b3c4d.UPLOAD_TEMP").write_text("partial")
+    (tmp_path / ".uploads").mkdir()
+    listing = DirectoryListing(str(tmp_path), skip_suffixes=(".UPLOAD_TEMP", ".RESTORE_TEMP"))
+    
+    assert names(page(listing)) == ["data.txt"]
+
+
+def test_cursor_must_match_sort_key(tmp_path):
+    """A name cursor cannot be reused for a size-sorted listing."""
+    
+    for name in "abc":
+        (tmp_path / name).write_text(name)
+    listing = DirectoryListing(str(tmp_path))
+    cursor = page(listing, limit=1)['next_cursor']
+    
+    with pytest.raises(ValueError):
+        page(listing, sort="size", cursor=cursor)
+    with pytest.raises(ValueError):
+        page(listing, cursor="not-a-cursor")
+
+
+def test_etag_is_stable_across_rebuilds_until_contents_change(tmp_path):
+    """Rebuilding an unchanged directory keeps the ETag; editing a file changes it."""
+    
+    import os
+    
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "b.txt").write_text("b")
+    listing = DirectoryListing(str(tmp_path), ttl=0)
+    
+    first = listing.snapshot()
+    listing.invalidate()
+    second = listing.snapshot()
+    assert second is not first
+    assert second.etag == first.etag
+    
+    stat = os.stat(tmp_path / "a.txt")
+    (tmp_path / "a.txt").write_text("changed")
+    os.utime(tmp_path / "a.txt", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    listing.invalidate()
+    assert listing.snapshot().etag != first.etag
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from uploads import UploadManager, write_file_atomic
+
+SUFFIX = ".UPLOAD_TEMP"
+
+
+def test_resume_after_offset_mismatch(tmp_path):
+    """A chunk at the wrong offset is rejected; the client resumes from the server offset."""
+    
+    manager = UploadManager(str(tmp_path), SUFFIX)
+    session = manager.create("big.bin", size=9)
+    upload_id = session['upload_id']
+    
+    assert manager.append(upload_id, 0, io.BytesIO(b"abc"))['offset'] == 3
+    with pytest.raises(ValueError):
+        manager.append(upload_id, 0, io.BytesIO(b"abc"))  # retry of a chunk that already arrived
+    with pytest.raises(ValueError):
+        manager.complete(upload_id)  # 3 of 9 bytes
+    
+    # Web Admin restarted: a new manager finds the session from its id
+    manager = UploadManager(str(tmp_path), SUFFIX)
+    offset = manager.get(upload_id)['offset']
+    manager.append(upload_id, offset, io.BytesIO(b"defghi"))
+    
+    final = manager.complete(upload_id)
+    assert final['offset'] == final['size'] == 9
+    assert (tmp_path / "big.bin").read_bytes() == b"abcdefghi"
+    assert manager.get(upload_id) is None
+    assert os.listdir(manager.sessions_dir) == []
+
+
+def test_unknown_and_invalid_ids(tmp_path):
+    """Unknown ids and ids that are not plain hex are treated as missing sessions."""
+    
+    manager = UploadManager(str(tmp_path), SUFFIX)
+    assert manager.get("0" * 32) is None
+    assert manager.get("../../etc/passwd") is None
+    assert manager.append("0" * 32, 0, io.BytesIO(b"x")) is None
+    assert manager.complete("0" * 32) is None
+    assert manager.abort("0" * 32) is False
+    for i in range(100):
+        assert manager.append(f"{i:032x}", 0, io.BytesIO(b"x")) is None
+    # Lookups of sessions that don't exist never leave a lock behind
+    assert manager._session_locks == {}
+    
+    session = manager.create("a.txt")
+    manager.append(session['upload_id'], 0, io.BytesIO(b"x"))
+    manager.complete(session['upload_id'])
+    assert manager._session_locks == {}
+
+
+def test_cleanup_removes_only_stale_sessions(tmp_path):
+    """Sessions idle longer than the TTL are removed; active ones are kept."""
+    
+    manager = UploadManager(str(tmp_path), SUFFIX, ttl=60)
+    stale = manager.create("old.bin")['upload_id']
+    active = manager.create("new.bin")['upload_id']
+    old = time.time() - 3600
+    for name in os.listdir(manager.sessions_dir):
+        if name.startswith(stale):
+            os.utime(os.path.join(manager.sessions_dir, name), (old, old))
+    
+    assert manager.cleanup_stale() == 1
+    assert manager.get(stale) is None
+    assert manager.get(active) is not None
+
+
+def test_write_file_atomic_replaces_or_creates_exclusively(tmp_path):
+    """Atomic save leaves no temp file; exclusive create refuses to overwrite."""
+    
+    target = tmp_path / "notes.txt"
+    assert write_file_atomic(io.BytesIO(b"first"), str(target), SUFFIX, exclusive=True) == 5
+    with pytest.raises(FileExistsError):
+        write_file_atomic(io.BytesIO(b"second"), str(target), SUFFIX, exclusive=True)
+    write_file_atomic(io.BytesIO(b"third"), str(target), SUFFIX)
+    
+    assert target.read_bytes() == b"third"
+    assert os.listdir(tmp_path) == ["notes.txt"]
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from version_index import VersionIndex
+
+
+class SlowBackend:
+    """Bucket listing giả: đếm số lần liệt kê, có thể chặn listing cho tới khi được mở."""
+
+    def __init__(self):
+        self.keys = ["report_20260101_000000.txt"]
+        self.listings = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def iter_versions(self):
+        self.listings += 1
+        self.gate.wait(5)
+        for key in list(self.keys):
+            yield {'key': key, 'size': 1, 'last_modified': None}
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_concurrent_first_load_lists_bucket_once():
+    """Requests racing for an empty index share a single listing."""
+
+    backend = SlowBackend()
+    backend.gate.clear()
+    index = VersionIndex(backend, ttl=30)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(index.query()['total_files'])) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    backend.gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [1] * 8
+    assert backend.listings == 1
+
+
+def test_stale_index_is_served_while_rebuilding_in_background():
+    """After the TTL, requests return the previous index immediately and one background listing swaps in."""
+
+    backend = SlowBackend()
+    index = VersionIndex(backend, ttl=0.05)
+    assert index.query()['total_files'] == 1
+
+    time.sleep(0.06)
+    backend.keys.append("notes_20260102_000000.txt")
+    backend.gate.clear()
+    start = time.monotonic()
+    assert [index.query()['total_files'] for _ in range(20)] == [1] * 20
+    assert time.monotonic() - start < 1
+    assert backend.listings == 2
+
+    backend.gate.set()
+    assert wait_for(lambda: not index._refreshing)
+    assert index.query()['total_files'] == 2
+
+
+def test_force_refresh_lists_synchronously():
+    """force_refresh waits for a listing that started after the request."""
+
+    backend = SlowBackend()
+    index = VersionIndex(backend, ttl=30)
+    index.query()
+    backend.keys.append("notes_20260102_000000.txt")
+
+    assert index.query(force_refresh=True)['total_files'] == 2
+    assert backend.listings == 2
@@ -0,0 +1,238 @@
+# uploads.py
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import threading
+from contextlib import contextmanager
+
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+# Thư mục ẩn trong thư mục nguồn chứa dữ liệu các phiên upload từng phần
+UPLOAD_SESSIONS_DIR = ".uploads"
+
+
+def copy_stream(stream, f, block_size=UPLOAD_BLOCK_SIZE):
+    """Chép request body vào file theo từng khối (không giữ cả body trong bộ nhớ)."""
+    written = 0
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            return written
+        f.write(block)
+        written += len(block)
+
+
+def publish_file(temp_path, final_path, exclusive=False):
+    """fsync file tạm rồi đổi tên nguyên tử thành file đích: Watcher chỉ thấy file hoàn chỉnh.
+
+    exclusive=True: chỉ tạo file mới, FileExistsError nếu file đích đã có (link() nguyên tử,
+    không ghi đè file do request khác vừa tạo).
+    """
+    with open(temp_path, 'rb+') as f:
+        os.fsync(f.fileno())
+    if exclusive:
+        os.link(temp_path, final_path)
+        os.remove(temp_path)
+        return
+    if os.path.exists(final_path):
+        shutil.copymode(final_path, temp_path)
+    os.replace(temp_path, final_path)
+
+
+def write_file_atomic(stream, final_path, temp_suffix, exclusive=False):
+    """Ghi toàn bộ stream vào <final_path>.<id><temp_suffix> rồi thay thế file đích; trả về số byte."""
+    temp_path = f"{final_path}.{uuid.uuid4().hex[:8]}{temp_suffix}"
+    try:
+        with open(temp_path, 'wb') as f:
+            written = copy_stream(stream, f)
+        publish_file(temp_path, final_path, exclusive=exclusive)
+        return written
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class UploadManager:
+    """Upload từng phần, tiếp tục được sau khi mất kết nối (resumable upload).
+
+    Mỗi phiên có hai file trong <root>/.uploads/ (cùng filesystem với file đích nên đổi tên
+    được nguyên tử): <upload_id><temp_suffix> chứa dữ liệu, offset hiện tại chính là kích thước
+    file này; <upload_id>.meta<temp_suffix> lưu tên file đích và kích thước khai báo. Đường dẫn
+    suy ra trực tiếp từ upload_id (không quét thư mục), và phiên vẫn tiếp tục được sau khi
+    Web Admin khởi động lại. Watcher bỏ qua cả hai file nhờ đuôi temp_suffix.
+    Khi hoàn tất, file tạm được fsync và đổi tên nguyên tử thành file đích (1 sự kiện cho Watcher).
+    Phiên không có dữ liệu mới quá `ttl` giây bị xóa bởi cleanup_stale() (chạy định kỳ, start()).
+    """
+
+    UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+    def __init__(self, root, temp_suffix, ttl=24 * 3600):
+        self.root = root
+        self.temp_suffix = temp_suffix
+        self.ttl = ttl
+        self.sessions_dir = os.path.join(root, UPLOAD_SESSIONS_DIR)
+        os.makedirs(self.sessions_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._session_locks = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _data_path(self, upload_id):
+        return os.path.join(self.sessions_dir, f"{upload_id}{self.temp_suffix}")
+
+    def _meta_path(self, upload_id):
+        return os.path.join(self.sessions_dir, f"{upload_id}.meta{self.temp_suffix}")
+
+    def _load(self, upload_id):
+        """Metadata của phiên ({filename, size}); None nếu không có."""
+        if not self.UPLOAD_ID_PATTERN.match(upload_id):
+            return None
+        try:
+            with open(self._meta_path(upload_id), encoding='utf-8') as f:
+                meta = json.load(f)
+            return meta if os.path.exists(self._data_path(upload_id)) else None
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _session_lock(self, upload_id):
+        with self._lock:
+            return self._session_locks.setdefault(upload_id, threading.Lock())
+
+    @contextmanager
+    def _locked_session(self, upload_id):
+        """Giữ lock của phiên và trả về metadata (None nếu không có).
+
+        Chỉ tạo lock cho phiên có thật, nên upload_id bất kỳ lấy từ URL không làm
+        _session_locks phình ra; lock của phiên biến mất trong lúc chờ cũng được bỏ.
+        """
+        if self._load(upload_id) is None:
+            yield None
+            return
+        with self._session_lock(upload_id):
+            meta = self._load(upload_id)
+            yield meta
+        if meta is None:
+            self._forget(upload_id)
+
+    def _describe(self, upload_id, meta):
+        return {
+            'upload_id': upload_id,
+            'filename': meta['filename'],
+            'offset': os.path.getsize(self._data_path(upload_id)),
+            'size': meta.get('size')
+        }
+
+    def create(self, filename, size=None):
+        upload_id = uuid.uuid4().hex
+        meta = {'filename': filename, 'size': size}
+        open(self._data_path(upload_id), 'wb').close()
+        with open(self._meta_path(upload_id), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        return self._describe(upload_id, meta)
+
+    def get(self, upload_id):
+        meta = self._load(upload_id)
+        if meta is None:
+            return None
+        return self._describe(upload_id, meta)
+
+    def append(self, upload_id, offset, stream):
+        """Ghi tiếp body vào phiên tại `offset` (phải bằng offset hiện tại, nếu không ValueError)."""
+        with self._locked_session(upload_id) as meta:
+            if meta is None:
+                return None
+            data_path = self._data_path(upload_id)
+            current = os.path.getsize(data_path)
+            if offset != current:
+                raise ValueError(f"Offset mismatch: upload is at byte {current}, got {offset}")
+            with open(data_path, 'ab') as f:
+                copy_stream(stream, f)
+            return self._describe(upload_id, meta)
+
+    def complete(self, upload_id):
+        """Đổi tên file tạm thành file đích; trả về trạng thái cuối của phiên (None nếu không có)."""
+        with self._locked_session(upload_id) as meta:
+            if meta is None:
+                return None
+            session = self._describe(upload_id, meta)
+            if session['size'] is not None and session['offset'] != session['size']:
+                raise ValueError(
+                    f"Upload incomplete: {session['offset']} of {session['size']} bytes received"
+                )
+            publish_file(self._data_path(upload_id), os.path.join(self.root, meta['filename']))
+            self._remove_files(upload_id)
+        self._forget(upload_id)
+        return session
+
+    def abort(self, upload_id):
+        with self._locked_session(upload_id) as meta:
+            if meta is None:
+                return False
+            self._remove_files(upload_id)
+        self._forget(upload_id)
+        return True
+
+    def _remove_files(self, upload_id):
+        for path in (self._data_path(upload_id), self._meta_path(upload_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _forget(self, upload_id):
+        with self._lock:
+            self._session_locks.pop(upload_id, None)
+
+    def _last_activity(self, upload_id):
+        latest = 0.0
+        for path in (self._data_path(upload_id), self._meta_path(upload_id)):
+            try:
+                latest = max(latest, os.path.getmtime(path))
+            except FileNotFoundError:
+                pass
+        return latest
+
+    def cleanup_stale(self):
+        """Xóa các phiên bị bỏ dở quá ttl giây (chỉ quét thư mục .uploads); trả về số phiên đã xóa."""
+        cutoff = time.time() - self.ttl
+        removed = 0
+        with os.scandir(self.sessions_dir) as it:
+            upload_ids = {entry.name.split('.', 1)[0] for entry in it if entry.name.endswith(self.temp_suffix)}
+        for upload_id in upload_ids:
+            # Phiên còn nhận dữ liệu thì file dữ liệu vẫn mới dù file meta đã cũ
+            if self._last_activity(upload_id) >= cutoff:
+                continue
+            with self._session_lock(upload_id):
+                self._remove_files(upload_id)
+            self._forget(upload_id)
+            removed += 1
+        return removed
+
+    # ---- Dọn định kỳ ----
+
+    def start(self, interval_seconds=3600):
+        """Dọn phiên cũ ngay khi khởi động rồi định kỳ trên thread nền."""
+        self._thread = threading.Thread(
+            target=self._run_cleanup, args=(interval_seconds,), name="upload-cleanup", daemon=True
+        )
+        self._thread.start()
+
+    def _run_cleanup(self, interval_seconds):
+        while True:
+            try:
+                self.cleanup_stale()
+            except OSError:
+                pass
+            if self._stop.wait(interval_seconds):
+                return
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
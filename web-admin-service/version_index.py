@@ -0,0 +1,183 @@
+# version_index.py
+import re
+import threading
+import time
+from datetime import datetime
+
+# Versioned key do Watcher tạo: <thư mục/>tên_YYYYMMDD_HHMMSS.ext (PHẢI KHỚP VỚI WATCHER storage_client.py)
+VERSIONED_KEY_PATTERN = re.compile(
+    r"^(?P<stem>.+)_(?P<timestamp>\d{8}_\d{6})(?P<ext>\.[^./]*)?$"
+)
+
+
+def parse_versioned_key(key):
+    """Tách versioned key thành (tên file gốc, thời điểm backup ISO); None nếu không đúng định dạng."""
+    match = VERSIONED_KEY_PATTERN.match(key)
+    if not match:
+        return None
+    original_name = match.group('stem') + (match.group('ext') or '')
+    try:
+        backup_time = datetime.strptime(match.group('timestamp'), "%Y%m%d_%H%M%S")
+    except ValueError:
+        return None
+    return original_name, backup_time.isoformat()
+
+
+class VersionIndex:
+    """Chỉ mục phiên bản backup trong bộ nhớ, nhóm theo tên file gốc.
+
+    Được dựng lại từ listing (phân trang) của bucket khi quá `ttl` giây, nên mỗi lần
+    tải trang UI không còn phải liệt kê lại toàn bộ bucket. Khi chỉ mục đã cũ, listing chạy
+    trên thread nền và request vẫn dùng chỉ mục cũ cho tới khi bản mới được thay vào.
+    """
+
+    def __init__(self, backend, ttl=30):
+        self.backend = backend
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._groups = {}        # tên file gốc -> list phiên bản, mới nhất trước
+        self._names = []         # tên file gốc đã sắp xếp
+        self._loaded_at = None   # time.monotonic() lúc bắt đầu listing của lần dựng gần nhất
+        self._refreshing = False # đang có thread nền dựng lại chỉ mục
+        self._indexed_at = None  # thời điểm (ISO) của lần dựng gần nhất
+
+    @staticmethod
+    def _make_version(key, size, last_modified):
+        parsed = parse_versioned_key(key)
+        original_name, backup_time = parsed if parsed else (key, None)
+        return original_name, {
+            'key': key,
+            'filename': original_name,
+            'backup_time': backup_time,
+            'last_modified': last_modified,
+            'size': size
+        }
+
+    @classmethod
+    def version_for(cls, key, size, last_modified):
+        """Mô tả phiên bản của một object key, cùng dạng với các phần tử `versions` của query()."""
+        return cls._make_version(key, size, last_modified)[1]
+
+    @staticmethod
+    def _sort_key(version):
+        return version['backup_time'] or version['last_modified'] or ''
+
+    def refresh(self, newer_than=None):
+        """Dựng lại chỉ mục từ bucket. Chỉ một luồng dựng tại một thời điểm.
+
+        newer_than: bỏ qua nếu trong lúc chờ lock, một lần dựng có listing bắt đầu từ thời
+        điểm (monotonic) này trở đi đã xong, để các request đồng thời không liệt kê lại lần nữa.
+        """
+        with self._refresh_lock:
+            if newer_than is not None:
+                with self._lock:
+                    if self._loaded_at is not None and self._loaded_at >= newer_than:
+                        return
+            started = time.monotonic()
+            groups = {}
+            for item in self.backend.iter_versions():
+                original_name, version = self._make_version(
+                    item['key'], item['size'], item['last_modified']
+                )
+                groups.setdefault(original_name, []).append(version)
+
+            for versions in groups.values():
+                versions.sort(key=self._sort_key, reverse=True)
+
+            with self._lock:
+                self._groups = groups
+                self._names = sorted(groups)
+                self._loaded_at = started
+                self._indexed_at = datetime.now().isoformat()
+
+    def _ensure_fresh(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            loaded = self._loaded_at is not None
+            stale = not loaded or now - self._loaded_at > self.ttl
+            background = stale and loaded and not force and not self._refreshing
+            if background:
+                self._refreshing = True
+
+        if force:
+            self.refresh(newer_than=now)
+        elif not loaded:
+            # Chưa có chỉ mục: phải chờ lần dựng đầu tiên (dùng chung giữa các request)
+            self.refresh(newer_than=float('-inf'))
+        elif background:
+            threading.Thread(target=self._refresh_in_background, name="version-index-refresh", daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception:
+            # Giữ chỉ mục cũ; request kế tiếp sau TTL sẽ thử dựng lại
+            pass
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def add_version(self, key, size, last_modified):
+        """Thêm một phiên bản mới vào chỉ mục mà không cần liệt kê lại bucket."""
+        original_name, version = self._make_version(key, size, last_modified)
+        with self._lock:
+            if self._loaded_at is None:
+                return None
+            versions = self._groups.get(original_name)
+            if versions is None:
+                self._groups[original_name] = [version]
+                self._names.insert(self._bisect(original_name), original_name)
+            elif all(v['key'] != key for v in versions):
+                versions.append(version)
+                versions.sort(key=self._sort_key, reverse=True)
+        return version
+
+    def _bisect(self, name):
+        lo, hi = 0, len(self._names)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._names[mid] < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def query(self, q=None, page=1, page_size=50, versions_limit=50, force_refresh=False):
+        """Trả về một trang các file gốc (lọc theo chuỗi con `q`), kèm các phiên bản mới nhất."""
+        self._ensure_fresh(force_refresh)
+
+        with self._lock:
+            names = self._names
+            if q:
+                needle = q.lower()
+                names = [name for name in names if needle in name.lower()]
+
+            total = len(names)
+            start = (page - 1) * page_size
+            files = []
+            for name in names[start:start + page_size]:
+                versions = self._groups[name]
+                files.append({
+                    'filename': name,
+                    'version_count': len(versions),
+                    'latest': versions[0]['backup_time'] or versions[0]['last_modified'],
+                    'versions': versions[:versions_limit]
+                })
+            indexed_at = self._indexed_at
+
+        return {
+            'files': files,
+            'total_files': total,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (total + page_size - 1) // page_size,
+            'indexed_at': indexed_at
+        }
+
+    def versions_of(self, filename, force_refresh=False):
+        """Tất cả phiên bản của một file gốc, mới nhất trước."""
+        self._ensure_fresh(force_refresh)
+        with self._lock:
+            return list(self._groups.get(filename, []))